@@ -29,7 +29,7 @@ else:
 
 db_manager = DatabaseManager(db_path=DB_FILE)
 record_service = RecordService(db_manager=db_manager)
-ml_service = MLService(model_path=MODEL_FILE)
+ml_service = MLService(model_path=MODEL_FILE, db_manager=db_manager)
 print("[API Server] All services initialized. Server is ready.")
 
 
@@ -8,7 +8,41 @@ class Config:
     # 데이터베이스 설정
     DB_DIR = os.path.join(BASE_DIR, 'database') # database/ 폴더로 변경
     DB_FILE = os.path.join(DB_DIR, "genetics.db")
+
+    # 분석용 컬럼형 미러 (DuckDB 설치 시에만 사용)
+    ANALYTICS_MIRROR_FILE = os.path.join(DB_DIR, "analytics.duckdb")
+    ANALYTICS_REFRESH_SECONDS = 30
+
+    # 수집 시 근사 중복 병합 (동일성 임계값 이상이면 새 행 대신 기존 대표 서열에 병합)
+    NEAR_DUPLICATE_COLLAPSE = os.environ.get('NEAR_DUPLICATE_COLLAPSE', '0') == '1'
+    NEAR_DUPLICATE_IDENTITY = float(os.environ.get('NEAR_DUPLICATE_IDENTITY', '0.98'))
     
+    # NCBI E-utilities (API 키가 있으면 초당 10회, 없으면 3회로 제한). NCBI_EUTILS_URL로 로컬 대체 서버 지정 가능
+    NCBI_EUTILS_URL = os.environ.get('NCBI_EUTILS_URL', 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils')
+    NCBI_API_KEY = os.environ.get('NCBI_API_KEY')
+    NCBI_EMAIL = os.environ.get('NCBI_EMAIL')
+    # NCBI 전체 건수(ncbi_meta) 캐시 유효 시간. 만료 후에는 이전 값을 반환하며 백그라운드에서 갱신
+    NCBI_META_TTL_SECONDS = float(os.environ.get('NCBI_META_TTL_SECONDS', '3600'))
+
+    # 백그라운드 작업 (NCBI 수집, 업로드 적재) 워커 수. 1이면 제출 순서대로 하나씩 실행 (NCBI 오프셋 순서 보장)
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '1'))
+    # 다중 프로세스 작업 큐 (dna_worker.py). 하트비트가 이 시간 동안 없으면 다른 워커가 작업을 다시 실행
+    JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', '60'))
+    # 재개 가능한 NCBI 수집 작업의 임대 시간. 만료된 작업만 다른 프로세스가 interrupted로 표시하거나 재개
+    HARVEST_LEASE_SECONDS = float(os.environ.get('HARVEST_LEASE_SECONDS', '60'))
+
+    # 온라인 백업 스냅샷 (sqlite3 backup API). BACKUP_INTERVAL_MINUTES > 0이면 주기적으로 자동 스냅샷
+    BACKUP_DIR = os.path.join(DB_DIR, 'backups')
+    BACKUP_KEEP = int(os.environ.get('BACKUP_KEEP', '5'))
+    BACKUP_INTERVAL_MINUTES = int(os.environ.get('BACKUP_INTERVAL_MINUTES', '0'))
+
+    # 큐 작업(import/export)이 읽고 쓸 수 있는 디렉토리. payload의 path는 이 아래로만 해석되고 밖을 가리키면 거부
+    IMPORT_DIR = os.environ.get('IMPORT_DIR', os.path.join(DB_DIR, 'imports'))
+    EXPORT_DIR = os.environ.get('EXPORT_DIR', os.path.join(DB_DIR, 'exports'))
+
+    # Sandbox ZIP 캐시 (파일 목록/mtime/size가 같으면 재압축 없이 재사용, '.cache'는 ZIP에서 제외됨)
+    SANDBOX_CACHE_DIR = os.path.join(BASE_DIR, '.cache', 'sandbox')
+
     # 모델 설정
     MODEL_DIR = os.path.join(BASE_DIR, 'ml_models')
     MODEL_FILE = os.path.join(MODEL_DIR, "dna_classifier.joblib")
@@ -3,9 +3,16 @@ from flask_cors import CORS
 import os
 from config import config
 from .services.record_service import RecordService
+from .services.ncbi_client import EutilsClient
+from .services.harvest_service import HarvestService
+from .services.import_service import FastaImporter
+from .services.job_service import JobManager
 from .services.ml_service import MLService
 from .services.xai_service import XAIService
+from .services.analytics_service import AnalyticsMirror
 from .database.db_manager import DatabaseManager
+from .database.backup_manager import BackupManager
+from .database.job_queue import JobQueue
 
 def create_app():
     """애플리케이션 팩토리 함수."""
@@ -15,20 +22,54 @@ def create_app():
     CORS(app)
 
     with app.app_context():
-        db_manager = DatabaseManager(db_path=app.config['DB_FILE'])
+        db_manager = DatabaseManager(
+            db_path=app.config['DB_FILE'],
+            near_duplicate_identity=app.config['NEAR_DUPLICATE_IDENTITY'] if app.config['NEAR_DUPLICATE_COLLAPSE'] else None
+        )
+        # 새로 만든 유사도/모티프 인덱스는 기존 레코드를 백그라운드에서 배치 단위로 채움 (시작을 막지 않음)
+        db_manager.start_index_backfill()
         
-        ml_service = MLService(model_path=app.config['MODEL_FILE'])
-        xai_service = XAIService(model_dir=app.config['MODEL_DIR'])
+        ml_service = MLService(model_path=app.config['MODEL_FILE'], db_manager=db_manager)
+        xai_service = XAIService(model_dir=app.config['MODEL_DIR'], db_manager=db_manager)
 
         app.db_manager = db_manager  # docs.py에서 사용하기 위해 추가
-        app.record_service = RecordService(db_manager=db_manager)
+        app.record_service = RecordService(
+            db_manager=db_manager,
+            ncbi_client=EutilsClient(
+                base_url=app.config['NCBI_EUTILS_URL'],
+                api_key=app.config['NCBI_API_KEY'],
+                email=app.config['NCBI_EMAIL']
+            ),
+            meta_ttl=app.config['NCBI_META_TTL_SECONDS']
+        )
+        app.harvest_service = HarvestService(db_manager, app.record_service,
+                                             lease_seconds=app.config['HARVEST_LEASE_SECONDS'])
+        app.fasta_importer = FastaImporter(db_manager)
+        # 수집/적재 백그라운드 작업 (요청 스레드를 막지 않음)
+        app.job_manager = JobManager(max_workers=app.config['JOB_WORKERS'])
+        # dna_worker.py 프로세스들이 처리하는 공유 작업 큐
+        app.job_queue = JobQueue(db_manager, lease_seconds=app.config['JOB_LEASE_SECONDS'])
         app.ml_service = ml_service
         app.xai_service = xai_service
+
+        from .api.analysis import parse_metadata
+        app.analytics_mirror = AnalyticsMirror(
+            db_manager,
+            mirror_path=app.config['ANALYTICS_MIRROR_FILE'],
+            metadata_parser=parse_metadata,
+            refresh_interval=app.config['ANALYTICS_REFRESH_SECONDS']
+        )
+        app.backup_manager = BackupManager(
+            db_manager,
+            backup_dir=app.config['BACKUP_DIR'],
+            keep=app.config['BACKUP_KEEP']
+        )
+        app.backup_manager.start_scheduler(app.config['BACKUP_INTERVAL_MINUTES'])
         print("[App Factory] Services initialized and attached to app context.")
 
     # 블루프린트 등록
     # 블루프린트 등록
-    from .api import records, ml, system, database
+    from .api import records, ml, system, database, jobs
     from .api.docs import docs_bp
     from .api.analysis import analysis_bp
     
@@ -36,6 +77,7 @@ def create_app():
     app.register_blueprint(ml.bp, url_prefix='/api')
     app.register_blueprint(system.bp, url_prefix='/api')
     app.register_blueprint(database.bp, url_prefix='/api')
+    app.register_blueprint(jobs.bp, url_prefix='/api')
     app.register_blueprint(docs_bp, url_prefix='/api/docs')
     app.register_blueprint(analysis_bp, url_prefix='/api/analysis')
     print("[App Factory] API blueprints registered.")
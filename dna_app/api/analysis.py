@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify, current_app
 import json
 import re
+from dna_app.services.sequence_normalizer import as_canonical
 
 analysis_bp = Blueprint('analysis', __name__)
 
@@ -367,68 +368,76 @@ def analyze_virus_identity():
     """Analyze virus identity based on metadata."""
     try:
         db = current_app.db_manager
-        conn = db.conn
-        cursor = conn.cursor()
-        
-        # Get all records with occurrence_count > 1 (identical sequences found multiple times)
-        cursor.execute("""
-            SELECT record_id, dna_sequence, source_metadata, occurrence_count
-            FROM genetic_records
-            WHERE occurrence_count > 1
-            ORDER BY occurrence_count DESC
-            LIMIT 100
-        """)
-        identical_groups = cursor.fetchall()
-        
-        # Get virus type distribution
-        cursor.execute("SELECT source_metadata FROM genetic_records WHERE source_metadata IS NOT NULL AND source_metadata != '[]'")
-        all_metadata = cursor.fetchall()
-        
-        virus_types = {}
-        hosts = {}
-        locations = {}
-        years = {}
-        
-        for row in all_metadata:
-            metadata_str = row[0] if isinstance(row[0], str) else str(row[0]) if row[0] else None
-            parsed_list = parse_metadata(metadata_str)
-            for p in parsed_list:
-                if p['virus_type']:
-                    vt = p['virus_type'] + (' ' + p['subtype'] if p['subtype'] else '')
-                    virus_types[vt] = virus_types.get(vt, 0) + 1
-                if p['host']:
-                    hosts[p['host']] = hosts.get(p['host'], 0) + 1
-                if p['location']:
-                    locations[p['location']] = locations.get(p['location'], 0) + 1
-                if p['year']:
-                    years[p['year']] = years.get(p['year'], 0) + 1
-        
-        # Sort by count
-        virus_types = dict(sorted(virus_types.items(), key=lambda x: x[1], reverse=True)[:10])
-        hosts = dict(sorted(hosts.items(), key=lambda x: x[1], reverse=True)[:5])
-        locations = dict(sorted(locations.items(), key=lambda x: x[1], reverse=True)[:10])
-        years = dict(sorted(years.items(), key=lambda x: x[1], reverse=True)[:5])
-        
-        # Get total count
-        cursor.execute("SELECT COUNT(*) FROM genetic_records")
-        total_records = cursor.fetchone()[0]
-        
-        return jsonify({
-            "status": "success",
-            "total_records": total_records,
-            "identical_groups": len(identical_groups),
-            "distribution": {
-                "virus_types": virus_types,
-                "hosts": hosts,
-                "locations": locations,
-                "years": years
-            },
-            "top_identical": [{
-                "record_id": r[0],
-                "sequence_preview": r[1][:125] + "..." if len(r[1]) > 125 else r[1],
-                "occurrence_count": r[3]
-            } for r in identical_groups[:10]]
-        })
+        with db.read_snapshot() as conn:
+            cursor = conn.cursor()
+        
+            # Get all records with occurrence_count > 1 (identical sequences found multiple times)
+            cursor.execute("""
+                SELECT record_id, dna_sequence, source_metadata, occurrence_count
+                FROM genetic_records
+                WHERE occurrence_count > 1
+                ORDER BY occurrence_count DESC
+                LIMIT 100
+            """)
+            identical_groups = cursor.fetchall()
+        
+            mirror = getattr(current_app, 'analytics_mirror', None)
+            if mirror and mirror.is_ready():
+                # 컬럼형 미러(DuckDB)에서 GROUP BY 집계
+                virus_types = mirror.group_counts('virus_type', limit=10)
+                hosts = mirror.group_counts('host', limit=5)
+                locations = mirror.group_counts('location', limit=10)
+                years = mirror.group_counts('year', limit=5)
+            else:
+                # Get virus type distribution
+                cursor.execute("SELECT source_metadata FROM genetic_records WHERE source_metadata IS NOT NULL AND source_metadata != '[]'")
+                all_metadata = cursor.fetchall()
+        
+                virus_types = {}
+                hosts = {}
+                locations = {}
+                years = {}
+        
+                for row in all_metadata:
+                    metadata_str = row[0] if isinstance(row[0], str) else str(row[0]) if row[0] else None
+                    parsed_list = parse_metadata(metadata_str)
+                    for p in parsed_list:
+                        if p['virus_type']:
+                            vt = p['virus_type'] + (' ' + p['subtype'] if p['subtype'] else '')
+                            virus_types[vt] = virus_types.get(vt, 0) + 1
+                        if p['host']:
+                            hosts[p['host']] = hosts.get(p['host'], 0) + 1
+                        if p['location']:
+                            locations[p['location']] = locations.get(p['location'], 0) + 1
+                        if p['year']:
+                            years[p['year']] = years.get(p['year'], 0) + 1
+        
+                # Sort by count
+                virus_types = dict(sorted(virus_types.items(), key=lambda x: x[1], reverse=True)[:10])
+                hosts = dict(sorted(hosts.items(), key=lambda x: x[1], reverse=True)[:5])
+                locations = dict(sorted(locations.items(), key=lambda x: x[1], reverse=True)[:10])
+                years = dict(sorted(years.items(), key=lambda x: x[1], reverse=True)[:5])
+        
+            # Get total count
+            cursor.execute("SELECT COUNT(*) FROM genetic_records")
+            total_records = cursor.fetchone()[0]
+        
+            return jsonify({
+                "status": "success",
+                "total_records": total_records,
+                "identical_groups": len(identical_groups),
+                "distribution": {
+                    "virus_types": virus_types,
+                    "hosts": hosts,
+                    "locations": locations,
+                    "years": years
+                },
+                "top_identical": [{
+                    "record_id": r[0],
+                    "sequence_preview": r[1][:125] + "..." if len(r[1]) > 125 else r[1],
+                    "occurrence_count": r[3]
+                } for r in identical_groups[:10]]
+            })
         
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -447,268 +456,317 @@ def combined_insights():
         
         db = current_app.db_manager
         ml_service = current_app.ml_service
-        conn = db.conn
-        cursor = conn.cursor()
-        
-        # ===== 데이터 스냅샷 해시 생성 =====
-        cursor.execute("SELECT COUNT(*), MAX(rowid) FROM genetic_records")
-        count_row = cursor.fetchone()
-        record_count = count_row[0] if count_row else 0
-        max_rowid = count_row[1] if count_row else 0
-        snapshot_string = f"{record_count}:{max_rowid}:{dt.now().strftime('%Y%m%d%H')}"
-        data_snapshot_hash = hashlib.md5(snapshot_string.encode()).hexdigest()[:12]
-        
-        # ===== ML Model Info with Full Metadata =====
-        ml_info = {
-            "accuracy": None,  # None = 메타데이터 없음 표시
-            "f1_score": None,
-            "model_loaded": ml_service.model is not None,
-            # 메타데이터 계약
-            "meta": {
-                "model_version": None,
-                "data_snapshot_hash": data_snapshot_hash,
-                "is_heuristic": True,  # 기본값: heuristic 기반
-                "is_simulation": False,
-                "test_set_size": None,
-                "base_class": None,
-                "trained_at": None
+        with db.read_snapshot() as conn:
+            cursor = conn.cursor()
+        
+            # ===== 데이터 스냅샷 해시 생성 =====
+            cursor.execute("SELECT COUNT(*), MAX(rowid) FROM genetic_records")
+            count_row = cursor.fetchone()
+            record_count = count_row[0] if count_row else 0
+            max_rowid = count_row[1] if count_row else 0
+            snapshot_string = f"{record_count}:{max_rowid}:{dt.now().strftime('%Y%m%d%H')}"
+            data_snapshot_hash = hashlib.md5(snapshot_string.encode()).hexdigest()[:12]
+        
+            # ===== ML Model Info with Full Metadata =====
+            ml_info = {
+                "accuracy": None,  # None = 메타데이터 없음 표시
+                "f1_score": None,
+                "model_loaded": ml_service.model is not None,
+                # 메타데이터 계약
+                "meta": {
+                    "model_version": None,
+                    "data_snapshot_hash": data_snapshot_hash,
+                    "is_heuristic": True,  # 기본값: heuristic 기반
+                    "is_simulation": False,
+                    "test_set_size": None,
+                    "base_class": None,
+                    "trained_at": None
+                }
             }
-        }
         
-        if ml_service.model:
-            try:
-                import joblib
-                import os
-                metrics_path = current_app.config.get('MODEL_DIR', 'ml_models') + '/training_metrics.joblib'
-                model_path = current_app.config.get('MODEL_FILE', 'ml_models/model.joblib')
+            if ml_service.model:
+                try:
+                    import joblib
+                    import os
+                    metrics_path = current_app.config.get('MODEL_DIR', 'ml_models') + '/training_metrics.joblib'
+                    model_path = current_app.config.get('MODEL_FILE', 'ml_models/model.joblib')
                 
-                if os.path.exists(metrics_path):
-                    metrics = joblib.load(metrics_path)
-                    ml_info['accuracy'] = round(metrics.get('accuracy', 0) * 100, 1)
-                    ml_info['f1_score'] = round(metrics.get('f1_score', 0) * 100, 1)
+                    if os.path.exists(metrics_path):
+                        metrics = joblib.load(metrics_path)
+                        ml_info['accuracy'] = round(metrics.get('accuracy', 0) * 100, 1)
+                        ml_info['f1_score'] = round(metrics.get('f1_score', 0) * 100, 1)
                     
-                    # 메타데이터 채우기
-                    ml_info['meta']['test_set_size'] = metrics.get('test_size', 0)
-                    ml_info['meta']['base_class'] = 'Type A, Type B'
-                    ml_info['meta']['is_heuristic'] = metrics.get('is_heuristic', True)
-                    ml_info['meta']['trained_at'] = metrics.get('trained_at', None)
+                        # 메타데이터 채우기
+                        ml_info['meta']['test_set_size'] = metrics.get('test_size', 0)
+                        ml_info['meta']['base_class'] = 'Type A, Type B'
+                        ml_info['meta']['is_heuristic'] = metrics.get('is_heuristic', True)
+                        ml_info['meta']['trained_at'] = metrics.get('trained_at', None)
                     
-                # 모델 버전 (파일 수정 시간 기반)
-                if os.path.exists(model_path):
-                    mtime = os.path.getmtime(model_path)
-                    ml_info['meta']['model_version'] = dt.fromtimestamp(mtime).strftime('%Y%m%d_%H%M')
-            except Exception as e:
-                ml_info['meta']['error'] = str(e)
-        
-        # Get sample sequences for ML classification breakdown by virus type
-        # OPTIMIZED: Reduce sample size and batch predictions to prevent memory issues
-        cursor.execute("""
-            SELECT dna_sequence, source_metadata 
-            FROM genetic_records 
-            WHERE source_metadata IS NOT NULL AND source_metadata != '[]'
-            LIMIT 100
-        """)
-        samples = cursor.fetchall()
-        
-        # Batch predict to avoid repeated model calls causing memory issues
-        predictions = {}
-        if ml_service.model:
-            try:
-                for row in samples:
-                    seq = row[0]
+                    # 모델 버전 (파일 수정 시간 기반)
+                    if os.path.exists(model_path):
+                        mtime = os.path.getmtime(model_path)
+                        ml_info['meta']['model_version'] = dt.fromtimestamp(mtime).strftime('%Y%m%d_%H%M')
+                except Exception as e:
+                    ml_info['meta']['error'] = str(e)
+        
+            # Get sample sequences for ML classification breakdown by virus type
+            # OPTIMIZED: Reduce sample size and batch predictions to prevent memory issues
+            cursor.execute("""
+                SELECT dna_sequence, source_metadata 
+                FROM genetic_records 
+                WHERE source_metadata IS NOT NULL AND source_metadata != '[]'
+                LIMIT 100
+            """)
+            samples = cursor.fetchall()
+        
+            # Batch predict to avoid repeated model calls causing memory issues
+            predictions = {}
+            if ml_service.model:
+                try:
                     # Cache predictions by sequence hash (first 50 chars as key)
-                    seq_key = seq[:50] if len(seq) > 50 else seq
-                    if seq_key not in predictions:
-                        pred_result = ml_service.predict(seq)
+                    # 특징 벡터는 특징 저장소에서 한 번에 읽어 배치 예측
+                    unique_seqs = {}
+                    for row in samples:
+                        seq = row[0]
+                        unique_seqs.setdefault(seq[:50] if len(seq) > 50 else seq, seq)
+                    batch = ml_service.predict_batch(as_canonical(unique_seqs.values()), persist=True)
+                    for seq_key, pred_result in zip(unique_seqs, batch):
                         predictions[seq_key] = pred_result.get('predicted_type', 'Unknown')
-            except Exception as pred_err:
-                # If prediction fails, skip ML classification
-                predictions = {}
-        
-        # Classify samples and correlate with metadata
-        type_classification = {}  # {virus_type: {Type A: count, Type B: count}}
-        host_classification = {}  # {host: {Type A: count, Type B: count}}
-        
-        for row in samples:
-            seq = row[0]
-            metadata_str = row[1] if isinstance(row[1], str) else str(row[1]) if row[1] else None
-            parsed_list = parse_metadata(metadata_str)
+                except Exception as pred_err:
+                    # If prediction fails, skip ML classification
+                    predictions = {}
+        
+            # Classify samples and correlate with metadata
+            type_classification = {}  # {virus_type: {Type A: count, Type B: count}}
+            host_classification = {}  # {host: {Type A: count, Type B: count}}
+        
+            for row in samples:
+                seq = row[0]
+                metadata_str = row[1] if isinstance(row[1], str) else str(row[1]) if row[1] else None
+                parsed_list = parse_metadata(metadata_str)
             
-            # Get cached prediction
-            seq_key = seq[:50] if len(seq) > 50 else seq
-            predicted_class = predictions.get(seq_key, 'Unknown')
+                # Get cached prediction
+                seq_key = seq[:50] if len(seq) > 50 else seq
+                predicted_class = predictions.get(seq_key, 'Unknown')
             
-            for p in parsed_list:
-                # Virus type correlation
-                if p['virus_type']:
-                    vt = p['virus_type'] + (' ' + p['subtype'] if p['subtype'] else '')
-                    if vt not in type_classification:
-                        type_classification[vt] = {'Type A': 0, 'Type B': 0}
-                    if predicted_class in type_classification[vt]:
-                        type_classification[vt][predicted_class] += 1
+                for p in parsed_list:
+                    # Virus type correlation
+                    if p['virus_type']:
+                        vt = p['virus_type'] + (' ' + p['subtype'] if p['subtype'] else '')
+                        if vt not in type_classification:
+                            type_classification[vt] = {'Type A': 0, 'Type B': 0}
+                        if predicted_class in type_classification[vt]:
+                            type_classification[vt][predicted_class] += 1
                 
-                # Host correlation
-                if p['host']:
-                    if p['host'] not in host_classification:
-                        host_classification[p['host']] = {'Type A': 0, 'Type B': 0}
-                    if predicted_class in host_classification[p['host']]:
-                        host_classification[p['host']][predicted_class] += 1
-        
-        # Calculate risk scores for cross-species potential
-        risk_scores = []
-        for host, counts in host_classification.items():
-            total = counts['Type A'] + counts['Type B']
-            if total > 0:
-                # Higher diversity = higher risk
-                diversity = min(counts['Type A'], counts['Type B']) / max(counts['Type A'], counts['Type B']) if max(counts['Type A'], counts['Type B']) > 0 else 0
-                risk_scores.append({
-                    'host': host,
-                    'sample_count': total,
-                    'type_a_ratio': round(counts['Type A'] / total * 100, 1),
-                    'type_b_ratio': round(counts['Type B'] / total * 100, 1),
-                    'diversity_score': round(diversity * 100, 1)
-                })
-        risk_scores.sort(key=lambda x: x['diversity_score'], reverse=True)
-        
-        # Get temporal distribution
-        cursor.execute("SELECT source_metadata FROM genetic_records WHERE source_metadata IS NOT NULL")
-        all_meta = cursor.fetchall()
-        years_data = {}
-        for row in all_meta:
-            metadata_str = row[0] if isinstance(row[0], str) else str(row[0]) if row[0] else None
-            parsed = parse_metadata(metadata_str)
-            for p in parsed:
-                if p['year']:
-                    if p['year'] not in years_data:
-                        years_data[p['year']] = 0
-                    years_data[p['year']] += 1
-        years_data = dict(sorted(years_data.items()))
-        
-        # ===== 추가 통계 메타데이터 =====
-        cursor.execute("SELECT COUNT(*) FROM genetic_records")
-        total_records = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(DISTINCT record_id) FROM genetic_records")
-        unique_records = cursor.fetchone()[0]
-        
-        virus_type_count = len(type_classification)
-        location_count = len(set(loc for scores in risk_scores for loc in [scores.get('host', '')]))
-        
-        # 지역 데이터 추출 (locations)
-        locations_set = set()
-        for row in all_meta:
-            metadata_str = row[0] if isinstance(row[0], str) else str(row[0]) if row[0] else None
-            parsed = parse_metadata(metadata_str)
-            for p in parsed:
-                if p.get('location'):
-                    locations_set.add(p['location'])
-        
-        return jsonify({
-            "status": "success",
-            "ml_info": ml_info,
-            "virus_type_classification": type_classification,
-            "host_classification": host_classification,
-            "cross_species_risk": risk_scores[:5],
-            "temporal_distribution": years_data,
+                    # Host correlation
+                    if p['host']:
+                        if p['host'] not in host_classification:
+                            host_classification[p['host']] = {'Type A': 0, 'Type B': 0}
+                        if predicted_class in host_classification[p['host']]:
+                            host_classification[p['host']][predicted_class] += 1
+        
+            # Calculate risk scores for cross-species potential
+            risk_scores = []
+            for host, counts in host_classification.items():
+                total = counts['Type A'] + counts['Type B']
+                if total > 0:
+                    # Higher diversity = higher risk
+                    diversity = min(counts['Type A'], counts['Type B']) / max(counts['Type A'], counts['Type B']) if max(counts['Type A'], counts['Type B']) > 0 else 0
+                    risk_scores.append({
+                        'host': host,
+                        'sample_count': total,
+                        'type_a_ratio': round(counts['Type A'] / total * 100, 1),
+                        'type_b_ratio': round(counts['Type B'] / total * 100, 1),
+                        'diversity_score': round(diversity * 100, 1)
+                    })
+            risk_scores.sort(key=lambda x: x['diversity_score'], reverse=True)
+        
+            # Get temporal distribution
+            mirror = getattr(current_app, 'analytics_mirror', None)
+            if mirror and mirror.is_ready():
+                # 컬럼형 미러(DuckDB)에서 연도별 GROUP BY 및 지역 목록 조회
+                years_data = mirror.group_counts('year', order='key')
+                locations_set = set(mirror.distinct_values('location'))
+            else:
+                cursor.execute("SELECT source_metadata FROM genetic_records WHERE source_metadata IS NOT NULL")
+                all_meta = cursor.fetchall()
+                years_data = {}
+                locations_set = set()
+                for row in all_meta:
+                    metadata_str = row[0] if isinstance(row[0], str) else str(row[0]) if row[0] else None
+                    parsed = parse_metadata(metadata_str)
+                    for p in parsed:
+                        if p['year']:
+                            if p['year'] not in years_data:
+                                years_data[p['year']] = 0
+                            years_data[p['year']] += 1
+                        # 지역 데이터 추출 (locations)
+                        if p.get('location'):
+                            locations_set.add(p['location'])
+                years_data = dict(sorted(years_data.items()))
+        
+            # ===== 추가 통계 메타데이터 =====
+            cursor.execute("SELECT COUNT(*) FROM genetic_records")
+            total_records = cursor.fetchone()[0]
+        
+            cursor.execute("SELECT COUNT(DISTINCT record_id) FROM genetic_records")
+            unique_records = cursor.fetchone()[0]
+        
+            virus_type_count = len(type_classification)
+            location_count = len(set(loc for scores in risk_scores for loc in [scores.get('host', '')]))
+        
+            return jsonify({
+                "status": "success",
+                "ml_info": ml_info,
+                "virus_type_classification": type_classification,
+                "host_classification": host_classification,
+                "cross_species_risk": risk_scores[:5],
+                "temporal_distribution": years_data,
             
-            # ===== 6개 스탯 카드 데이터 + 메타데이터 계약 =====
-            "stats": {
-                "total_records": {
-                    "value": total_records,
-                    "meta": {
-                        "dedup_applied": unique_records != total_records,
-                        "unique_count": unique_records,
-                        "snapshot_hash": data_snapshot_hash
-                    }
-                },
-                "virus_types": {
-                    "value": virus_type_count,
-                    "meta": {
-                        "taxonomy_source": "NCBI Influenza Database",
-                        "classification_method": "regex_pattern_matching",
-                        "confidence": "medium" if virus_type_count > 0 else "none"
+                # ===== 6개 스탯 카드 데이터 + 메타데이터 계약 =====
+                "stats": {
+                    "total_records": {
+                        "value": total_records,
+                        "meta": {
+                            "dedup_applied": unique_records != total_records,
+                            "unique_count": unique_records,
+                            "snapshot_hash": data_snapshot_hash
+                        }
+                    },
+                    "virus_types": {
+                        "value": virus_type_count,
+                        "meta": {
+                            "taxonomy_source": "NCBI Influenza Database",
+                            "classification_method": "regex_pattern_matching",
+                            "confidence": "medium" if virus_type_count > 0 else "none"
+                        }
+                    },
+                    "locations": {
+                        "value": len(locations_set),
+                        "meta": {
+                            "geo_inference": "metadata_string_parsing",
+                            "coord_source": "hardcoded_mapping",
+                            "coverage": list(locations_set)[:10]  # 최대 10개 샘플
+                        }
                     }
                 },
-                "locations": {
-                    "value": len(locations_set),
-                    "meta": {
-                        "geo_inference": "metadata_string_parsing",
-                        "coord_source": "hardcoded_mapping",
-                        "coverage": list(locations_set)[:10]  # 최대 10개 샘플
-                    }
-                }
-            },
             
-            # ===== Observation Plane 신뢰성 메타 =====
-            "observation_meta": {
-                "generated_at": dt.now().isoformat(),
-                "data_snapshot_hash": data_snapshot_hash,
-                "sample_size": len(samples),
-                "ml_model_loaded": ml_service.model is not None,
-                "trust_level": "verified" if ml_info['accuracy'] and ml_info['accuracy'] > 70 else "experimental",
-                "warnings": []
-            }
-        })
+                # ===== Observation Plane 신뢰성 메타 =====
+                "observation_meta": {
+                    "generated_at": dt.now().isoformat(),
+                    "data_snapshot_hash": data_snapshot_hash,
+                    "sample_size": len(samples),
+                    "ml_model_loaded": ml_service.model is not None,
+                    "trust_level": "verified" if ml_info['accuracy'] and ml_info['accuracy'] > 70 else "experimental",
+                    "warnings": []
+                }
+            })
         
     except Exception as e:
         import traceback
         return jsonify({"status": "error", "message": str(e), "trace": traceback.format_exc()}), 500
 
 
+# SQLite fallback용 시간 버킷 표현식 (DuckDB date_trunc와 동일하게 주는 월요일 시작)
+_SQLITE_BUCKETS = {
+    'day': "date(birth_time)",
+    'week': "date(birth_time, '-6 days', 'weekday 1')",
+    'month': "strftime('%Y-%m-01', birth_time)",
+    'year': "strftime('%Y-01-01', birth_time)",
+}
+
+
+@analysis_bp.route('/timeline', methods=['GET'])
+def get_timeline():
+    """Time-bucketed record counts (birth_time). Uses the columnar mirror when available."""
+    try:
+        bucket = request.args.get('bucket', 'month')
+        record_type = request.args.get('type')
+        if bucket not in _SQLITE_BUCKETS:
+            return jsonify({"status": "error", "message": f"bucket must be one of {list(_SQLITE_BUCKETS)}"}), 400
+
+        mirror = getattr(current_app, 'analytics_mirror', None)
+        if mirror and mirror.is_ready():
+            buckets = mirror.time_buckets(bucket, record_type=record_type)
+            engine = "duckdb"
+        else:
+            expr = _SQLITE_BUCKETS[bucket]
+            query = f"SELECT {expr} AS bucket, COUNT(*), SUM(occurrence_count) FROM genetic_records"
+            params = []
+            if record_type:
+                query += " WHERE record_type = ?"
+                params.append(record_type)
+            query += " GROUP BY bucket ORDER BY bucket"
+            with current_app.db_manager.read_snapshot() as conn:
+                rows = conn.execute(query, params).fetchall()
+            buckets = [{'bucket': b, 'records': n, 'occurrences': int(o or 0)} for b, n, o in rows]
+            engine = "sqlite"
+
+        return jsonify({
+            "status": "success",
+            "bucket": bucket,
+            "engine": engine,
+            "timeline": buckets
+        })
+
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
 @analysis_bp.route('/simulation/sequences', methods=['GET'])
 def get_simulation_sequences():
     """Get sequences for simulation visualization with location data."""
     try:
         db = current_app.db_manager
-        conn = db.conn
-        cursor = conn.cursor()
-        
-        # Get limit from query params (default: fetch all up to 3M)
-        limit = request.args.get('limit', 3000000, type=int)
-        
-        cursor.execute("""
-            SELECT record_id, dna_sequence, source_metadata, birth_time
-            FROM genetic_records
-            WHERE source_metadata IS NOT NULL AND source_metadata != '[]'
-            ORDER BY birth_time ASC
-            LIMIT ?
-        """, (limit,))
-        rows = cursor.fetchall()
-        
-        sequences = []
-        for row in rows:
-            record_id, seq, meta_str, birth_time = row
-            parsed_list = parse_metadata(meta_str)
+        with db.read_snapshot() as conn:
+            cursor = conn.cursor()
+        
+            # Get limit from query params (default: fetch all up to 3M)
+            limit = request.args.get('limit', 3000000, type=int)
+        
+            cursor.execute("""
+                SELECT record_id, dna_sequence, source_metadata, birth_time
+                FROM genetic_records
+                WHERE source_metadata IS NOT NULL AND source_metadata != '[]'
+                ORDER BY birth_time ASC
+                LIMIT ?
+            """, (limit,))
+            rows = cursor.fetchall()
+        
+            sequences = []
+            for row in rows:
+                record_id, seq, meta_str, birth_time = row
+                parsed_list = parse_metadata(meta_str)
             
-            # Extract location and virus type
-            location = 'Unknown'
-            virus_type = 'Unknown'
-            for p in parsed_list:
-                if p.get('location'):
-                    location = p['location']
-                if p.get('virus_type'):
-                    virus_type = p['virus_type']
-                    if p.get('subtype'):
-                        virus_type += ' ' + p['subtype']
+                # Extract location and virus type
+                location = 'Unknown'
+                virus_type = 'Unknown'
+                for p in parsed_list:
+                    if p.get('location'):
+                        location = p['location']
+                    if p.get('virus_type'):
+                        virus_type = p['virus_type']
+                        if p.get('subtype'):
+                            virus_type += ' ' + p['subtype']
             
-            sequences.append({
-                'id': record_id,
-                'sequence_preview': seq[:50] + '...' if len(seq) > 50 else seq,
-                'location': location,
-                'virus_type': virus_type,
-                'birth_time': birth_time
-            })
+                sequences.append({
+                    'id': record_id,
+                    'sequence_preview': seq[:50] + '...' if len(seq) > 50 else seq,
+                    'location': location,
+                    'virus_type': virus_type,
+                    'birth_time': birth_time
+                })
         
-        # Get total count
-        cursor.execute("SELECT COUNT(*) FROM genetic_records WHERE source_metadata IS NOT NULL AND source_metadata != '[]'")
-        total = cursor.fetchone()[0]
+            # Get total count
+            cursor.execute("SELECT COUNT(*) FROM genetic_records WHERE source_metadata IS NOT NULL AND source_metadata != '[]'")
+            total = cursor.fetchone()[0]
         
-        return jsonify({
-            "status": "success",
-            "sequences": sequences,
-            "total": total,
-            "limit": limit
-        })
+            return jsonify({
+                "status": "success",
+                "sequences": sequences,
+                "total": total,
+                "limit": limit
+            })
         
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
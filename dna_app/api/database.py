@@ -1,4 +1,6 @@
 from flask import Blueprint, jsonify, current_app, request
+import base64
+import json
 import sqlite3
 import os
 
@@ -22,12 +24,60 @@ def get_tables():
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+# 기본 응답에서 제외하는 대용량 컬럼 (columns=* 또는 columns=...로 명시하면 포함). BLOB 타입 컬럼도 기본 제외
+LARGE_COLUMNS = {'dna_sequence'}
+BLOB_PREVIEW_BYTES = 16
+
+
+def _render_blob(value: bytes) -> dict:
+    """BLOB 값은 JSON으로 직렬화할 수 없으므로 길이와 앞부분 hex 미리보기로 보여줍니다."""
+    preview = value[:BLOB_PREVIEW_BYTES].hex()
+    return {"blob_bytes": len(value), "hex": preview + ('...' if len(value) > BLOB_PREVIEW_BYTES else '')}
+
+
+def _encode_cursor(key: list, direction: str) -> str:
+    payload = json.dumps({'k': key, 'd': direction}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(token: str):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if payload['d'] not in ('next', 'prev') or not isinstance(payload['k'], list):
+            raise ValueError
+        return payload['k'], payload['d']
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def _quote_key(column: str) -> str:
+    return column if column == 'rowid' else f'"{column}"'
+
+
+def _key_columns(cursor, table_name: str, columns: list) -> list:
+    """keyset 정렬 키: rowid 테이블이면 rowid, WITHOUT ROWID 테이블이면 기본 키 컬럼."""
+    try:
+        cursor.execute(f'SELECT rowid FROM "{table_name}" LIMIT 0')
+        return ['rowid']
+    except sqlite3.OperationalError:
+        pk = sorted((c for c in columns if c['pk']), key=lambda c: c['pk'])
+        return [c['name'] for c in pk]
+
+
 @bp.route('/database/tables/<table_name>', methods=['GET'])
 def get_table_data(table_name):
+    """
+    테이블 브라우저.
+    - cursor=<token>: keyset 페이지네이션 (응답의 next_cursor / prev_cursor 사용, 깊은 페이지도 일정한 비용)
+    - page=<n>: 기존 OFFSET 페이지네이션 (cursor가 없을 때)
+    - columns=a,b 또는 columns=*: 반환 컬럼 지정 (기본값은 dna_sequence 같은 대용량 컬럼과 BLOB 컬럼 제외)
+    - BLOB 값은 {"blob_bytes": 길이, "hex": 앞부분 미리보기}로 반환
+    """
     try:
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 20))
         offset = (page - 1) * per_page
+        token = request.args.get('cursor')
 
         conn = get_db_connection()
         cursor = conn.cursor()
@@ -37,22 +87,73 @@ def get_table_data(table_name):
         if not cursor.fetchone():
             return jsonify({"status": "error", "message": "Table not found"}), 404
 
-        # Total Count
-        cursor.execute(f"SELECT COUNT(*) as total FROM {table_name}")
-        total_count = cursor.fetchone()['total']
+        # Total Count (캐시, 쓰기 시 무효화)
+        total_count = current_app.db_manager.count_rows(table_name)
 
         # Schema
-        cursor.execute(f"PRAGMA table_info({table_name});")
+        cursor.execute(f'PRAGMA table_info("{table_name}");')
         columns = [dict(row) for row in cursor.fetchall()]
-        
+        names = [c['name'] for c in columns]
+
+        # Projection
+        requested = request.args.get('columns')
+        if requested == '*':
+            selected = names
+        elif requested:
+            selected = [c.strip() for c in requested.split(',') if c.strip()]
+            unknown = [c for c in selected if c not in names]
+            if unknown:
+                return jsonify({"status": "error", "message": f"Unknown columns: {', '.join(unknown)}"}), 400
+        else:
+            selected = [c['name'] for c in columns
+                        if c['name'] not in LARGE_COLUMNS and (c['type'] or '').upper() != 'BLOB']
+
+        key_columns = _key_columns(cursor, table_name, columns)
+        key_expr = ', '.join(_quote_key(k) for k in key_columns)
+        key_aliases = [f'_key{i}' for i in range(len(key_columns))]
+        projection = ', '.join([f'"{c}"' for c in selected] +
+                               [f'{_quote_key(k)} AS {a}' for k, a in zip(key_columns, key_aliases)])
+
         # Paginated Data
-        cursor.execute(f"SELECT * FROM {table_name} LIMIT ? OFFSET ?;", (per_page, offset))
-        rows = [dict(row) for row in cursor.fetchall()]
+        if token:
+            key, direction = _decode_cursor(token)
+            if len(key) != len(key_columns):
+                raise ValueError("Invalid cursor")
+            placeholders = ', '.join('?' * len(key))
+            op, order = ('>', 'ASC') if direction == 'next' else ('<', 'DESC')
+            cursor.execute(
+                f'SELECT {projection} FROM "{table_name}" WHERE ({key_expr}) {op} ({placeholders}) '
+                f'ORDER BY {", ".join(f"{a} {order}" for a in key_aliases)} LIMIT ?;',
+                key + [per_page + 1]
+            )
+            fetched = cursor.fetchall()
+            has_more = len(fetched) > per_page
+            fetched = fetched[:per_page]
+            if direction == 'prev':
+                fetched.reverse()
+                has_prev, has_next = has_more, True
+            else:
+                has_prev, has_next = True, has_more
+        else:
+            cursor.execute(
+                f'SELECT {projection} FROM "{table_name}" ORDER BY {", ".join(key_aliases)} LIMIT ? OFFSET ?;',
+                (per_page + 1, offset)
+            )
+            fetched = cursor.fetchall()
+            has_next = len(fetched) > per_page
+            fetched = fetched[:per_page]
+            has_prev = offset > 0
+
+        rows, keys = [], []
+        for row in fetched:
+            row = dict(row)
+            keys.append([row.pop(a) for a in key_aliases])
+            rows.append({k: _render_blob(v) if isinstance(v, bytes) else v for k, v in row.items()})
 
         # Masking for sensitive data
         if table_name == 'system_metadata':
             for row in rows:
-                if row['key'] == 'gemini_api_key' and row['value']:
+                if row.get('key') == 'gemini_api_key' and row.get('value'):
                     val = row['value']
                     row['value'] = "sk-" + "*" * (len(val) - 6) if len(val) > 6 else "***"
         
@@ -69,14 +170,18 @@ def get_table_data(table_name):
         return jsonify({
             "status": "success",
             "table": table_name,
-            "columns": columns,
+            "columns": [c for c in columns if c['name'] in selected],
             "rows": rows,
             "pagination": {
-                "page": page,
+                "page": page if not token else None,
                 "per_page": per_page,
                 "total_rows": total_count,
-                "total_pages": (total_count + per_page - 1) // per_page
+                "total_pages": (total_count + per_page - 1) // per_page,
+                "next_cursor": _encode_cursor(keys[-1], 'next') if rows and has_next else None,
+                "prev_cursor": _encode_cursor(keys[0], 'prev') if rows and has_prev else None
             }
         })
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
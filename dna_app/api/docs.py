@@ -74,6 +74,38 @@ def list_documents():
         doc['id'] = doc.pop('doc_id')
     return jsonify({"status": "success", "documents": documents})
 
+@docs_bp.route('/search', methods=['GET'])
+def search_documents():
+    """문서 제목/본문 전문 검색"""
+    import sqlite3
+    query = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+
+    if not query:
+        return jsonify({"status": "error", "message": "Query parameter 'q' is required"}), 400
+
+    db = current_app.db_manager
+    try:
+        results, total = db.search_documents(query, limit=per_page, offset=(page - 1) * per_page)
+    except sqlite3.OperationalError as e:
+        return jsonify({"status": "error", "message": f"Invalid search query: {e}"}), 400
+
+    # 프론트엔드와 일치하도록 doc_id를 id로 변환
+    for doc in results:
+        doc['id'] = doc.pop('doc_id')
+    return jsonify({
+        "status": "success",
+        "query": query,
+        "results": results,
+        "pagination": {
+            "page": page,
+            "per_page": per_page,
+            "total_results": total,
+            "total_pages": (total + per_page - 1) // per_page
+        }
+    })
+
 @docs_bp.route('/<doc_id>', methods=['GET'])
 def get_document(doc_id):
     """특정 문서 내용 조회"""
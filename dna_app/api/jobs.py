@@ -0,0 +1,70 @@
+from flask import Blueprint, jsonify, current_app, request
+from dna_app.services.queue_worker import resolve_job_path
+
+bp = Blueprint('jobs', __name__)
+
+# dna_worker.py가 처리하는 작업 종류 (dna_app.services.queue_worker.build_handlers)
+QUEUE_KINDS = {'fetch_samples', 'harvest', 'import', 'retrain', 'sequence_train', 'export'}
+# 파일 경로를 받는 작업: payload.path는 설정된 디렉토리 아래만 허용 (워커에서도 다시 확인)
+PATH_ROOTS = {'import': 'IMPORT_DIR', 'export': 'EXPORT_DIR'}
+
+@bp.route('/jobs', methods=['GET'])
+def list_jobs():
+    """
+    작업 목록 (최신순).
+    - jobs: 이 서버 프로세스의 백그라운드 작업. Query: kind=fetch_samples|import
+    - queue: 공유 작업 큐(job_queue). Query: state=queued|running|completed|failed|cancelled
+    """
+    jobs = current_app.job_manager.list(kind=request.args.get('kind'))
+    queued = current_app.job_queue.list(state=request.args.get('state'))
+    return jsonify({"status": "success", "jobs": [j.to_dict() for j in jobs], "queue": queued})
+
+@bp.route('/jobs', methods=['POST'])
+def enqueue_job():
+    """
+    공유 작업 큐에 작업을 등록합니다 (dna_worker.py 프로세스가 실행).
+    JSON: {"kind": "retrain", "payload": {...}, "priority": 0, "max_attempts": 3}
+    import/export의 payload.path는 IMPORT_DIR / EXPORT_DIR 기준 상대 경로 (밖을 가리키면 400)
+    """
+    data = request.get_json(silent=True) or {}
+    kind = data.get('kind')
+    if kind not in QUEUE_KINDS:
+        return jsonify({"status": "error", "message": f"'kind' must be one of: {', '.join(sorted(QUEUE_KINDS))}"}), 400
+    payload = data.get('payload') or {}
+    if not isinstance(payload, dict):
+        return jsonify({"status": "error", "message": "'payload' must be an object"}), 400
+    if kind in PATH_ROOTS:
+        try:
+            resolve_job_path(current_app.config[PATH_ROOTS[kind]], payload.get('path'))
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+    try:
+        priority = int(data.get('priority', 0))
+        max_attempts = int(data.get('max_attempts', 3))
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "'priority' and 'max_attempts' must be integers"}), 400
+    job = current_app.job_queue.enqueue(kind, payload, priority=priority, max_attempts=max_attempts)
+    return jsonify({"status": "success", "job_id": job['job_id'], "job": job}), 202
+
+@bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """작업 상태와 카운터 (fetched, inserted, duplicates, failed). 프로세스 내 작업 → 공유 큐 순으로 조회"""
+    job = current_app.job_manager.get(job_id)
+    if job is not None:
+        return jsonify({"status": "success", "job": job.to_dict()})
+    queued = current_app.job_queue.get(job_id)
+    if queued is None:
+        return jsonify({"status": "error", "message": "Job not found"}), 404
+    return jsonify({"status": "success", "job": queued})
+
+@bp.route('/jobs/<job_id>', methods=['DELETE'])
+@bp.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """취소 요청. 실행 중인 작업은 현재 청크/배치를 저장한 뒤 멈춥니다."""
+    job = current_app.job_manager.cancel(job_id)
+    if job is not None:
+        return jsonify({"status": "success", "job": job.to_dict()}), 202
+    queued = current_app.job_queue.cancel(job_id)
+    if queued is None:
+        return jsonify({"status": "error", "message": "Job not found"}), 404
+    return jsonify({"status": "success", "job": queued}), 202
@@ -2,6 +2,10 @@ from flask import Blueprint, jsonify, request, current_app
 import uuid
 from datetime import datetime
 import sqlite3
+import os
+import shutil
+import tempfile
+from dna_app.services.sequence_normalizer import InvalidSequenceError, normalize_sequence
 
 bp = Blueprint('records', __name__)
 
@@ -18,34 +22,25 @@ def create_record():
     
     if not dna_sequence:
         return jsonify({"error": "DNA sequence is required"}), 400
+    try:
+        dna_sequence = normalize_sequence(dna_sequence)
+    except InvalidSequenceError as e:
+        return jsonify({"error": str(e)}), 400
     
     # Prediction
     prediction = current_app.ml_service.predict(dna_sequence)
     
-    record_id = str(uuid.uuid4())
-    birth_time = datetime.now()
-    
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Ensure column exists (Migration fallback)
-    try:
-        cursor.execute("SELECT record_type FROM genetic_records LIMIT 1")
-    except:
-        cursor.execute("ALTER TABLE genetic_records ADD COLUMN record_type TEXT DEFAULT 'DNA'")
-        
-    cursor.execute(
-        "INSERT INTO genetic_records (record_id, dna_sequence, birth_time, record_type) VALUES (?, ?, ?, ?)",
-        (record_id, dna_sequence, birth_time, record_type)
+    # Upsert (중복 제거 + 검색/유사도 인덱스 갱신은 DatabaseManager에서 처리)
+    record_id, is_new = current_app.db_manager.upsert_record(
+        str(uuid.uuid4()), dna_sequence, datetime.now(), record_type
     )
-    conn.commit()
-    conn.close()
     
     return jsonify({
         "record_id": record_id,
         "predicted_type": prediction["predicted_type"],
         "confidence": prediction["confidence"],
-        "record_type": record_type
+        "record_type": record_type,
+        "is_new": is_new
     }), 201
 
 @bp.route('/records', methods=['GET'])
@@ -81,7 +76,7 @@ def get_records():
     
     records = []
     for row in rows:
-        prediction = current_app.ml_service.predict(row['dna_sequence'])
+        prediction = current_app.ml_service.predict(row['dna_sequence'], persist=True)
         # Handle missing column in row if something went wrong
         r_type = row['record_type'] if 'record_type' in row.keys() else 'DNA'
         
@@ -98,23 +93,220 @@ def get_records():
 
 @bp.route('/records/fetch_samples', methods=['POST'])
 def fetch_samples():
+    """
+    NCBI 수집을 백그라운드 작업으로 제출하고 바로 202를 반환합니다.
+    진행 상황/결과는 GET /api/jobs/<job_id> (counters: fetched, inserted, duplicates, failed)
+    """
     data = request.json or {}
     count = data.get('count', 10)
     record_type = data.get('record_type', 'DNA')
     sort_by = data.get('sort', 'relevance')
-    
-    # NCBI Meta Info
-    meta_info = current_app.record_service.get_ncbi_meta(record_type=record_type)
-    
-    # Fetching logic
-    num_fetched = current_app.record_service.fetch_real_samples_from_ncbi(count=count, record_type=record_type, sort=sort_by)
-    
+    collapse = data.get('collapse_near_duplicates')  # None = 서버 설정(NEAR_DUPLICATE_COLLAPSE) 사용
+    record_service = current_app.record_service
+
+    def run(job):
+        # NCBI Meta Info
+        meta_info = record_service.get_ncbi_meta(record_type=record_type)
+        job.check_cancelled()
+        created = record_service.fetch_real_samples_from_ncbi(
+            count=count, record_type=record_type, sort=sort_by, collapse_near_duplicates=collapse, job=job
+        )
+        job.message = f"Successfully fetched {len(created)} {record_type} samples."
+        return {"added": len(created), "total_available": meta_info['total_count'], "type": record_type}
+
+    job = current_app.job_manager.submit('fetch_samples', run, count=count, record_type=record_type, sort=sort_by)
+    return jsonify({"status": "success", "job_id": job.job_id, "job": job.to_dict()}), 202
+
+@bp.route('/records/import', methods=['POST'])
+@bp.route('/records/import_fasta', methods=['POST'])
+def import_fasta():
+    """
+    FASTA / FASTA.gz 업로드(multipart 'file' 또는 요청 본문 그대로, gzip 자동 감지)를 스트리밍 파싱하며 배치 저장합니다.
+    Query: record_type=DNA|RNA, min_length=0, batch_size=1000, background=0|1
+    응답: 읽은 레코드 / 신규 / 중복 / 제외 수와 처리량
+    background=1: 업로드를 임시 파일로 받은 뒤 백그라운드 작업으로 적재하고 202 + job_id 반환
+    """
+    record_type = request.args.get('record_type', 'DNA')
+    min_length = max(request.args.get('min_length', 0, type=int), 0)
+    batch_size = max(request.args.get('batch_size', current_app.fasta_importer.DEFAULT_BATCH_SIZE, type=int), 1)
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+
+    if request.args.get('background') == '1':
+        return _submit_import_job(stream, record_type, min_length, batch_size)
+
+    try:
+        stats = current_app.fasta_importer.import_fasta(
+            stream, record_type=record_type, min_length=min_length, batch_size=batch_size
+        )
+    except (OSError, EOFError) as e:
+        return jsonify({"status": "error", "message": f"Invalid FASTA input: {e}"}), 400
+
+    print(f"[Import] {stats['records']} records ({stats['added']} new, {stats['duplicates']} duplicates) "
+          f"in {stats['elapsed_seconds']}s")
+    return jsonify({"status": "success", "type": record_type, **stats})
+
+def _submit_import_job(stream, record_type, min_length, batch_size):
+    importer = current_app.fasta_importer
+    spool = tempfile.NamedTemporaryFile(prefix='import_', suffix='.fasta', delete=False)
+    with spool:
+        shutil.copyfileobj(stream, spool, 1024 * 1024)
+
+    def run(job):
+        def progress(stats):
+            job.set(fetched=stats['records'], inserted=stats['added'], duplicates=stats['duplicates'])
+            job.check_cancelled()  # 이미 커밋된 배치는 유지
+        return importer.import_fasta(spool.name, record_type=record_type, min_length=min_length,
+                                     batch_size=batch_size, progress=progress)
+
+    def cleanup(job):
+        # 시작 전에 취소된 작업도 포함해 종료 상태마다 호출됨
+        if os.path.exists(spool.name):
+            os.remove(spool.name)
+
+    job = current_app.job_manager.submit('import', run, on_done=cleanup,
+                                         record_type=record_type, min_length=min_length)
+    return jsonify({"status": "success", "job_id": job.job_id, "job": job.to_dict()}), 202
+
+@bp.route('/records/fetch_samples/progress', methods=['GET'])
+def get_fetch_progress():
+    """진행 중이거나 마지막으로 끝난 NCBI 수집 작업의 청크별 진행 상황."""
+    return jsonify({"status": "success", "progress": current_app.record_service.fetch_progress})
+
+@bp.route('/records/harvest', methods=['POST'])
+def start_harvest():
+    """
+    재개 가능한 NCBI 수집 작업 시작 (esearch history + 페이지별 체크포인트, 백그라운드 실행).
+    JSON: {"count": 1000, "record_type": "DNA", "sort": "relevance"}
+    """
+    data = request.get_json(silent=True) or {}
+    count = data.get('count', 1000)
+    if not isinstance(count, int) or count <= 0:
+        return jsonify({"status": "error", "message": "'count' must be a positive integer"}), 400
+    job = current_app.harvest_service.start_job(
+        record_type=data.get('record_type', 'DNA'), count=count, sort=data.get('sort', 'relevance')
+    )
+    return jsonify({"status": "success", "job": job}), 202
+
+@bp.route('/records/harvest', methods=['GET'])
+def list_harvest_jobs():
+    return jsonify({"status": "success", "jobs": current_app.harvest_service.list_jobs()})
+
+@bp.route('/records/harvest/<job_id>', methods=['GET'])
+def get_harvest_job(job_id):
+    job = current_app.harvest_service.get_job(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Job not found"}), 404
+    return jsonify({"status": "success", "job": job, "running": current_app.harvest_service.is_running(job_id)})
+
+@bp.route('/records/harvest/<job_id>/resume', methods=['POST'])
+def resume_harvest_job(job_id):
+    """중단/일시정지/실패한 작업을 마지막 체크포인트부터 재개."""
+    job = current_app.harvest_service.resume_job(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Job not found"}), 404
+    return jsonify({"status": "success", "job": job}), 202
+
+@bp.route('/records/harvest/<job_id>/pause', methods=['POST'])
+def pause_harvest_job(job_id):
+    """현재 페이지 저장 후 작업을 멈춤."""
+    job = current_app.harvest_service.pause_job(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Job not found"}), 404
+    return jsonify({"status": "success", "job": job})
+
+@bp.route('/records/search', methods=['GET'])
+def search_records():
+    """소스 헤더(accession, strain, host 등) 전문 검색."""
+    query = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+
+    if not query:
+        return jsonify({"status": "error", "message": "Query parameter 'q' is required"}), 400
+
+    try:
+        results, total = current_app.db_manager.search_records(query, limit=per_page, offset=(page - 1) * per_page)
+    except sqlite3.OperationalError as e:
+        return jsonify({"status": "error", "message": f"Invalid search query: {e}"}), 400
+
+    return jsonify({
+        "status": "success",
+        "query": query,
+        "results": results,
+        "pagination": {
+            "page": page,
+            "per_page": per_page,
+            "total_results": total,
+            "total_pages": (total + per_page - 1) // per_page
+        }
+    })
+
+@bp.route('/records/motif-search', methods=['GET'])
+def search_motif():
+    """정확 모티프/프라이머 검색 (k-mer postings 교집합 후 서열 검증). 위치는 0-based."""
+    pattern = request.args.get('pattern', '').strip()
+    record_type = request.args.get('type')
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+
+    if not pattern:
+        return jsonify({"status": "error", "message": "Query parameter 'pattern' is required"}), 400
+
+    try:
+        results, total, total_exact = current_app.db_manager.search_motif(
+            pattern, limit=per_page, offset=(page - 1) * per_page, record_type=record_type
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    return jsonify({
+        "status": "success",
+        "pattern": pattern.upper().replace('U', 'T'),
+        "results": results,
+        "pagination": {
+            "page": page,
+            "per_page": per_page,
+            "total_results": total,
+            "total_exact": total_exact,  # False면 페이지를 채운 뒤 검증을 멈춘 추정값
+            "total_pages": (total + per_page - 1) // per_page
+        }
+    })
+
+@bp.route('/records/<record_id>/similar', methods=['GET'])
+def get_similar_records(record_id):
+    """MinHash/LSH 인덱스 기반 유사 서열 조회."""
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+    min_jaccard = request.args.get('min_jaccard', 0.0, type=float)
+
+    neighbors = current_app.db_manager.find_similar(record_id=record_id, limit=limit, min_jaccard=min_jaccard)
+    if neighbors is None:
+        return jsonify({"status": "error", "message": "Record not found"}), 404
+    return jsonify({"status": "success", "record_id": record_id, "neighbors": neighbors})
+
+@bp.route('/records/<record_id>/variants', methods=['GET'])
+def get_collapsed_variants(record_id):
+    """대표 서열에 병합된 근사 중복 변이 목록 (동일성 점수, diff)."""
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    variants = current_app.db_manager.get_collapsed_variants(record_id, limit=limit)
+    return jsonify({"status": "success", "representative_id": record_id, "variants": variants})
+
+@bp.route('/records/similar', methods=['GET', 'POST'])
+def get_similar_by_sequence():
+    """임의 서열(seq)과 유사한 저장 서열 조회. 긴 서열은 POST JSON {"dna_sequence": ...}로 전달."""
+    data = request.get_json(silent=True) or {}
+    seq = data.get('dna_sequence') or request.args.get('seq', '')
+    limit = min(max(request.args.get('limit', data.get('limit', 10), type=int), 1), 100)
+    min_jaccard = request.args.get('min_jaccard', data.get('min_jaccard', 0.0), type=float)
+
+    if not seq:
+        return jsonify({"status": "error", "message": "Query parameter 'seq' is required"}), 400
+
+    neighbors = current_app.db_manager.find_similar(dna_sequence=seq, limit=limit, min_jaccard=min_jaccard)
     return jsonify({
-        "status": "success", 
-        "message": f"Successfully fetched {len(num_fetched)} {record_type} samples.",
-        "added": len(num_fetched),
-        "total_available": meta_info['total_count'],
-        "type": record_type
+        "status": "success",
+        "kmer_size": current_app.db_manager.similarity_index.k,
+        "neighbors": neighbors
     })
 
 @bp.route('/records/stats', methods=['GET'])
@@ -1,9 +1,12 @@
-from flask import Blueprint, jsonify, current_app, send_file, request
+from flask import Blueprint, jsonify, current_app, send_file, request, Response, stream_with_context
 import os
 import sqlite3
 import zipfile
 import io
+import hashlib
+import tempfile
 import csv
+import zlib
 from datetime import datetime
 
 bp = Blueprint('system', __name__)
@@ -71,13 +74,32 @@ def get_status():
     status = {
         "database": "Connected",
         "ml_model": "Loaded" if current_app.ml_service.model else "Not Found",
-        "xai_service": "Ready"
+        "xai_service": "Ready",
+        # 진행 중인 파생 인덱스 백필 (비어 있으면 유사도/모티프 검색이 전체 레코드를 포함)
+        "index_backfill": current_app.db_manager.index_backfill_status()
     }
     return jsonify(status)
 
 @bp.route('/system/reset', methods=['POST'])
 def reset_system():
-    """DB 초기화 및 모델 초기화를 수행합니다."""
+    """
+    DB 초기화 및 모델 초기화를 수행합니다.
+    JSON {"snapshot": "<name>"}을 보내면 테이블을 삭제하는 대신 해당 백업 스냅샷 시점으로 DB를 복원합니다 (모델은 유지).
+    """
+    data = request.get_json(silent=True) or {}
+    if data.get('snapshot'):
+        try:
+            result = current_app.backup_manager.restore(data['snapshot'])
+        except FileNotFoundError as e:
+            return jsonify({"status": "error", "message": str(e)}), 404
+        except Exception as e:
+            return jsonify({"status": "error", "message": str(e)}), 500
+        return jsonify({
+            "status": "success",
+            "message": f"DB가 스냅샷 {result['restored']} 시점으로 복원되었습니다.",
+            **result
+        })
+
     try:
         db_path = current_app.config['DB_FILE']
         model_path = current_app.config['MODEL_FILE']
@@ -90,6 +112,14 @@ def reset_system():
         tables_to_reset = ["genetic_records", "raw_genetic_captures", "system_metadata"]
         for table in tables_to_reset:
             cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        # 근사 중복 병합 이력도 함께 초기화 (아래에서 DatabaseManager가 다시 생성)
+        cursor.execute("DROP TABLE IF EXISTS near_duplicate_collapses")
+        # NCBI 수집 작업 체크포인트 (ncbi_offset과 함께 초기화)
+        cursor.execute("DROP TABLE IF EXISTS harvest_jobs")
+        cursor.execute("DROP TABLE IF EXISTS harvest_job_uids")
+        # 파생 인덱스 (검색 FTS, 유사도 인덱스 등) 삭제 - 아래에서 DatabaseManager가 다시 생성
+        for table in current_app.db_manager.DERIVED_TABLES:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
         
         # 테이블 재생성
         cursor.execute("""
@@ -124,6 +154,9 @@ def reset_system():
         
         conn.commit()
         conn.close()
+
+        # 파생 인덱스/트리거 재생성
+        current_app.db_manager._create_table()
         
         # 2. 모델 파일 삭제 (초기 모델로 돌아가기 위해)
         if os.path.exists(model_path):
@@ -144,78 +177,303 @@ def reset_system():
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@bp.route('/system/backups', methods=['GET'])
+def list_backups():
+    """백업 스냅샷 목록 (최신순)."""
+    return jsonify({"status": "success", "snapshots": current_app.backup_manager.list_snapshots()})
+
+@bp.route('/system/backups', methods=['POST'])
+def create_backup():
+    """온라인 백업 스냅샷 생성 (쓰기를 막지 않음). JSON {"label": "..."} 선택."""
+    data = request.get_json(silent=True) or {}
+    try:
+        snapshot = current_app.backup_manager.create_snapshot(label=data.get('label'))
+        return jsonify({"status": "success", "snapshot": snapshot})
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@bp.route('/system/backups/<name>/restore', methods=['POST'])
+def restore_backup(name):
+    """스냅샷을 라이브 DB로 복원 (복원 직전 상태는 pre-restore 스냅샷으로 보존)."""
+    try:
+        result = current_app.backup_manager.restore(name)
+        return jsonify({"status": "success", **result})
+    except FileNotFoundError as e:
+        return jsonify({"status": "error", "message": str(e)}), 404
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+# Sandbox ZIP에서 제외할 패턴 (SQLite WAL/SHM, DuckDB 미러 파일 포함)
+SANDBOX_EXCLUDE_PATTERNS = ['__pycache__', '.pyc', '.pyo', '.pyd', '.so', '.egg-info',
+                            'venv', '.git', '.DS_Store', '*.log', '.cache',
+                            '*.db-wal', '*.db-shm', '*.db-journal', '*.duckdb', '*.duckdb.wal']
+
+
+def _sandbox_excluded_paths(app_config) -> set:
+    """설정된 데이터 경로 중 ZIP에서 제외할 것: 백업 폴더, ZIP 캐시, DuckDB 미러, 큐 작업 입출력 폴더, 라이브 DB (스냅샷으로 대체)."""
+    return {os.path.realpath(app_config[key])
+            for key in ('BACKUP_DIR', 'SANDBOX_CACHE_DIR', 'ANALYTICS_MIRROR_FILE', 'IMPORT_DIR', 'EXPORT_DIR', 'DB_FILE')}
+
+
+def _sandbox_manifest(sandbox_path: str, excluded_paths=(), db_file: str = None):
+    """
+    ZIP에 들어갈 파일 목록 [(arcname, path, mtime_ns, size)]과 그 해시(캐시 키)를 계산합니다.
+    db_file이 sandbox 안에 있으면 path가 None인 항목으로 넣고 (스트리밍 직전에 BackupManager 스냅샷으로 채움),
+    캐시 키에는 DB와 -wal 파일의 mtime/size를 반영합니다.
+    """
+    excluded_paths = set(excluded_paths)
+    entries = []
+    for root, dirs, files in os.walk(sandbox_path):
+        # __pycache__ 등 제외
+        dirs[:] = sorted(d for d in dirs if d not in SANDBOX_EXCLUDE_PATTERNS
+                         and os.path.realpath(os.path.join(root, d)) not in excluded_paths)
+        for file in sorted(files):
+            # 제외 패턴 체크
+            if any(pattern in file or file.endswith(pattern.replace('*', ''))
+                   for pattern in SANDBOX_EXCLUDE_PATTERNS):
+                continue
+            file_path = os.path.join(root, file)
+            if os.path.realpath(file_path) in excluded_paths:
+                continue
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                continue
+            entries.append((os.path.relpath(file_path, sandbox_path), file_path, st.st_mtime_ns, st.st_size))
+
+    if db_file and os.path.exists(db_file):
+        arcname = os.path.relpath(os.path.realpath(db_file), os.path.realpath(sandbox_path))
+        if not arcname.startswith(os.pardir):
+            stats = [os.stat(p) for p in (db_file, db_file + '-wal') if os.path.exists(p)]
+            entries.append((arcname, None, max(st.st_mtime_ns for st in stats), sum(st.st_size for st in stats)))
+
+    digest = hashlib.sha256()
+    for arcname, _, mtime_ns, size in entries:
+        digest.update(f"{arcname}\0{mtime_ns}\0{size}\n".encode('utf-8', 'surrogateescape'))
+    return entries, digest.hexdigest()[:32]
+
+
+class _TeeWriter:
+    """ZipFile 출력(순차 쓰기)을 캐시 파일에 기록하면서 응답으로 보낼 청크로도 모읍니다."""
+
+    def __init__(self, file):
+        self.file = file
+        self.chunks = []
+
+    def write(self, data) -> int:
+        self.file.write(data)
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        out = b''.join(self.chunks)
+        self.chunks.clear()
+        return out
+
+
+def _stream_sandbox_zip(entries, cache_dir: str, cache_key: str, chunk_size: int = 1024 * 1024):
+    """ZIP을 만들면서 바로 전송하고, 끝까지 완성되면 캐시 파일로 확정합니다 (중단 시 임시 파일 삭제)."""
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix='.zip.tmp', dir=cache_dir)
+    completed = False
+    try:
+        with os.fdopen(fd, 'wb') as cache_file:
+            tee = _TeeWriter(cache_file)
+            # 탐색 불가능한 출력이므로 zipfile이 data descriptor 방식으로 기록
+            with zipfile.ZipFile(tee, 'w', zipfile.ZIP_DEFLATED) as zf:
+                for arcname, file_path, _, size in entries:
+                    try:
+                        zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+                        zinfo.compress_type = zipfile.ZIP_DEFLATED
+                        with open(file_path, 'rb') as src, \
+                                zf.open(zinfo, 'w', force_zip64=size > zipfile.ZIP64_LIMIT // 2) as dst:
+                            while True:
+                                block = src.read(chunk_size)
+                                if not block:
+                                    break
+                                dst.write(block)
+                                chunk = tee.drain()
+                                if chunk:
+                                    yield chunk
+                    except OSError:
+                        continue  # 목록 작성 후 삭제된 파일 등
+                    chunk = tee.drain()
+                    if chunk:
+                        yield chunk
+            yield tee.drain()
+        os.replace(tmp_path, os.path.join(cache_dir, f'{cache_key}.zip'))
+        completed = True
+        # 이전 버전 캐시 정리
+        for name in os.listdir(cache_dir):
+            if name.endswith('.zip') and name != f'{cache_key}.zip':
+                os.remove(os.path.join(cache_dir, name))
+    finally:
+        if not completed and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
 @bp.route('/system/download/sandbox', methods=['GET'])
 def download_sandbox():
-    """Sandbox 디렉토리를 ZIP으로 다운로드 (__pycache__, .pyc 등 제외)"""
+    """
+    Sandbox 디렉토리를 ZIP으로 다운로드 (__pycache__, .pyc, 백업/캐시 폴더, DuckDB 미러, -wal/-shm 등 제외)
+    - DB는 라이브 파일 대신 BackupManager 스냅샷(일관된 단일 파일)으로 포함
+    - 생성 중인 ZIP을 청크 단위로 스트리밍 (메모리 사용량은 청크 크기로 제한)
+    - 파일 목록 (path, mtime, size)이 같으면 캐시된 ZIP을 디스크에서 그대로 전송
+    """
     try:
         sandbox_path = os.getcwd()
-        memory_file = io.BytesIO()
-        
-        # 제외할 패턴
-        exclude_patterns = ['__pycache__', '.pyc', '.pyo', '.pyd', '.so', '.egg-info', 
-                           'venv', '.git', '.DS_Store', '*.log', '.cache']
-        
-        with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zf:
-            for root, dirs, files in os.walk(sandbox_path):
-                # __pycache__ 등 제외
-                dirs[:] = [d for d in dirs if d not in exclude_patterns]
-                
-                for file in files:
-                    # 제외 패턴 체크
-                    if any(pattern in file or file.endswith(pattern.replace('*', '')) 
-                           for pattern in exclude_patterns):
-                        continue
-                    
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, sandbox_path)
-                    zf.write(file_path, arcname)
-        
-        memory_file.seek(0)
+        cache_dir = current_app.config['SANDBOX_CACHE_DIR']
+        entries, cache_key = _sandbox_manifest(sandbox_path, _sandbox_excluded_paths(current_app.config),
+                                               db_file=current_app.config['DB_FILE'])
+
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f'DNA_G_sandbox_{timestamp}.zip'
-        
-        return send_file(
-            memory_file,
+
+        cached_path = os.path.join(cache_dir, f'{cache_key}.zip')
+        if os.path.exists(cached_path):
+            return send_file(
+                cached_path,
+                mimetype='application/zip',
+                as_attachment=True,
+                download_name=filename
+            )
+
+        # 라이브 DB 파일 대신 BackupManager로 만든 일관된 스냅샷을 넣음
+        snapshot_path = None
+        for i, (arcname, file_path, mtime_ns, size) in enumerate(entries):
+            if file_path is None:
+                os.makedirs(cache_dir, exist_ok=True)
+                fd, snapshot_path = tempfile.mkstemp(suffix='.db.snapshot', dir=cache_dir)
+                os.close(fd)
+                current_app.backup_manager.snapshot_to(snapshot_path)
+                entries[i] = (arcname, snapshot_path, mtime_ns, os.path.getsize(snapshot_path))
+
+        def generate():
+            try:
+                yield from _stream_sandbox_zip(entries, cache_dir, cache_key)
+            finally:
+                if snapshot_path and os.path.exists(snapshot_path):
+                    os.remove(snapshot_path)
+
+        return Response(
+            stream_with_context(generate()),
             mimetype='application/zip',
-            as_attachment=True,
-            download_name=filename
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
         )
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @bp.route('/system/download/database', methods=['GET'])
 def download_database_csv():
-    """genetic_records 테이블을 CSV로 다운로드"""
+    """
+    genetic_records 테이블을 CSV로 스트리밍 다운로드 (읽기 스냅샷에서 배치 단위로 생성)
+    - columns=a,b: 내보낼 컬럼 (기본값: 전체)
+    - record_type=DNA|RNA, since/until=YYYY-MM-DD: birth_time 날짜 필터
+    - gzip=1: gzip으로 압축하며 전송
+    """
     try:
-        db_path = current_app.config['DB_FILE']
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # genetic_records 테이블 조회
-        cursor.execute("SELECT * FROM genetic_records")
-        rows = cursor.fetchall()
-        columns = [description[0] for description in cursor.description]
-        conn.close()
-        
-        # CSV 생성
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(columns)  # 헤더
-        writer.writerows(rows)    # 데이터
-        
-        # BytesIO로 변환
-        mem = io.BytesIO()
-        mem.write(output.getvalue().encode('utf-8-sig'))  # BOM 추가 (Excel 호환)
-        mem.seek(0)
-        
+        db = current_app.db_manager
+        with db.read_snapshot() as conn:
+            all_columns = [r[1] for r in conn.execute("PRAGMA table_info(genetic_records)").fetchall()]
+
+        requested = request.args.get('columns')
+        columns = [c.strip() for c in requested.split(',') if c.strip()] if requested else all_columns
+        unknown = [c for c in columns if c not in all_columns]
+        if unknown:
+            return jsonify({"status": "error", "message": f"Unknown columns: {', '.join(unknown)}"}), 400
+
+        conditions, params = [], []
+        record_type = request.args.get('record_type')
+        if record_type:
+            conditions.append("record_type = ?")
+            params.append(record_type)
+        for arg, op in (('since', '>='), ('until', '<=')):
+            value = request.args.get(arg)
+            if value:
+                try:
+                    # '2024-3-1'도 허용되므로 문자열 비교를 위해 0을 채운 형식으로 맞춤
+                    value = datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d')
+                except ValueError:
+                    return jsonify({"status": "error", "message": f"'{arg}' must be YYYY-MM-DD"}), 400
+                # birth_time은 'YYYY-MM-DD HH:MM:SS' / ISO 'T' 형식이 섞여 있어 날짜 부분만 비교
+                conditions.append(f"substr(birth_time, 1, 10) {op} ?")
+                params.append(value)
+
+        query = f"SELECT {', '.join(columns)} FROM genetic_records"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        use_gzip = request.args.get('gzip', '0').lower() in ('1', 'true', 'yes')
+
+        def generate():
+            compressor = zlib.compressobj(wbits=31) if use_gzip else None  # wbits=31: gzip 헤더
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            buffer.write('\ufeff')  # BOM (Excel 호환)
+            writer.writerow(columns)
+
+            with db.read_snapshot() as conn:
+                cursor = conn.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(1000)
+                    if rows:
+                        writer.writerows(rows)
+                    chunk = buffer.getvalue().encode('utf-8')
+                    buffer.seek(0)
+                    buffer.truncate()
+                    if compressor:
+                        chunk = compressor.compress(chunk)
+                    if chunk:
+                        yield chunk
+                    if not rows:
+                        break
+            if compressor:
+                yield compressor.flush()
+
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'DNA_G_database_{timestamp}.csv'
-        
-        return send_file(
-            mem,
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=filename
+        filename = f'DNA_G_database_{timestamp}.csv' + ('.gz' if use_gzip else '')
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype='application/gzip' if use_gzip else 'text/csv',
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
         )
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
+
+@bp.route('/system/download/parquet', methods=['GET'])
+def download_database_arrow():
+    """
+    genetic_records를 Parquet 또는 Arrow IPC 스트림으로 다운로드 (pyarrow 필요)
+    - format=parquet|arrow, include=metadata,predictions, record_type=DNA|RNA, batch_size=행/row group
+    """
+    from dna_app.services import export_service
+    from .analysis import parse_metadata
+
+    if not export_service.is_available():
+        return jsonify({"status": "error", "message": "pyarrow is not installed on the server"}), 501
+
+    fmt = request.args.get('format', 'parquet').lower()
+    if fmt not in export_service.FORMATS:
+        return jsonify({"status": "error", "message": f"format must be one of {export_service.FORMATS}"}), 400
+    include = [i.strip() for i in request.args.get('include', '').split(',') if i.strip()]
+    unknown = [i for i in include if i not in export_service.INCLUDES]
+    if unknown:
+        return jsonify({"status": "error", "message": f"Unknown include: {', '.join(unknown)}"}), 400
+    batch_size = min(max(request.args.get('batch_size', 10000, type=int), 100), 100000)
+
+    exporter = export_service.ArrowExporter(
+        current_app.db_manager, metadata_parser=parse_metadata, ml_service=current_app.ml_service
+    )
+    stream = exporter.stream(fmt, include=include, record_type=request.args.get('record_type'),
+                             batch_size=batch_size)
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    filename = f"DNA_G_database_{timestamp}.{'parquet' if fmt == 'parquet' else 'arrows'}"
+    return Response(
+        stream_with_context(stream),
+        mimetype='application/vnd.apache.parquet' if fmt == 'parquet' else 'application/vnd.apache.arrow.stream',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
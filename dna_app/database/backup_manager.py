@@ -0,0 +1,130 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+class BackupManager:
+    """
+    sqlite3 backup API 기반 온라인 백업 / 시점 스냅샷.
+    - 읽기 전용 커넥션에서 하나의 읽기 트랜잭션(WAL 스냅샷)을 잡고 pages_per_step 페이지씩 복사
+      → 쓰기는 계속 진행되고, 스냅샷은 백업 시작 시점의 일관된 상태
+    - backup_dir에 genetics_YYYYmmdd_HHMMSS[_label].db 로 저장, 최근 keep개만 유지
+    - restore(): 스냅샷을 라이브 DB 쓰기 커넥션으로 역방향 backup (복원 전 현재 상태를 pre-restore 스냅샷으로 보존)
+      → 한 단계(pages=-1)로 복사해 DB 쓰기 락을 끝까지 유지, 다른 프로세스의 쓰기가 복원 중간에 끼어들지 않음
+    """
+    NAME_PATTERN = re.compile(r'^genetics_\d{8}_\d{6}(?:_[a-z0-9-]+)?\.db$')
+
+    def __init__(self, db_manager, backup_dir: str, keep: int = 5, pages_per_step: int = 256,
+                 step_sleep: float = 0.005):
+        self.db_manager = db_manager
+        self.backup_dir = backup_dir
+        self.keep = keep
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+        self._lock = threading.Lock()
+        self._scheduler = None
+        os.makedirs(self.backup_dir, exist_ok=True)
+
+    # ========== Snapshot ==========
+    def _info(self, name: str) -> Dict:
+        path = os.path.join(self.backup_dir, name)
+        st = os.stat(path)
+        return {
+            'name': name,
+            'size_bytes': st.st_size,
+            'created_at': datetime.fromtimestamp(st.st_mtime).isoformat(timespec='seconds')
+        }
+
+    def list_snapshots(self) -> List[Dict]:
+        """최신순 스냅샷 목록."""
+        names = [n for n in os.listdir(self.backup_dir) if self.NAME_PATTERN.match(n)]
+        return [self._info(n) for n in sorted(names, reverse=True)]
+
+    def create_snapshot(self, label: Optional[str] = None, rotate: bool = True) -> Dict:
+        """현재 DB의 일관된 스냅샷을 만듭니다. 반환: 스냅샷 정보 (+ 소요 시간, 복사 단계 수)"""
+        suffix = f"_{re.sub(r'[^a-z0-9-]', '-', label.lower())}" if label else ''
+        with self._lock:
+            name = f"genetics_{datetime.now().strftime('%Y%m%d_%H%M%S')}{suffix}.db"
+            path = os.path.join(self.backup_dir, name)
+            started = time.time()
+            steps = self.snapshot_to(path)
+            if rotate:
+                self._rotate()
+
+        info = self._info(name)
+        info.update({'elapsed_seconds': round(time.time() - started, 3), 'steps': steps})
+        print(f"[Backup] Snapshot {name} ({info['size_bytes']} bytes, {steps} steps, {info['elapsed_seconds']}s)")
+        return info
+
+    def snapshot_to(self, path: str) -> int:
+        """현재 DB의 일관된 사본을 path에 만듭니다 (백업 목록/로테이션과 무관). 반환: 복사 단계 수"""
+        tmp_path = path + '.tmp'
+        steps = 0
+
+        def progress(status, remaining, total):
+            nonlocal steps
+            steps += 1
+
+        src = self.db_manager.open_reader()
+        dst = sqlite3.connect(tmp_path)
+        try:
+            # 읽기 트랜잭션을 유지해 모든 단계가 같은 WAL 스냅샷을 복사 (다른 커넥션의 쓰기로 재시작되지 않음)
+            src.execute("BEGIN")
+            src.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            src.backup(dst, pages=self.pages_per_step, progress=progress, sleep=self.step_sleep)
+            src.execute("COMMIT")
+            # 스냅샷은 단일 파일로 보관
+            dst.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            dst.close()
+            src.close()
+        os.replace(tmp_path, path)
+        return steps
+
+    def _rotate(self):
+        names = sorted((n for n in os.listdir(self.backup_dir) if self.NAME_PATTERN.match(n)), reverse=True)
+        for name in names[self.keep:]:
+            os.remove(os.path.join(self.backup_dir, name))
+
+    # ========== Restore ==========
+    def restore(self, name: str) -> Dict:
+        """스냅샷을 라이브 DB로 복원합니다. 복원 직전 상태는 'pre-restore' 스냅샷으로 남깁니다."""
+        if not self.NAME_PATTERN.match(name or '') or not os.path.exists(os.path.join(self.backup_dir, name)):
+            raise FileNotFoundError(f"Snapshot not found: {name}")
+
+        # 복원할 스냅샷이 로테이션으로 지워지지 않도록 복원 후에 정리
+        safety = self.create_snapshot(label='pre-restore', rotate=False)
+        # 쓰기 락: 복원 중에 다른 스레드가 같은 커넥션으로 쓰거나 커밋하지 않도록
+        with self._lock, self.db_manager._write_lock:
+            src = sqlite3.connect(f"file:{os.path.join(self.backup_dir, name)}?mode=ro", uri=True)
+            try:
+                self.db_manager.conn.commit()
+                # 여러 단계로 나누면 단계 사이에 락이 풀려 다른 프로세스(dna_worker 등)가 반쯤 복원된 DB에 쓸 수 있음
+                src.backup(self.db_manager.conn, pages=-1, sleep=self.step_sleep)
+            finally:
+                src.close()
+            self._rotate()
+        print(f"[Backup] Restored snapshot {name}")
+        return {'restored': name, 'pre_restore_snapshot': safety['name']}
+
+    # ========== Schedule ==========
+    def start_scheduler(self, interval_minutes: int):
+        """interval_minutes마다 백그라운드에서 스냅샷을 만듭니다 (0 이하면 비활성)."""
+        if interval_minutes <= 0 or self._scheduler:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval_minutes * 60)
+                try:
+                    self.create_snapshot(label='auto')
+                except Exception as e:
+                    print(f"[Backup] Scheduled snapshot failed: {e}")
+
+        self._scheduler = threading.Thread(target=run, daemon=True)
+        self._scheduler.start()
+        print(f"[Backup] Scheduled snapshots every {interval_minutes} min (keep {self.keep})")
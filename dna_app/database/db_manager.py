@@ -1,7 +1,19 @@
 # filename: dna_app/database/db_manager.py
+import json
+import os
+import queue
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 from typing import List, Tuple, Optional
+from urllib.parse import quote
+import numpy as np
+from .similarity_index import SimilarityIndex
+from .motif_index import MotifIndex
+from .feature_store import FeatureStore, feature_dim, sequence_hash
+from dna_app.services.sequence_normalizer import ambiguity_stats, normalize_sequence, try_normalize
 
 class DatabaseManager:
     """
@@ -9,14 +21,107 @@ class DatabaseManager:
     - 데이터베이스 연결
     - 테이블 생성
     - CRUD 작업 처리
+    - 분석용 읽기 전용 커넥션 풀 (WAL 스냅샷)
+    - 파생 인덱스 (FTS 검색, MinHash/LSH 유사도, k-mer 모티프 postings, ML 특징 벡터)
     """
-    def __init__(self, db_path: str):
+    # 원본 테이블에서 다시 만들 수 있는 파생 인덱스 테이블 (공장 초기화 시 함께 삭제)
+    DERIVED_TABLES = ["capture_headers_fts", "sequence_signatures", "lsh_buckets", "kmer_postings", "sequence_features"]
+    DEFAULT_NEAR_DUPLICATE_IDENTITY = 0.98
+    BACKFILL_BATCH = 200
+
+    def __init__(self, db_path: str, read_pool_size: int = 4, near_duplicate_identity: Optional[float] = None):
         self.db_path = db_path
+        # 설정 시 upsert에서 동일성 임계값 이상인 근사 중복을 기존 대표 서열에 병합 (None = 비활성)
+        self.near_duplicate_identity = near_duplicate_identity
         self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.similarity_index = SimilarityIndex(self.conn)
+        self.motif_index = MotifIndex(self.conn)
+        self.feature_store = FeatureStore(self.conn)
+        # 새로 만든 파생 인덱스의 기존 레코드 색인 (start_index_backfill()로 백그라운드 실행)
+        self._backfill_thread = None
+        self._backfill_stop = threading.Event()
+        # 같은 쓰기 커넥션을 쓰는 스레드(요청, 백그라운드 수집) 간 트랜잭션이 섞이지 않도록 직렬화
+        # (self.conn에 쓰는 모든 경로는 이 락 안에서 커밋: execute_write / transaction / set_metadata)
+        self._write_lock = threading.RLock()
+        self._enable_wal()
         self._create_table()
+        # 읽기 전용 커넥션 풀 (분석용 장시간 스캔이 쓰기 커넥션을 막지 않도록 분리)
+        self._read_pool = queue.LifoQueue(maxsize=read_pool_size)
+        # 테이블 행 수 캐시 (PRAGMA data_version이 바뀌면 무효화)
+        self._count_lock = threading.Lock()
+        self._count_watch = None
+        self._count_version = None
+        self._count_cache = {}
         print(f"Database initialized and connected at '{self.db_path}'")
 
+    def _enable_wal(self):
+        """WAL 모드를 켭니다. 읽기 트랜잭션이 쓰기와 동시에 진행될 수 있습니다."""
+        try:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.Error as e:
+            print(f"WAL mode not enabled: {e}")
+
+    def open_reader(self) -> sqlite3.Connection:
+        """`file:...?mode=ro` URI로 읽기 전용 커넥션을 엽니다."""
+        uri = f"file:{quote(os.path.abspath(self.db_path))}?mode=ro"
+        # isolation_level=None: 트랜잭션 경계를 read_snapshot()에서 직접 관리
+        return sqlite3.connect(uri, uri=True, check_same_thread=False, isolation_level=None)
+
+    @contextmanager
+    def read_snapshot(self):
+        """
+        읽기 전용 커넥션에서 하나의 읽기 트랜잭션을 엽니다.
+        블록 안의 모든 쿼리는 동일한 스냅샷을 보며, 그동안 쓰기(NCBI 수집 등)는 계속 진행됩니다.
+
+            with db_manager.read_snapshot() as conn:
+                conn.execute("SELECT ...")
+        """
+        try:
+            conn = self._read_pool.get_nowait()
+        except queue.Empty:
+            conn = self.open_reader()
+
+        healthy = True
+        try:
+            conn.execute("BEGIN")
+            yield conn
+        finally:
+            try:
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                healthy = False
+            if healthy:
+                try:
+                    self._read_pool.put_nowait(conn)
+                except queue.Full:
+                    conn.close()
+            else:
+                conn.close()
+
+    def count_rows(self, table_name: str) -> int:
+        """
+        테이블 행 수를 캐시에서 반환합니다 (호출자가 테이블 이름을 검증해야 함).
+        어느 커넥션에서든 커밋이 일어나면 감시 커넥션의 PRAGMA data_version이 바뀌어 캐시 전체가 무효화됩니다.
+        """
+        with self._count_lock:
+            if self._count_watch is None:
+                self._count_watch = self.open_reader()
+            version = self._count_watch.execute("PRAGMA data_version").fetchone()[0]
+            if version != self._count_version:
+                self._count_cache.clear()
+                self._count_version = version
+            if table_name not in self._count_cache:
+                self._count_cache[table_name] = self._count_watch.execute(
+                    f'SELECT COUNT(*) FROM "{table_name}"'
+                ).fetchone()[0]
+            return self._count_cache[table_name]
+
     def _create_table(self):
+        """스키마 생성/마이그레이션을 쓰기 락 안에서 실행합니다 (초기화 리셋에서도 호출)."""
+        with self._write_lock:
+            self._create_schema()
+
+    def _create_schema(self):
         """genetic_records 테이블이 없으면 생성합니다."""
         cursor = self.conn.cursor()
         # Migration: Check if column exists, if not, recreate or alter (For simplicity in this sandbox, we stick to IF NOT EXISTS)
@@ -70,6 +175,19 @@ class DatabaseManager:
             cursor.execute("ALTER TABLE genetic_records ADD COLUMN source_metadata TEXT DEFAULT '[]'")
         except:
             pass # Already exists
+
+        # 정규화 단계에서 기록하는 모호 염기 통계 (기존 행은 서열을 표준형으로 바꾸며 함께 채움)
+        try:
+            cursor.execute("ALTER TABLE genetic_records ADD COLUMN ambiguous_bases INTEGER DEFAULT 0")
+            cursor.execute("ALTER TABLE genetic_records ADD COLUMN n_bases INTEGER DEFAULT 0")
+        except sqlite3.OperationalError:
+            pass # Already exists
+
+        # 정확 중복 판정 키: 표준형 서열의 sha1 (sequence_features와 같은 해시, 40자 고정 폭)
+        try:
+            cursor.execute("ALTER TABLE genetic_records ADD COLUMN seq_hash TEXT")
+        except sqlite3.OperationalError:
+            pass # Already exists
         
         try:
              cursor.execute("SELECT capture_id FROM raw_genetic_captures LIMIT 1")
@@ -96,46 +214,500 @@ class DatabaseManager:
         except:
             pass # Already exists
 
+        # 근사 중복 병합 이력 (어떤 캡처가 어느 대표 서열에 어떤 동일성으로 병합되었는지)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS near_duplicate_collapses (
+                capture_id TEXT PRIMARY KEY,
+                representative_id TEXT NOT NULL,
+                identity REAL NOT NULL,
+                diff TEXT,
+                collapsed_at TEXT NOT NULL,
+                FOREIGN KEY(capture_id) REFERENCES raw_genetic_captures(capture_id),
+                FOREIGN KEY(representative_id) REFERENCES genetic_records(record_id)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_near_duplicate_representative ON near_duplicate_collapses(representative_id)")
+
+        # NCBI 수집 작업 (고정한 결과 집합의 크기(pinned_count)와 재개 지점 체크포인트)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS harvest_jobs (
+                job_id TEXT PRIMARY KEY,
+                record_type TEXT NOT NULL,
+                term TEXT NOT NULL,
+                sort TEXT,
+                webenv TEXT,
+                query_key TEXT,
+                total_count INTEGER DEFAULT 0,
+                target_count INTEGER NOT NULL,
+                next_retstart INTEGER DEFAULT 0,
+                added INTEGER DEFAULT 0,
+                duplicates INTEGER DEFAULT 0,
+                status TEXT NOT NULL,
+                error TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                pinned_count INTEGER,
+                owner TEXT,
+                lease_expires_at REAL
+            )
+        """)
+        # pinned_count: 고정한 UID 수, owner/lease_expires_at: 실행 중인 프로세스와 임대 만료 시각 (epoch 초)
+        # added/duplicates: 새로 저장된 레코드 수 / 이미 있던 서열이라 병합된 레코드 수
+        for column in ("pinned_count INTEGER", "owner TEXT", "lease_expires_at REAL", "duplicates INTEGER DEFAULT 0"):
+            try:
+                cursor.execute(f"ALTER TABLE harvest_jobs ADD COLUMN {column}")
+            except sqlite3.OperationalError:
+                pass # Already exists
+        # 작업 생성 시 고정한 UID 목록 (position 순서대로 efetch → 재시작/재개해도 같은 결과 집합)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS harvest_job_uids (
+                job_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                uid TEXT NOT NULL,
+                PRIMARY KEY (job_id, position)
+            ) WITHOUT ROWID
+        """)
+
+        # 다중 프로세스 작업 큐 (임대(lease) + 하트비트, 만료된 임대는 다른 워커가 다시 가져감)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS job_queue (
+                job_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL DEFAULT '{}',
+                state TEXT NOT NULL DEFAULT 'queued',
+                priority INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL DEFAULT 3,
+                run_after REAL NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_expires_at REAL,
+                heartbeat_at REAL,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                progress TEXT,
+                result TEXT,
+                error TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_job_queue_claim ON job_queue(state, priority, created_at)")
+
+        self._create_search_index(cursor)
+        for index_name, index in self._backfilled_indexes().items():
+            if index.create_schema(cursor):
+                self._schedule_backfill(cursor, index_name)
+        self.feature_store.create_schema(cursor)
+
+        # 기존 행을 표준형으로 바꾸고 같은 서열이 된 행을 병합 (한 번만, 이전 버전에서 이미 정규화된 DB 포함,
+        # 참조 테이블과 파생 인덱스가 모두 만들어진 뒤에 실행)
+        canonical_pending = cursor.execute(
+            "SELECT 1 FROM system_metadata WHERE key = 'migration:canonical_merge'").fetchone() is None
+        seq_hash_indexed = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='index' AND name='idx_genetic_records_seq_hash'").fetchone() is not None
+        if canonical_pending:
+            # 표준형으로 바꾸는 동안 잠시 같은 해시가 둘 이상 생길 수 있으므로 유니크 인덱스는 병합 후 다시 생성
+            cursor.execute("DROP INDEX IF EXISTS idx_genetic_records_seq_hash")
+            self._canonicalize_existing(cursor)
+            self._canonicalize_captures(cursor)
+        self._fill_sequence_hashes(cursor)
+        if canonical_pending or not seq_hash_indexed:
+            self._merge_canonical_duplicates(cursor)
+        if canonical_pending:
+            cursor.execute("INSERT OR REPLACE INTO system_metadata (key, value) VALUES ('migration:canonical_merge', ?)",
+                           (datetime.now().isoformat(),))
+        # 정확 중복 확인은 고정 폭 seq_hash 유니크 인덱스로 (서열 전체를 키로 하는 B-tree는 서열 길이만큼 커짐)
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_genetic_records_seq_hash ON genetic_records(seq_hash)")
+        cursor.execute("DROP INDEX IF EXISTS idx_genetic_records_sequence")
+
         self.conn.commit()
 
-    def upsert_record(self, record_id: str, dna_sequence: str, birth_time: datetime, record_type: str = 'DNA', source_info: str = ""):
+    # ========== Derived Index Backfill ==========
+    def _backfilled_indexes(self) -> dict:
+        """레코드별로 색인되는 파생 인덱스 (테이블이 새로 생기면 기존 레코드를 백그라운드로 채움)."""
+        return {'sequence_signatures': self.similarity_index, 'kmer_postings': self.motif_index}
+
+    def _schedule_backfill(self, cursor, index_name: str):
+        """
+        인덱스를 만든 시점까지의 레코드(rowid <= until)를 백필 대상으로 기록합니다.
+        이후에 들어오는 레코드는 upsert에서 바로 색인되므로 범위가 늘어나지 않습니다.
+        """
+        until = cursor.execute("SELECT COALESCE(MAX(rowid), 0) FROM genetic_records").fetchone()[0]
+        if until:
+            cursor.execute("INSERT OR REPLACE INTO system_metadata (key, value) VALUES (?, ?)",
+                           (f"backfill:{index_name}", json.dumps({'last_rowid': 0, 'until': until})))
+
+    def index_backfill_status(self) -> dict:
+        """진행 중인 백필: {인덱스 이름: {'last_rowid', 'until'}} (없으면 빈 dict = 모든 인덱스 완료)."""
+        with self.read_snapshot() as conn:
+            rows = conn.execute("SELECT key, value FROM system_metadata WHERE key LIKE 'backfill:%'").fetchall()
+        return {key.split(':', 1)[1]: json.loads(value) for key, value in rows}
+
+    def run_index_backfill(self, batch_size: int = BACKFILL_BATCH, stop_event: Optional[threading.Event] = None) -> dict:
+        """
+        대기 중인 백필을 batch_size개 레코드씩 처리합니다.
+        - 읽기 스냅샷에서 배치를 읽고, 서명/postings 계산은 쓰기 락 밖에서 수행
+        - 배치의 INSERT와 체크포인트(last_rowid)를 같은 트랜잭션으로 커밋 → 재시작하면 이어서 진행
+        반환: {인덱스 이름: 색인한 레코드 수}
+        """
+        indexes = self._backfilled_indexes()
+        done = {}
+        for index_name, state in self.index_backfill_status().items():
+            index = indexes.get(index_name)
+            if index is None:
+                continue
+            key = f"backfill:{index_name}"
+            last_rowid, until = state['last_rowid'], state['until']
+            done[index_name] = 0
+            started = time.time()
+            while not (stop_event and stop_event.is_set()):
+                with self.read_snapshot() as conn:
+                    rows = conn.execute(
+                        "SELECT rowid, record_id, dna_sequence FROM genetic_records WHERE rowid > ? AND rowid <= ? "
+                        "ORDER BY rowid LIMIT ?", (last_rowid, until, batch_size)
+                    ).fetchall()
+                prepared = [(rowid, record_id, index.prepare(seq)) for rowid, record_id, seq in rows]
+                last_rowid = rows[-1][0] if rows else until
+                with self.transaction() as cursor:
+                    for rowid, record_id, data in prepared:
+                        index.store(cursor, rowid if index.KEYED_ON_ROWID else record_id, data)
+                    if last_rowid >= until:
+                        cursor.execute("DELETE FROM system_metadata WHERE key = ?", (key,))
+                    else:
+                        cursor.execute("UPDATE system_metadata SET value = ? WHERE key = ?",
+                                       (json.dumps({'last_rowid': last_rowid, 'until': until}), key))
+                done[index_name] += len(rows)
+                if last_rowid >= until:
+                    print(f"[DB] Backfilled {index_name}: {done[index_name]} records in {time.time() - started:.1f}s")
+                    break
+        return done
+
+    def start_index_backfill(self, batch_size: int = BACKFILL_BATCH):
+        """대기 중인 백필이 있으면 백그라운드 스레드에서 실행합니다 (시작/요청을 막지 않음)."""
+        if not self.index_backfill_status() or (self._backfill_thread and self._backfill_thread.is_alive()):
+            return
+
+        def run():
+            try:
+                self.run_index_backfill(batch_size, stop_event=self._backfill_stop)
+            except Exception as e:
+                print(f"[DB] Index backfill stopped: {e}")
+
+        self._backfill_thread = threading.Thread(target=run, daemon=True, name='index-backfill')
+        self._backfill_thread.start()
+        print(f"[DB] Index backfill started: {', '.join(self.index_backfill_status())}")
+
+    def _canonicalize_existing(self, cursor, batch_size: int = 1000):
+        """
+        정규화 도입 전에 저장된 행을 표준형(대문자, U→T)으로 바꾸고 모호 염기 통계와 seq_hash를 채웁니다.
+        rowid 범위로 batch_size개씩 읽고 바꾸므로 메모리는 배치 크기로 제한됩니다.
+        """
+        last_rowid, total = 0, 0
+        while True:
+            rows = cursor.execute(
+                "SELECT rowid, record_id, dna_sequence FROM genetic_records WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last_rowid, batch_size)
+            ).fetchall()
+            if not rows:
+                break
+            updates = []
+            for _, record_id, seq in rows:
+                canonical_seq = try_normalize(seq) or (seq or '').upper().replace('U', 'T')
+                stats = ambiguity_stats(canonical_seq)
+                updates.append((canonical_seq, stats['ambiguous_bases'], stats['n_bases'], sequence_hash(canonical_seq), record_id))
+            cursor.executemany(
+                "UPDATE genetic_records SET dna_sequence = ?, ambiguous_bases = ?, n_bases = ?, seq_hash = ? WHERE record_id = ?",
+                updates
+            )
+            last_rowid = rows[-1][0]
+            total += len(rows)
+        if total:
+            print(f"[DB] Canonicalized {total} existing sequences")
+
+    def _fill_sequence_hashes(self, cursor, batch_size: int = 1000):
+        """seq_hash 컬럼 도입 전에 저장된 행의 해시를 채웁니다."""
+        filled = 0
+        while True:
+            rows = cursor.execute(
+                "SELECT record_id, dna_sequence FROM genetic_records WHERE seq_hash IS NULL LIMIT ?", (batch_size,)
+            ).fetchall()
+            if not rows:
+                break
+            cursor.executemany("UPDATE genetic_records SET seq_hash = ? WHERE record_id = ?",
+                               [(sequence_hash(seq), record_id) for record_id, seq in rows])
+            filled += len(rows)
+        if filled:
+            print(f"[DB] Filled seq_hash for {filled} records")
+
+    def _canonicalize_captures(self, cursor, batch_size: int = 1000):
+        """정규화 도입 전의 raw_genetic_captures 서열도 새 캡처와 같은 표준형으로 바꿉니다 (연결 record_id는 그대로)."""
+        last_rowid, changed = 0, 0
+        while True:
+            rows = cursor.execute(
+                "SELECT rowid, capture_id, dna_sequence FROM raw_genetic_captures WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last_rowid, batch_size)
+            ).fetchall()
+            if not rows:
+                break
+            updates = []
+            for _, capture_id, seq in rows:
+                canonical_seq = try_normalize(seq) or (seq or '').upper().replace('U', 'T')
+                if canonical_seq != seq:
+                    updates.append((canonical_seq, capture_id))
+            cursor.executemany("UPDATE raw_genetic_captures SET dna_sequence = ? WHERE capture_id = ?", updates)
+            last_rowid = rows[-1][0]
+            changed += len(updates)
+        if changed:
+            print(f"[DB] Canonicalized {changed} raw captures")
+
+    def _merge_canonical_duplicates(self, cursor):
+        """
+        정규화 후 같은 서열(seq_hash)이 된 genetic_records 행을 하나로 합칩니다.
+        - 가장 먼저 들어온 행(rowid 최소)을 남기고 occurrence_count 합산, source_metadata 이어 붙임(최신 50개),
+          birth_time은 가장 최근 값 (upsert 중복 처리와 같은 규칙)
+        - raw_genetic_captures.linked_record_id, near_duplicate_collapses.representative_id를 남은 행으로 변경
+          (capture_headers_fts는 UPDATE 트리거가 갱신)
+        - 지운 행의 서명/LSH 버킷/k-mer postings 삭제. 남은 행의 색인은 그대로 유효:
+          k-mer 코드와 특징 저장소 키(표준형 서열 해시)는 대소문자/U→T 정규화 전후가 같음
+        - 컬럼형 미러와 행 수 캐시는 data_version 변경으로 다시 만들어짐
+        """
+        groups = cursor.execute(
+            "SELECT seq_hash FROM genetic_records GROUP BY seq_hash HAVING COUNT(*) > 1"
+        ).fetchall()
+        if not groups:
+            return
+        tables = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        postings_by_rowid = 'kmer_postings' in tables and 'record_rowid' in {
+            row[1] for row in cursor.execute("PRAGMA table_info(kmer_postings)")}
+        removed = 0
+        for (seq_hash,) in groups:
+            rows = cursor.execute(
+                "SELECT rowid, record_id, occurrence_count, source_metadata, birth_time FROM genetic_records "
+                "WHERE seq_hash = ? ORDER BY rowid", (seq_hash,)
+            ).fetchall()
+            keep_id = rows[0][1]
+            extra_ids = [r[1] for r in rows[1:]]
+            meta = []
+            for r in rows:
+                try:
+                    meta.extend(json.loads(r[3]) if r[3] else [])
+                except ValueError:
+                    pass
+            cursor.execute(
+                "UPDATE genetic_records SET occurrence_count = ?, source_metadata = ?, birth_time = ? WHERE record_id = ?",
+                (sum(r[2] or 1 for r in rows), json.dumps(meta[-50:]), max(str(r[4]) for r in rows), keep_id)
+            )
+            placeholders = ', '.join('?' * len(extra_ids))
+            cursor.execute(f"UPDATE raw_genetic_captures SET linked_record_id = ? WHERE linked_record_id IN ({placeholders})",
+                           [keep_id] + extra_ids)
+            cursor.execute(f"UPDATE near_duplicate_collapses SET representative_id = ? WHERE representative_id IN ({placeholders})",
+                           [keep_id] + extra_ids)
+            if 'sequence_signatures' in tables:
+                cursor.execute(f"DELETE FROM sequence_signatures WHERE record_id IN ({placeholders})", extra_ids)
+                cursor.execute(f"DELETE FROM lsh_buckets WHERE record_id IN ({placeholders})", extra_ids)
+            if postings_by_rowid:
+                cursor.execute(f"DELETE FROM kmer_postings WHERE record_rowid IN ({placeholders})", [r[0] for r in rows[1:]])
+            cursor.execute(f"DELETE FROM genetic_records WHERE record_id IN ({placeholders})", extra_ids)
+            removed += len(extra_ids)
+        print(f"[DB] Merged {removed} rows into {len(groups)} canonical sequences")
+
+    def _create_search_index(self, cursor):
+        """
+        FTS5 전문 검색 테이블과 동기화 트리거를 생성합니다.
+        - capture_headers_fts: raw_genetic_captures.source_info (NCBI 헤더: accession, strain, host ...)
+        - documents_fts: user_documents.title / content
+        테이블이 새로 만들어진 경우 기존 데이터를 한 번 채웁니다.
+        """
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name IN ('capture_headers_fts', 'documents_fts')")
+        existing = {row[0] for row in cursor.fetchall()}
+
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS capture_headers_fts USING fts5(
+                source_info, capture_id UNINDEXED, linked_record_id UNINDEXED
+            )
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS capture_headers_fts_ai AFTER INSERT ON raw_genetic_captures
+            WHEN new.source_info IS NOT NULL AND new.source_info != ''
+            BEGIN
+                INSERT INTO capture_headers_fts (source_info, capture_id, linked_record_id)
+                VALUES (new.source_info, new.capture_id, new.linked_record_id);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS capture_headers_fts_ad AFTER DELETE ON raw_genetic_captures
+            BEGIN
+                DELETE FROM capture_headers_fts WHERE capture_id = old.capture_id;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS capture_headers_fts_au AFTER UPDATE OF source_info, linked_record_id ON raw_genetic_captures
+            BEGIN
+                DELETE FROM capture_headers_fts WHERE capture_id = old.capture_id;
+                INSERT INTO capture_headers_fts (source_info, capture_id, linked_record_id)
+                SELECT new.source_info, new.capture_id, new.linked_record_id
+                WHERE new.source_info IS NOT NULL AND new.source_info != '';
+            END
+        """)
+
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+                title, content, doc_id UNINDEXED
+            )
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS documents_fts_ai AFTER INSERT ON user_documents
+            BEGIN
+                INSERT INTO documents_fts (title, content, doc_id) VALUES (new.title, new.content, new.doc_id);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS documents_fts_ad AFTER DELETE ON user_documents
+            BEGIN
+                DELETE FROM documents_fts WHERE doc_id = old.doc_id;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS documents_fts_au AFTER UPDATE OF title, content ON user_documents
+            BEGIN
+                DELETE FROM documents_fts WHERE doc_id = old.doc_id;
+                INSERT INTO documents_fts (title, content, doc_id) VALUES (new.title, new.content, new.doc_id);
+            END
+        """)
+
+        # Backfill (최초 생성 시에만)
+        if 'capture_headers_fts' not in existing:
+            cursor.execute("""
+                INSERT INTO capture_headers_fts (source_info, capture_id, linked_record_id)
+                SELECT source_info, capture_id, linked_record_id FROM raw_genetic_captures
+                WHERE source_info IS NOT NULL AND source_info != ''
+            """)
+        if 'documents_fts' not in existing:
+            cursor.execute("""
+                INSERT INTO documents_fts (title, content, doc_id)
+                SELECT title, content, doc_id FROM user_documents
+            """)
+
+    @staticmethod
+    def _fts_query(text: str) -> str:
+        """사용자 입력을 FTS5 MATCH 식으로 변환합니다 (토큰별 구문 검색, 끝의 '*'는 접두 검색)."""
+        terms = []
+        for token in text.split():
+            prefix = token.endswith('*')
+            token = token.rstrip('*').replace('"', '""')
+            if token:
+                terms.append(f'"{token}"' + ('*' if prefix else ''))
+        return ' '.join(terms)
+
+    def upsert_record(self, record_id: str, dna_sequence: str, birth_time: datetime, record_type: str = 'DNA', source_info: str = "",
+                      collapse_near_duplicates: Optional[bool] = None, commit: bool = True):
         """
         유전 기록을 추가하거나 업데이트합니다 (Upsert).
         - raw_genetic_captures 에 무조건 저장 (History)
+        - 서열은 표준형(대문자, U→T, IUPAC 검증)으로 정규화한 뒤 저장/중복 판정
         - genetic_records 에는 유니크한 시퀀스만 저장 (Unique)
         이미 동일한 시퀀스가 존재하면: 카운트 증가, 메타데이터 추가.
+        근사 중복 병합이 켜져 있고 동일성 임계값 이상인 대표 서열이 있으면: 대표 서열에 병합 (diff 기록).
         없으면: 새로 추가.
+        collapse_near_duplicates: None이면 near_duplicate_identity 설정을 따르고, True/False로 호출별 지정.
+        commit: False면 커밋하지 않음
+        """
+        prepared = self._prepare_records([{
+            'record_id': record_id, 'dna_sequence': dna_sequence, 'birth_time': birth_time,
+            'record_type': record_type, 'source_info': source_info
+        }], collapse_near_duplicates)[0]
+        with self._write_lock:
+            result = self._apply_record(self.conn.cursor(), prepared)
+            if commit:
+                self.conn.commit()
+            return result
+
+    def _near_duplicate_threshold(self, collapse_near_duplicates: Optional[bool]) -> Optional[float]:
+        if collapse_near_duplicates is False:
+            return None
+        if collapse_near_duplicates and self.near_duplicate_identity is None:
+            return self.DEFAULT_NEAR_DUPLICATE_IDENTITY
+        return self.near_duplicate_identity
+
+    def _prepare_records(self, records: List[dict], collapse_near_duplicates: Optional[bool]) -> List[dict]:
+        """
+        쓰기 락 밖에서 할 수 있는 upsert 준비: 서열 정규화(유효하지 않으면 InvalidSequenceError), 근사 중복 탐색(동일성 정렬 포함),
+        새로 추가될 레코드의 색인 데이터(MinHash 서명, k-mer postings, 특징 벡터 배치 계산).
+        탐색은 읽기 스냅샷의 커밋된 레코드 + 같은 배치에서 앞서 새로 추가될 레코드가 대상입니다.
         """
+        min_identity = self._near_duplicate_threshold(collapse_near_duplicates)
+        prepared = []
+        for r in records:
+            seq = normalize_sequence(r['dna_sequence'])
+            prepared.append({
+                'record_id': r['record_id'], 'dna_sequence': seq, 'seq_hash': sequence_hash(seq),
+                'birth_time': r['birth_time'], 'record_type': r.get('record_type', 'DNA'),
+                'source_info': r.get('source_info', ""), 'near_duplicate': None
+            })
+
+        pending, seen = [], set()
+        with self.read_snapshot() as conn:
+            for item in prepared:
+                seq = item['dna_sequence']
+                if item['seq_hash'] in seen or conn.execute(
+                        "SELECT 1 FROM genetic_records WHERE seq_hash = ?", (item['seq_hash'],)).fetchone():
+                    continue  # 정확 중복
+                seen.add(item['seq_hash'])
+                item['signature'] = self.similarity_index.signature(seq)
+                if min_identity is not None:
+                    item['near_duplicate'] = self.similarity_index.find_near_duplicate(
+                        conn, seq, min_identity, item['record_type'], sig=item['signature'], pending=pending
+                    )
+                if item['near_duplicate'] is None:
+                    item['postings'] = self.motif_index.prepare(seq)
+                    pending.append(item)
+            features = self.feature_store.prepare(conn, [item['dna_sequence'] for item in pending])
+        for item in pending:
+            item['features'] = {name: vectors[item['seq_hash']]
+                                for name, vectors in features.items() if item['seq_hash'] in vectors}
+        return prepared
+
+    def _apply_record(self, cursor, item: dict) -> Tuple[str, bool]:
+        """_prepare_records()로 준비한 레코드 하나를 현재 트랜잭션에 씁니다 (쓰기 락 안에서 호출)."""
         import uuid
         import json
-        
-        cursor = self.conn.cursor()
-        
-        # Check existing
-        cursor.execute("SELECT record_id, occurrence_count, source_metadata FROM genetic_records WHERE dna_sequence = ?", (dna_sequence,))
+
+        record_id, dna_sequence, birth_time = item['record_id'], item['dna_sequence'], item['birth_time']
+        record_type, source_info = item['record_type'], item['source_info']
+
+        # Check existing (준비 이후 다른 쓰기로 같은 서열이 들어왔을 수 있으므로 락 안에서 다시 확인)
+        cursor.execute("SELECT record_id, occurrence_count, source_metadata FROM genetic_records WHERE seq_hash = ?", (item['seq_hash'],))
         existing = cursor.fetchone()
-        
+
+        # Near-duplicate (락 밖에서 찾은 대표 서열이 아직 있으면 병합)
+        near_duplicate = None
+        if not existing and item['near_duplicate']:
+            cursor.execute("SELECT record_id, occurrence_count, source_metadata FROM genetic_records WHERE record_id = ?",
+                           (item['near_duplicate']['record_id'],))
+            existing = cursor.fetchone()
+            if existing:
+                near_duplicate = item['near_duplicate']
+
         target_record_id = record_id
-        
+
         if existing:
             # Update existing
             orig_id, count, meta_json = existing
             target_record_id = orig_id
             new_count = (count or 1) + 1
-            
+
             # Simple metadata append logic
             try:
                 meta = json.loads(meta_json) if meta_json else []
             except:
                 meta = []
-            
+
             if source_info:
                 meta.append(source_info)
-            
+
             # 최신 50개까지만 유지 (데이터 폭증 방지)
             if len(meta) > 50:
                 meta = meta[-50:]
-            
+
             cursor.execute("""
                 UPDATE genetic_records 
                 SET occurrence_count = ?, source_metadata = ?, birth_time = ? 
@@ -144,25 +716,90 @@ class DatabaseManager:
         else:
             # Insert new
             meta_list = [source_info] if source_info else []
+            stats = ambiguity_stats(dna_sequence)
             cursor.execute("""
-                INSERT INTO genetic_records (record_id, dna_sequence, birth_time, record_type, occurrence_count, source_metadata)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (record_id, dna_sequence, birth_time.strftime('%Y-%m-%d %H:%M:%S.%f'), record_type, 1, json.dumps(meta_list)))
-        
+                INSERT INTO genetic_records (record_id, dna_sequence, birth_time, record_type, occurrence_count, source_metadata,
+                                             ambiguous_bases, n_bases, seq_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (record_id, dna_sequence, birth_time.strftime('%Y-%m-%d %H:%M:%S.%f'), record_type, 1, json.dumps(meta_list),
+                  stats['ambiguous_bases'], stats['n_bases'], item['seq_hash']))
+            record_rowid = cursor.lastrowid
+            # 색인 데이터는 _prepare_records()가 락 밖에서 계산해 둔 것을 INSERT만 함
+            # (준비 시점에는 중복/근사 중복이라 계산하지 않았는데 그 사이 대상 행이 사라진 경우에만 여기서 계산)
+            # 유사도 인덱스 (MinHash 서명 + LSH 버킷)
+            if 'signature' in item:
+                self.similarity_index.store(cursor, record_id, item['signature'])
+            else:
+                self.similarity_index.add(cursor, record_id, dna_sequence)
+            # 모티프 검색용 k-mer postings
+            if 'postings' in item:
+                self.motif_index.store(cursor, record_rowid, item['postings'])
+            else:
+                self.motif_index.add(cursor, record_rowid, dna_sequence)
+            # 학습/추론/분석에서 재사용할 특징 벡터 (GenetiForest, ViralBoost, 이미 저장된 벡터는 준비 단계에서 제외됨)
+            if 'features' in item:
+                for name, vector in item['features'].items():
+                    self.feature_store.store(cursor, name, {item['seq_hash']: vector})
+            else:
+                self.feature_store.add(cursor, dna_sequence)
+
         # Raw Capture 저장 (무조건 - 히스토리 보존)
         capture_id = str(uuid.uuid4())
         cursor.execute(
             "INSERT INTO raw_genetic_captures (capture_id, dna_sequence, captured_at, linked_record_id, source_info) VALUES (?, ?, ?, ?, ?)",
             (capture_id, dna_sequence, datetime.now().isoformat(), target_record_id, source_info)
         )
-        
-        self.conn.commit()
+
+        if near_duplicate:
+            cursor.execute(
+                "INSERT INTO near_duplicate_collapses (capture_id, representative_id, identity, diff, collapsed_at) VALUES (?, ?, ?, ?, ?)",
+                (capture_id, target_record_id, near_duplicate['identity'], json.dumps(near_duplicate['diff']), datetime.now().isoformat())
+            )
+
         return target_record_id, not existing  # (record_id, is_new)
 
+    def upsert_records(self, records: List[dict], collapse_near_duplicates: Optional[bool] = None,
+                       before_commit=None) -> List[Tuple[str, bool]]:
+        """
+        여러 레코드를 하나의 트랜잭션으로 upsert 합니다 (대량 수집용 배치 쓰기).
+        records 항목: record_id, dna_sequence, birth_time, record_type, source_info
+        before_commit(cursor, results): 같은 트랜잭션 안에서 실행할 추가 쓰기 (예: 신규/중복 수를 담은 수집 작업 체크포인트)
+        근사 중복 정렬 같은 계산은 _prepare_records()에서 쓰기 락을 잡기 전에 끝냅니다.
+        """
+        prepared = self._prepare_records(records, collapse_near_duplicates)
+        with self.transaction() as cursor:
+            results = [self._apply_record(cursor, item) for item in prepared]
+            if before_commit:
+                before_commit(cursor, results)
+        return results
+
+    def get_features(self, extractor: str, sequences: List[str], persist: bool = True, out=None) -> np.ndarray:
+        """
+        특징 저장소에서 서열들의 특징 행렬(float32, 입력 순서)을 읽습니다.
+        extractor: 'genetiforest' | 'viralboost'
+        persist: 저장소에 없어서 새로 계산한 벡터를 저장할지 (LIME 섭동 서열처럼 일회성 입력은 False)
+        out: 미리 할당한 (len(sequences), dim) 배열 또는 np.memmap (없으면 float32로 할당)
+        LOOKUP_CHUNK개씩 조회/계산/저장하므로 전체 DB를 특징화해도 출력 행렬 외의 메모리는 일정합니다.
+        """
+        if out is None:
+            out = np.empty((len(sequences), feature_dim(extractor)), dtype=np.float32)
+        chunk_size = self.feature_store.LOOKUP_CHUNK
+        for start in range(0, len(sequences), chunk_size):
+            chunk = sequences[start:start + chunk_size]
+            with self.read_snapshot() as conn:
+                computed = self.feature_store.fill(conn, extractor, chunk, out[start:start + len(chunk)])
+            if computed and persist:
+                with self.transaction() as cursor:
+                    self.feature_store.store(cursor, extractor, computed)
+        return out
+
     def check_sequence_exists(self, dna_sequence: str) -> bool:
         """주어진 DNA 시퀀스가 이미 DB에 존재하는지 확인합니다."""
         cursor = self.conn.cursor()
-        cursor.execute("SELECT 1 FROM genetic_records WHERE dna_sequence = ? LIMIT 1", (dna_sequence,))
+        dna_sequence = try_normalize(dna_sequence)
+        if dna_sequence is None:
+            return False
+        cursor.execute("SELECT 1 FROM genetic_records WHERE seq_hash = ?", (sequence_hash(dna_sequence),))
         return cursor.fetchone() is not None
 
     def get_metadata(self, key: str) -> Optional[str]:
@@ -176,9 +813,34 @@ class DatabaseManager:
 
     def set_metadata(self, key: str, value: str):
         """메타데이터 값을 설정합니다 (Upsert)."""
-        cursor = self.conn.cursor()
-        cursor.execute("INSERT OR REPLACE INTO system_metadata (key, value) VALUES (?, ?)", (key, str(value)))
-        self.conn.commit()
+        with self._write_lock:
+            cursor = self.conn.cursor()
+            cursor.execute("INSERT OR REPLACE INTO system_metadata (key, value) VALUES (?, ?)", (key, str(value)))
+            self.conn.commit()
+
+    def execute_write(self, query: str, params=()) -> int:
+        """단일 쓰기 문을 쓰기 락 안에서 실행하고 커밋합니다. 반환: 변경된 행 수"""
+        with self._write_lock:
+            cursor = self.conn.execute(query, params)
+            self.conn.commit()
+            return cursor.rowcount
+
+    @contextmanager
+    def transaction(self):
+        """
+        쓰기 락 안에서 하나의 트랜잭션을 실행합니다 (예외 시 롤백, 정상 종료 시 커밋).
+
+            with db_manager.transaction() as cursor:
+                cursor.execute("UPDATE ...")
+        """
+        with self._write_lock:
+            cursor = self.conn.cursor()
+            try:
+                yield cursor
+            except Exception:
+                self.conn.rollback()
+                raise
+            self.conn.commit()
 
     def get_record(self, record_id: str) -> Optional[Tuple]:
         """ID로 특정 기록을 조회합니다."""
@@ -194,24 +856,146 @@ class DatabaseManager:
         
     def update_death_time(self, record_id: str, death_time: datetime):
         """특정 기록의 사망 시간을 업데이트합니다."""
-        cursor = self.conn.cursor()
-        cursor.execute(
+        self.execute_write(
             "UPDATE genetic_records SET death_time = ? WHERE record_id = ?",
             (death_time.isoformat(), record_id)
         )
-        self.conn.commit()
+
+    def get_collapsed_variants(self, record_id: str, limit: int = 50) -> List[dict]:
+        """대표 서열에 병합된 근사 중복 캡처 목록 (동일성, diff 포함)."""
+        with self.read_snapshot() as conn:
+            rows = conn.execute("""
+                SELECT c.capture_id, c.identity, c.diff, c.collapsed_at, r.source_info, length(r.dna_sequence)
+                FROM near_duplicate_collapses c
+                LEFT JOIN raw_genetic_captures r ON r.capture_id = c.capture_id
+                WHERE c.representative_id = ?
+                ORDER BY c.collapsed_at DESC
+                LIMIT ?
+            """, (record_id, limit)).fetchall()
+        return [{
+            'capture_id': r[0], 'identity': round(r[1], 6), 'diff': json.loads(r[2]) if r[2] else [],
+            'collapsed_at': r[3], 'source_info': r[4], 'sequence_length': r[5]
+        } for r in rows]
+
+    def find_similar(self, record_id: str = None, dna_sequence: str = None,
+                     limit: int = 10, min_jaccard: float = 0.0) -> Optional[List[dict]]:
+        """
+        MinHash/LSH 인덱스로 유사 서열을 찾습니다 (record_id 또는 dna_sequence 중 하나).
+        기록이 없으면 None, 서명을 만들 수 없는 짧은 서열이면 빈 목록을 반환합니다.
+        """
+        index = self.similarity_index
+        with self.read_snapshot() as conn:
+            if record_id is not None:
+                row = conn.execute("SELECT signature FROM sequence_signatures WHERE record_id = ?", (record_id,)).fetchone()
+                if row:
+                    sig = np.frombuffer(row[0], dtype=np.uint64)
+                else:
+                    seq_row = conn.execute("SELECT dna_sequence FROM genetic_records WHERE record_id = ?", (record_id,)).fetchone()
+                    if not seq_row:
+                        return None
+                    sig = index.signature(seq_row[0])
+            else:
+                sig = index.signature(dna_sequence)
+            if sig is None:
+                return []
+
+            neighbors = index.query(sig, limit=limit, min_jaccard=min_jaccard, exclude=record_id, conn=conn)
+            if neighbors:
+                ids = [n['record_id'] for n in neighbors]
+                rows = conn.execute(
+                    f"SELECT record_id, record_type, occurrence_count, length(dna_sequence), source_metadata "
+                    f"FROM genetic_records WHERE record_id IN ({', '.join('?' * len(ids))})", ids
+                ).fetchall()
+                info = {r[0]: r for r in rows}
+                for n in neighbors:
+                    r = info.get(n['record_id'])
+                    if r:
+                        n.update({'record_type': r[1], 'occurrence_count': r[2], 'sequence_length': r[3]})
+                        try:
+                            meta = json.loads(r[4]) if r[4] else []
+                            n['source_info'] = meta[-1] if meta else None
+                        except ValueError:
+                            n['source_info'] = None
+        return neighbors
+
+    def search_motif(self, pattern: str, limit: int = 20, offset: int = 0,
+                     record_type: Optional[str] = None) -> Tuple[List[dict], int, bool]:
+        """
+        k-mer postings 교집합 + 서열 검증으로 정확 모티프를 포함하는 레코드를 찾습니다 (잘못된 패턴은 ValueError).
+        Returns: (results, total, total_exact) — 페이지가 채워지면 검증을 멈추므로 total은 추정값일 수 있음
+        """
+        with self.read_snapshot() as conn:
+            return self.motif_index.search(pattern, limit=limit, offset=offset, record_type=record_type, conn=conn)
+
+    def search_records(self, text: str, limit: int = 20, offset: int = 0) -> Tuple[List[dict], int]:
+        """
+        소스 헤더(FTS5)로 기록을 검색합니다. bm25 순위, 하이라이트 스니펫, 페이지네이션.
+        Returns: (results, total_matches)
+        """
+        match = self._fts_query(text)
+        if not match:
+            return [], 0
+        with self.read_snapshot() as conn:
+            total = conn.execute(
+                "SELECT COUNT(DISTINCT linked_record_id) FROM capture_headers_fts WHERE capture_headers_fts MATCH ?",
+                (match,)
+            ).fetchone()[0]
+            # 헤더 단위 매치를 먼저 구체화한 뒤 기록 단위로 묶습니다 (bm25/snippet은 집계 문맥에서 사용 불가)
+            rows = conn.execute("""
+                WITH h AS MATERIALIZED (
+                    SELECT linked_record_id, source_info, bm25(capture_headers_fts) AS score,
+                           snippet(capture_headers_fts, 0, '<mark>', '</mark>', '...', 16) AS snippet
+                    FROM capture_headers_fts WHERE capture_headers_fts MATCH ?
+                )
+                SELECT h.linked_record_id, MIN(h.score), h.snippet, h.source_info, COUNT(*),
+                       g.record_type, g.occurrence_count, g.birth_time, length(g.dna_sequence)
+                FROM h
+                LEFT JOIN genetic_records g ON g.record_id = h.linked_record_id
+                GROUP BY h.linked_record_id
+                ORDER BY MIN(h.score)
+                LIMIT ? OFFSET ?
+            """, (match, limit, offset)).fetchall()
+        results = [{
+            'record_id': r[0], 'score': round(-r[1], 6), 'snippet': r[2], 'source_info': r[3],
+            'matched_headers': r[4], 'record_type': r[5], 'occurrence_count': r[6],
+            'birth_time': r[7], 'sequence_length': r[8]
+        } for r in rows]
+        return results, total
+
+    def search_documents(self, text: str, limit: int = 20, offset: int = 0) -> Tuple[List[dict], int]:
+        """문서 제목/본문을 FTS5로 검색합니다. Returns: (results, total_matches)"""
+        match = self._fts_query(text)
+        if not match:
+            return [], 0
+        with self.read_snapshot() as conn:
+            total = conn.execute(
+                "SELECT COUNT(*) FROM documents_fts WHERE documents_fts MATCH ?", (match,)
+            ).fetchone()[0]
+            rows = conn.execute("""
+                SELECT f.doc_id, f.title, bm25(documents_fts, 5.0, 1.0) AS score,
+                       snippet(documents_fts, 1, '<mark>', '</mark>', '...', 24),
+                       d.source_type, d.updated_at
+                FROM documents_fts f
+                LEFT JOIN user_documents d ON d.doc_id = f.doc_id
+                WHERE documents_fts MATCH ?
+                ORDER BY score
+                LIMIT ? OFFSET ?
+            """, (match, limit, offset)).fetchall()
+        results = [{
+            'doc_id': r[0], 'title': r[1], 'score': round(-r[2], 6), 'snippet': r[3],
+            'source_type': r[4], 'updated_at': r[5]
+        } for r in rows]
+        return results, total
 
     # ========== Document CRUD Methods ==========
     def create_document(self, doc_id: str, title: str, content: str = '', source_type: str = 'user', source_path: str = None) -> bool:
         """새 문서를 생성합니다."""
-        cursor = self.conn.cursor()
         now = datetime.now().isoformat()
         try:
-            cursor.execute(
+            self.execute_write(
                 "INSERT INTO user_documents (doc_id, title, content, source_type, source_path, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
                 (doc_id, title, content, source_type, source_path, now, now)
             )
-            self.conn.commit()
             return True
         except Exception as e:
             print(f"Error creating document: {e}")
@@ -240,7 +1024,6 @@ class DatabaseManager:
 
     def update_document(self, doc_id: str, title: str = None, content: str = None, enhanced_content: str = None) -> bool:
         """문서를 수정합니다."""
-        cursor = self.conn.cursor()
         updates = []
         params = []
         if title is not None:
@@ -258,20 +1041,26 @@ class DatabaseManager:
         
         if updates:
             query = f"UPDATE user_documents SET {', '.join(updates)} WHERE doc_id = ?"
-            cursor.execute(query, params)
-            self.conn.commit()
-            return cursor.rowcount > 0
+            return self.execute_write(query, params) > 0
         return False
 
     def delete_document(self, doc_id: str) -> bool:
         """문서를 삭제합니다."""
-        cursor = self.conn.cursor()
-        cursor.execute("DELETE FROM user_documents WHERE doc_id = ?", (doc_id,))
-        self.conn.commit()
-        return cursor.rowcount > 0
+        return self.execute_write("DELETE FROM user_documents WHERE doc_id = ?", (doc_id,)) > 0
 
     def close(self):
         """데이터베이스 연결을 닫습니다."""
+        self._backfill_stop.set()
+        if self._backfill_thread:
+            self._backfill_thread.join()
+        while True:
+            try:
+                self._read_pool.get_nowait().close()
+            except queue.Empty:
+                break
+        if self._count_watch:
+            self._count_watch.close()
+            self._count_watch = None
         if self.conn:
             self.conn.close()
             print("Database connection closed.")
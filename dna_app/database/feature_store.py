@@ -0,0 +1,150 @@
+import hashlib
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from dna_app.services.sequence_normalizer import canonical
+
+
+def _genetiforest_extractor():
+    from dna_app.services.feature_extractor import BiologicalFeatureExtractor
+    return BiologicalFeatureExtractor(kmer_size=3)
+
+
+def _viralboost_extractor():
+    from dna_app.services.sequence_feature_extractor import SequenceFeatureExtractor
+    return SequenceFeatureExtractor(kmer_size=5)
+
+
+# 저장하는 특징 세트: 이름 → 추출기 생성 함수 (sklearn 의존 모듈은 처음 사용할 때 import)
+EXTRACTORS = {
+    'genetiforest': _genetiforest_extractor,  # BiologicalFeatureExtractor(k=3), 66차원
+    'viralboost': _viralboost_extractor,      # SequenceFeatureExtractor(k=5), 54차원
+}
+_extractor_cache = {}
+
+
+def get_extractor(name: str):
+    if name not in _extractor_cache:
+        _extractor_cache[name] = EXTRACTORS[name]()
+    return _extractor_cache[name]
+
+
+def extractor_key(name: str) -> str:
+    """저장 키에 추출기 VERSION을 포함 → 특징 정의가 바뀌면 이전 벡터는 자동으로 무시됩니다."""
+    return f"{name}@{get_extractor(name).VERSION}"
+
+
+def sequence_hash(seq: str) -> str:
+    return hashlib.sha1(canonical(seq).encode('ascii', 'replace')).hexdigest()
+
+
+def compute_features(name: str, sequences: Sequence[str]) -> np.ndarray:
+    """
+    저장소 없이 특징을 계산합니다. 저장소와 같은 값이 되도록 float32로 반올림합니다
+    (저장된 벡터로 학습한 모델에 새로 계산한 벡터를 넣어도 결과가 같도록).
+    """
+    return get_extractor(name).transform(sequences, dtype=np.float32)
+
+
+def feature_dim(name: str) -> int:
+    return get_extractor(name).n_features_out
+
+
+class FeatureStore:
+    """
+    서열별 특징 벡터 저장소 (SQLite 저장).
+    - sequence_features: (서열 sha1, 추출기@버전) → float32 벡터 BLOB
+    - 새 레코드는 수집 시점에 GenetiForest/ViralBoost 벡터를 함께 저장
+    - 조회 시 없는 벡터(저장소 도입 전 레코드, 새 입력 서열)는 계산해서 반환하고 선택적으로 저장
+    학습(train_model), 추론(MLService), 분석(combined-insights, export)이 모두 이 저장소를 읽습니다.
+    """
+    LOOKUP_CHUNK = 500
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    # ========== Schema ==========
+    def create_schema(self, cursor):
+        # 기존 레코드는 백필하지 않음: 처음 조회될 때 계산해서 채움 (시작 시간에 전체 특징 추출 비용을 쓰지 않도록)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sequence_features (
+                seq_hash TEXT NOT NULL,
+                extractor TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (seq_hash, extractor)
+            ) WITHOUT ROWID
+        """)
+
+    # ========== Writing ==========
+    def prepare(self, conn, sequences: Sequence[str],
+                names: Sequence[str] = tuple(EXTRACTORS)) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        수집 시점 계산 (쓰기 락 밖에서 호출): 저장소에 없는 서열의 특징 벡터를 LOOKUP_CHUNK개씩 배치로 계산합니다.
+        반환: {추출기: {seq_hash: 벡터}} → 쓰기 트랜잭션에서 store()로 저장
+        """
+        by_hash = dict(zip((sequence_hash(seq) for seq in sequences), sequences))
+        prepared = {}
+        for name in names:
+            found = self.lookup(conn, name, list(by_hash))
+            missing = [h for h in by_hash if h not in found]
+            vectors = {}
+            for start in range(0, len(missing), self.LOOKUP_CHUNK):
+                chunk = missing[start:start + self.LOOKUP_CHUNK]
+                vectors.update(zip(chunk, compute_features(name, [by_hash[h] for h in chunk])))
+            prepared[name] = vectors
+        return prepared
+
+    def add(self, cursor, seq: str, names: Sequence[str] = tuple(EXTRACTORS)):
+        """한 서열의 특징 벡터들을 계산해 저장합니다 (이미 있으면 유지). 준비 단계를 거치지 않은 쓰기용."""
+        seq_hash = sequence_hash(seq)
+        for name in names:
+            self._store(cursor, name, [seq_hash], compute_features(name, [seq]))
+
+    def _store(self, cursor, name: str, hashes: List[str], matrix: np.ndarray):
+        key = extractor_key(name)
+        cursor.executemany(
+            "INSERT OR IGNORE INTO sequence_features (seq_hash, extractor, dim, vector) VALUES (?, ?, ?, ?)",
+            [(h, key, matrix.shape[1], row.tobytes()) for h, row in zip(hashes, matrix)]
+        )
+
+    # ========== Reading ==========
+    def lookup(self, conn, name: str, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        """저장된 벡터를 {seq_hash: float32 벡터}로 반환합니다 (없는 해시는 빠짐)."""
+        key = extractor_key(name)
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        for start in range(0, len(unique), self.LOOKUP_CHUNK):
+            chunk = unique[start:start + self.LOOKUP_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            rows = conn.execute(
+                f"SELECT seq_hash, vector FROM sequence_features WHERE extractor = ? AND seq_hash IN ({placeholders})",
+                [key] + chunk
+            ).fetchall()
+            for seq_hash, blob in rows:
+                found[seq_hash] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def fill(self, conn, name: str, sequences: Sequence[str], out: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        서열 목록의 특징 벡터를 out(len(sequences) x dim, 입력 순서)에 기록합니다.
+        저장된 벡터는 복사하고 없는 벡터만 계산합니다 (호출자가 LOOKUP_CHUNK 단위로 나눠 호출 → 메모리 고정).
+        반환: 저장소에 없어서 새로 계산한 {seq_hash: 벡터} (store()로 저장 가능)
+        """
+        hashes = [sequence_hash(seq) for seq in sequences]
+        found = self.lookup(conn, name, hashes)
+        missing = {}
+        for seq_hash, seq in zip(hashes, sequences):
+            if seq_hash not in found and seq_hash not in missing:
+                missing[seq_hash] = seq
+        computed = dict(zip(missing, compute_features(name, list(missing.values())))) if missing else {}
+        found.update(computed)
+        for i, seq_hash in enumerate(hashes):
+            out[i] = found[seq_hash]
+        return computed
+
+    def store(self, cursor, name: str, vectors: Dict[str, np.ndarray]):
+        """fill()이 새로 계산한 벡터를 저장합니다."""
+        if vectors:
+            self._store(cursor, name, list(vectors), np.stack(list(vectors.values())))
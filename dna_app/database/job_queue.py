@@ -0,0 +1,175 @@
+import json
+import os
+import socket
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+class LeaseLost(Exception):
+    """하트비트/완료 시점에 임대가 만료되어 다른 워커가 작업을 가져갔을 때 발생합니다."""
+
+
+class JobQueue:
+    """
+    공유 SQLite DB의 job_queue 테이블 위에 만든 내구성 작업 큐 (외부 브로커 없음).
+    - enqueue: kind + JSON payload로 작업 등록
+    - claim: 대기 중이거나 임대가 만료된 작업 하나를 단일 UPDATE ... RETURNING으로 원자적으로 가져감
+      (같은 DB를 쓰는 여러 프로세스/호스트의 워커가 동시에 claim 해도 한 워커만 성공)
+    - heartbeat: 실행 중 임대 연장. 워커가 죽으면 임대가 만료되어 다른 워커가 다시 실행 (attempts 증가)
+    - fail: max_attempts 전까지는 지수 백오프 후 재시도, 이후 'failed'
+    상태: queued → running → completed | failed | cancelled
+    """
+    COLUMNS = ['job_id', 'kind', 'payload', 'state', 'priority', 'attempts', 'max_attempts', 'run_after',
+               'lease_owner', 'lease_expires_at', 'heartbeat_at', 'cancel_requested', 'progress', 'result',
+               'error', 'created_at', 'updated_at']
+    JSON_COLUMNS = ('payload', 'progress', 'result')
+    FINAL_STATES = ('completed', 'failed', 'cancelled')
+
+    def __init__(self, db_manager, lease_seconds: float = 60.0, retry_backoff: float = 5.0):
+        self.db_manager = db_manager
+        self.lease_seconds = lease_seconds
+        self.retry_backoff = retry_backoff
+
+    @staticmethod
+    def default_worker_id() -> str:
+        return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+    def _row(self, row) -> Dict:
+        job = dict(zip(self.COLUMNS, row))
+        for key in self.JSON_COLUMNS:
+            job[key] = json.loads(job[key]) if job[key] else None
+        job['cancel_requested'] = bool(job['cancel_requested'])
+        return job
+
+    # ========== Producer ==========
+    def enqueue(self, kind: str, payload: Optional[Dict] = None, priority: int = 0, max_attempts: int = 3,
+                delay: float = 0) -> Dict:
+        job_id = str(uuid.uuid4())
+        now = datetime.now().isoformat()
+        self.db_manager.execute_write("""
+            INSERT INTO job_queue (job_id, kind, payload, priority, max_attempts, run_after, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (job_id, kind, json.dumps(payload or {}), priority, max(1, max_attempts), time.time() + delay, now, now))
+        print(f"[Queue] Enqueued {kind} job {job_id[:8]}")
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self.db_manager.read_snapshot() as conn:
+            row = conn.execute(f"SELECT {', '.join(self.COLUMNS)} FROM job_queue WHERE job_id = ?", (job_id,)).fetchone()
+        return self._row(row) if row else None
+
+    def list(self, state: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        query = f"SELECT {', '.join(self.COLUMNS)} FROM job_queue"
+        params = []
+        if state:
+            query += " WHERE state = ?"
+            params.append(state)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self.db_manager.read_snapshot() as conn:
+            return [self._row(r) for r in conn.execute(query, params).fetchall()]
+
+    def cancel(self, job_id: str) -> Optional[Dict]:
+        """대기 중인 작업은 바로 취소, 실행 중인 작업은 다음 하트비트에서 워커가 멈추도록 표시합니다."""
+        now = datetime.now().isoformat()
+        with self.db_manager.transaction() as cursor:
+            cursor.execute("UPDATE job_queue SET state = 'cancelled', updated_at = ? WHERE job_id = ? AND state = 'queued'",
+                           (now, job_id))
+            cursor.execute("UPDATE job_queue SET cancel_requested = 1, updated_at = ? WHERE job_id = ? AND state = 'running'",
+                           (now, job_id))
+        return self.get(job_id)
+
+    # ========== Worker ==========
+    def claim(self, worker_id: str, kinds: Optional[List[str]] = None) -> Optional[Dict]:
+        """실행할 작업 하나를 임대합니다. 없으면 None."""
+        now = time.time()
+        kind_filter = ''
+        params = [worker_id, now + self.lease_seconds, now, datetime.now().isoformat(), now, now]
+        if kinds:
+            kind_filter = f" AND kind IN ({', '.join('?' for _ in kinds)})"
+            params.extend(kinds)
+
+        with self.db_manager.transaction() as cursor:
+            self._reap_exhausted(cursor, now)
+            # 하나의 쓰기 문이므로 다른 프로세스의 claim과 겹치지 않음 (SQLite 쓰기 락)
+            rows = cursor.execute(f"""
+                UPDATE job_queue
+                SET state = 'running', lease_owner = ?, lease_expires_at = ?, heartbeat_at = ?,
+                    attempts = attempts + 1, updated_at = ?
+                WHERE job_id = (
+                    SELECT job_id FROM job_queue
+                    WHERE ((state = 'queued' AND run_after <= ?)
+                           OR (state = 'running' AND lease_expires_at < ? AND attempts < max_attempts))
+                      AND cancel_requested = 0{kind_filter}
+                    ORDER BY priority DESC, created_at
+                    LIMIT 1
+                )
+                RETURNING {', '.join(self.COLUMNS)}
+            """, params).fetchall()
+        return self._row(rows[0]) if rows else None
+
+    def _reap_exhausted(self, cursor, now: float):
+        """임대가 만료됐지만 재시도 횟수를 다 쓴 작업(또는 취소 요청된 작업)을 마무리합니다."""
+        stamp = datetime.now().isoformat()
+        cursor.execute("""
+            UPDATE job_queue SET state = 'cancelled', lease_owner = NULL, updated_at = ?
+            WHERE state = 'running' AND lease_expires_at < ? AND cancel_requested = 1
+        """, (stamp, now))
+        cursor.execute("""
+            UPDATE job_queue SET state = 'failed', lease_owner = NULL, updated_at = ?,
+                error = COALESCE(error, 'lease expired after ' || attempts || ' attempt(s)')
+            WHERE state = 'running' AND lease_expires_at < ? AND attempts >= max_attempts
+        """, (stamp, now))
+
+    def heartbeat(self, job_id: str, worker_id: str, progress: Optional[Dict] = None) -> bool:
+        """
+        임대를 연장하고 진행 상황을 기록합니다. 반환: 취소 요청 여부
+        임대를 잃었으면 LeaseLost (다른 워커가 이미 재실행 중이므로 현재 실행을 중단해야 함).
+        """
+        now = time.time()
+        with self.db_manager.transaction() as cursor:
+            cursor.execute("""
+                UPDATE job_queue SET lease_expires_at = ?, heartbeat_at = ?, updated_at = ?,
+                    progress = COALESCE(?, progress)
+                WHERE job_id = ? AND lease_owner = ? AND state = 'running'
+            """, (now + self.lease_seconds, now, datetime.now().isoformat(),
+                  json.dumps(progress) if progress is not None else None, job_id, worker_id))
+            if cursor.rowcount == 0:
+                raise LeaseLost(job_id)
+            return bool(cursor.execute("SELECT cancel_requested FROM job_queue WHERE job_id = ?",
+                                       (job_id,)).fetchone()[0])
+
+    def update_payload(self, job_id: str, worker_id: str, payload: Dict):
+        """실행 중에 payload를 갱신합니다 (재시도가 첫 시도에서 만든 자원을 이어 쓰도록). 임대를 잃었으면 LeaseLost."""
+        count = self.db_manager.execute_write(
+            "UPDATE job_queue SET payload = ?, updated_at = ? WHERE job_id = ? AND lease_owner = ? AND state = 'running'",
+            (json.dumps(payload), datetime.now().isoformat(), job_id, worker_id)
+        )
+        if count == 0:
+            raise LeaseLost(job_id)
+
+    def _finish(self, job_id: str, worker_id: str, assignments: str, params) -> None:
+        count = self.db_manager.execute_write(
+            f"UPDATE job_queue SET {assignments}, lease_owner = NULL, updated_at = ? "
+            f"WHERE job_id = ? AND lease_owner = ? AND state = 'running'",
+            list(params) + [datetime.now().isoformat(), job_id, worker_id]
+        )
+        if count == 0:
+            raise LeaseLost(job_id)
+
+    def complete(self, job_id: str, worker_id: str, result=None):
+        self._finish(job_id, worker_id, "state = 'completed', result = ?, error = NULL",
+                     [json.dumps(result) if result is not None else None])
+
+    def mark_cancelled(self, job_id: str, worker_id: str):
+        self._finish(job_id, worker_id, "state = 'cancelled'", [])
+
+    def fail(self, job_id: str, worker_id: str, error: str, attempts: int, max_attempts: int):
+        """재시도 횟수가 남았으면 백오프 후 다시 대기열로, 아니면 실패 처리합니다."""
+        if attempts < max_attempts:
+            run_after = time.time() + self.retry_backoff * (2 ** (attempts - 1))
+            self._finish(job_id, worker_id, "state = 'queued', run_after = ?, error = ?", [run_after, error])
+        else:
+            self._finish(job_id, worker_id, "state = 'failed', error = ?", [error])
@@ -0,0 +1,269 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from dna_app.services.sequence_encoding import INVALID, encode_sequence
+
+# 위치 델타 배열 저장 형식: 1바이트 폭 태그 + 리틀엔디언 정수 배열
+_DELTA_DTYPES = {1: np.dtype('<u1'), 2: np.dtype('<u2'), 4: np.dtype('<u4')}
+
+
+def encode_positions(positions: np.ndarray) -> bytes:
+    """오름차순 위치 배열을 델타 인코딩하여 가장 작은 정수 폭으로 직렬화합니다."""
+    deltas = np.diff(positions, prepend=0)
+    peak = int(deltas.max()) if len(deltas) else 0
+    width = 1 if peak < 2**8 else 2 if peak < 2**16 else 4
+    return bytes([width]) + deltas.astype(_DELTA_DTYPES[width]).tobytes()
+
+
+def decode_positions(blob: bytes) -> np.ndarray:
+    width = blob[0]
+    deltas = np.frombuffer(blob, dtype=_DELTA_DTYPES[width], offset=1)
+    return np.cumsum(deltas, dtype=np.int64)
+
+
+class MotifIndex:
+    """
+    정확 모티프 검색을 위한 k-mer 역색인 (SQLite 저장).
+    - kmer_postings: (kmer 코드, genetic_records rowid) → 해당 k-mer의 시작 위치들 (델타 인코딩 BLOB)
+      (UUID 텍스트 대신 정수 rowid를 키로 사용 → 행/인덱스 크기와 교집합 비용 감소)
+    - 서열 끝이나 N/IUPAC 염기에서 잘린 윈도우는 유효한 앞부분(MIN_PATTERN 이상)을 'A'로 패딩하여 색인
+      → k보다 짧은 패턴도 서열 끝/모호 염기 바로 앞까지 검색 (패딩으로 생긴 가짜 후보는 검증 단계에서 제거)
+    검색: 패턴을 덮는 앵커 k-mer들의 postings를 위치 제약으로 교집합 → 후보 위치가 많은 순으로
+    실제 서열을 검증하고, 요청한 페이지가 채워지면 멈춥니다.
+    k보다 짧은 패턴은 코드 범위의 postings에서 레코드별 위치 수만 세고(위치 배열은 읽지 않음),
+    검증할 때 서열에서 직접 위치를 찾습니다.
+    """
+    MIN_PATTERN = 3
+    KEYED_ON_ROWID = True  # 백필 시 store()에 record_id 대신 rowid 전달
+    # 색인 형식 버전 (system_metadata에 기록). 올리면 기존 레코드를 백그라운드에서 다시 색인
+    # 2: N/IUPAC 염기에서 잘린 윈도우의 앞부분도 색인
+    FORMAT = 2
+    VERIFY_BATCH = 200
+
+    def __init__(self, conn, k: int = 8):
+        self.conn = conn
+        self.k = k
+
+    # ========== Schema ==========
+    def create_schema(self, cursor) -> bool:
+        """테이블을 생성합니다. 반환: 새로 만들었는지 (기존 레코드 색인은 DatabaseManager가 백그라운드로 채움)"""
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(kmer_postings)")}
+        if 'record_id' in columns:
+            # 이전 형식 (record_id TEXT 키) → 버리고 rowid 키로 다시 색인
+            cursor.execute("DROP TABLE kmer_postings")
+            print("[MotifIndex] Rebuilding kmer_postings keyed on record rowid")
+            columns = set()
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS kmer_postings (
+                kmer INTEGER NOT NULL,
+                record_rowid INTEGER NOT NULL,
+                positions BLOB NOT NULL,
+                PRIMARY KEY (kmer, record_rowid)
+            ) WITHOUT ROWID
+        """)
+        stored = cursor.execute("SELECT value FROM system_metadata WHERE key = 'format:kmer_postings'").fetchone()
+        cursor.execute("INSERT OR REPLACE INTO system_metadata (key, value) VALUES ('format:kmer_postings', ?)",
+                       (str(self.FORMAT),))
+        # 이전 형식이면 백필로 다시 색인 (INSERT OR REPLACE라 기존 postings는 같은 값으로 덮어씀)
+        return not columns or (stored is not None and stored[0] != str(self.FORMAT)) or \
+            (stored is None and cursor.execute("SELECT 1 FROM kmer_postings LIMIT 1").fetchone() is not None)
+
+    # ========== Indexing ==========
+    def _window_codes(self, seq: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        모든 시작 위치의 윈도우 코드. 유효한 염기가 k개 미만 남은 윈도우(서열 끝, N/IUPAC 앞)는
+        유효한 앞부분만 남기고 나머지를 'A'(0)로 채웁니다.
+        Returns: (values, runs) - runs[i]는 i부터 이어지는 유효 염기 수 (최대 k)
+        """
+        codes = encode_sequence(seq)
+        n, k = len(codes), self.k
+        # 각 위치에서 다음 INVALID(또는 서열 끝)까지의 거리
+        invalid_at = np.append(np.flatnonzero(codes == INVALID), n)
+        runs = np.minimum(invalid_at[np.searchsorted(invalid_at, np.arange(n))] - np.arange(n), k)
+
+        padded = np.concatenate((codes & 3, np.zeros(k - 1, dtype=np.uint8))).astype(np.uint64)
+        values = np.zeros(n, dtype=np.uint64)
+        for j in range(k):
+            values = (values << np.uint64(2)) | np.where(j < runs, padded[j:j + n], np.uint64(0))
+        return values, runs
+
+    def add(self, cursor, record_rowid: int, seq: str) -> int:
+        """레코드(genetic_records rowid)의 k-mer postings를 저장합니다 (커밋은 호출자 담당). 반환: 색인된 고유 k-mer 수"""
+        return self.store(cursor, record_rowid, self.prepare(seq))
+
+    def store(self, cursor, record_rowid: int, postings: List[Tuple[int, bytes]]) -> int:
+        """prepare()로 미리 계산한 (kmer, positions BLOB) 목록을 저장합니다."""
+        cursor.executemany(
+            "INSERT OR REPLACE INTO kmer_postings (kmer, record_rowid, positions) VALUES (?, ?, ?)",
+            [(kmer, record_rowid, blob) for kmer, blob in postings]
+        )
+        return len(postings)
+
+    def prepare(self, seq: str) -> List[Tuple[int, bytes]]:
+        """서열의 k-mer별 시작 위치를 (kmer 코드, 델타 인코딩 BLOB) 목록으로 계산합니다 (쓰기 락 밖에서 호출)."""
+        if not seq:
+            return []
+        values, runs = self._window_codes(seq)
+        starts = np.flatnonzero(runs >= self.MIN_PATTERN)
+        if len(starts) == 0:
+            return []
+        kmers = values[starts]
+
+        order = np.argsort(kmers, kind='stable')  # 같은 k-mer 안에서는 위치 오름차순 유지
+        kmers, starts = kmers[order], starts[order]
+        boundaries = np.flatnonzero(np.diff(kmers)) + 1
+        group_starts = np.concatenate(([0], boundaries))
+        group_ends = np.append(boundaries, len(starts))
+        unique_kmers = kmers[group_starts]
+
+        # encode_positions와 같은 형식을 전체 배열에서 한 번에 계산 (k-mer별 numpy 호출 없이 슬라이스만)
+        deltas = np.diff(starts, prepend=0)
+        deltas[group_starts] = starts[group_starts]
+        peaks = np.maximum.reduceat(deltas, group_starts)
+        widths = np.where(peaks < 2**8, 1, np.where(peaks < 2**16, 2, 4))
+        buffers = {w: deltas.astype(_DELTA_DTYPES[w]).tobytes() for w in np.unique(widths).tolist()}
+
+        return [(kmer, bytes((w,)) + buffers[w][s * w:e * w])
+                for kmer, w, s, e in zip(unique_kmers.tolist(), widths.tolist(),
+                                         group_starts.tolist(), group_ends.tolist())]
+
+    # ========== Search ==========
+    @staticmethod
+    def normalize_pattern(pattern: str) -> str:
+        pattern = (pattern or '').strip().upper().replace('U', 'T')
+        if len(pattern) < MotifIndex.MIN_PATTERN:
+            raise ValueError(f"pattern must be at least {MotifIndex.MIN_PATTERN} bases")
+        if set(pattern) - set('ACGT'):
+            raise ValueError("pattern may only contain A, C, G, T (U)")
+        return pattern
+
+    def _code(self, kmer: str) -> int:
+        code = 0
+        for base in kmer:
+            code = (code << 2) | 'ACGT'.index(base)
+        return code
+
+    def _prefix_counts(self, conn, pattern: str) -> Dict[int, int]:
+        """
+        k보다 짧은 패턴: 패턴이 접두사인 모든 k-mer(= 연속된 코드 범위)의 postings에서
+        레코드별 후보 위치 수만 셉니다 (BLOB 길이로 계산, 위치 배열을 만들지 않음).
+        """
+        shift = 2 * (self.k - len(pattern))
+        lo = self._code(pattern) << shift
+        hi = lo + (1 << shift) - 1
+        counts: Dict[int, int] = {}
+        cursor = conn.execute("SELECT record_rowid, positions FROM kmer_postings WHERE kmer BETWEEN ? AND ?", (lo, hi))
+        while True:
+            rows = cursor.fetchmany(5000)
+            if not rows:
+                return counts
+            for rowid, blob in rows:
+                counts[rowid] = counts.get(rowid, 0) + (len(blob) - 1) // blob[0]
+
+    @staticmethod
+    def _find_all(seq: str, pattern: str) -> List[int]:
+        positions, start = [], seq.find(pattern)
+        while start != -1:
+            positions.append(start)
+            start = seq.find(pattern, start + 1)
+        return positions
+
+    def _candidates(self, conn, pattern: str) -> Dict[int, np.ndarray]:
+        """postings 교집합 → {record rowid: 패턴 시작 후보 위치 배열} (패턴 길이 >= k)"""
+        m, k = len(pattern), self.k
+
+        # 패턴 전체를 덮는 앵커 k-mer (오프셋 0, k, 2k, ..., m-k)
+        offsets = sorted(set(list(range(0, m - k + 1, k)) + [m - k]))
+        anchors = []
+        for offset in offsets:
+            code = self._code(pattern[offset:offset + k])
+            size = conn.execute("SELECT COUNT(*) FROM kmer_postings WHERE kmer = ?", (code,)).fetchone()[0]
+            if size == 0:
+                return {}
+            anchors.append((size, offset, code))
+        anchors.sort()  # 가장 희귀한 k-mer부터 교집합
+
+        candidates: Optional[Dict[int, np.ndarray]] = None
+        for _, offset, code in anchors:
+            if candidates is None:
+                rows = conn.execute("SELECT record_rowid, positions FROM kmer_postings WHERE kmer = ?", (code,))
+            else:
+                ids = list(candidates)
+                rows = []
+                for start in range(0, len(ids), 500):
+                    batch = ids[start:start + 500]
+                    rows.extend(conn.execute(
+                        f"SELECT record_rowid, positions FROM kmer_postings WHERE kmer = ? AND record_rowid IN ({', '.join('?' * len(batch))})",
+                        [code] + batch
+                    ).fetchall())
+
+            found = {}
+            for rowid, blob in rows:
+                starts = decode_positions(blob) - offset
+                if candidates is not None:
+                    starts = np.intersect1d(candidates[rowid], starts, assume_unique=True)
+                starts = starts[starts >= 0]
+                if len(starts):
+                    found[rowid] = starts
+            candidates = found
+            if not candidates:
+                return {}
+        return candidates
+
+    def search(self, pattern: str, limit: int = 20, offset: int = 0, record_type: Optional[str] = None,
+               max_positions: int = 100, conn=None) -> Tuple[List[Dict], int, bool]:
+        """
+        정확 모티프 검색. 후보를 후보 위치 수가 많은 순(같으면 rowid 순)으로 검증하고
+        offset + limit개가 확인되면 나머지 후보는 읽지 않습니다.
+        Returns: (results, total, total_exact)
+          - 모든 후보를 검증했으면 total은 정확한 매칭 레코드 수
+          - 중간에 멈췄으면 지금까지의 검증 통과율로 추정한 값 (total_exact=False)
+        """
+        conn = conn or self.conn
+        pattern = self.normalize_pattern(pattern)
+        short = len(pattern) < self.k
+        if short:
+            counts = self._prefix_counts(conn, pattern)
+            ranked = sorted(counts, key=lambda rowid: (-counts[rowid], rowid))
+        else:
+            candidates = self._candidates(conn, pattern)
+            ranked = sorted(candidates, key=lambda rowid: (-len(candidates[rowid]), rowid))
+        wanted = offset + limit
+
+        matches = []
+        checked = 0
+        for start in range(0, len(ranked), self.VERIFY_BATCH):
+            if len(matches) >= wanted:
+                break
+            batch = ranked[start:start + self.VERIFY_BATCH]
+            checked += len(batch)
+            query = f"SELECT rowid, record_id, dna_sequence, record_type FROM genetic_records WHERE rowid IN ({', '.join('?' * len(batch))})"
+            params = list(batch)
+            if record_type:
+                query += " AND record_type = ?"
+                params.append(record_type)
+            rows = {row[0]: row[1:] for row in conn.execute(query, params)}
+            for rowid in batch:  # 순위 유지
+                if rowid not in rows:
+                    continue
+                record_id, seq, r_type = rows[rowid]
+                seq = seq.upper().replace('U', 'T')
+                if short:
+                    verified = self._find_all(seq, pattern)
+                else:
+                    verified = [int(p) for p in candidates[rowid] if seq.startswith(pattern, int(p))]
+                if verified:
+                    matches.append({
+                        'record_id': record_id,
+                        'record_type': r_type,
+                        'sequence_length': len(seq),
+                        'match_count': len(verified),
+                        'positions': verified[:max_positions]
+                    })
+
+        if checked >= len(ranked):
+            return matches[offset:offset + limit], len(matches), True
+        estimate = len(matches) + round((len(ranked) - checked) * len(matches) / checked)
+        return matches[offset:offset + limit], estimate, False
@@ -0,0 +1,390 @@
+import bisect
+import hashlib
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from dna_app.services.sequence_encoding import BASE_CODES, encode_sequence, canonical_kmer_codes, kmer_codes
+
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer (uint64 배열, 오버플로는 2^64 모듈러로 감김)."""
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+_INF = 1 << 30
+_PAD = 255  # 밴드가 서열 밖으로 나간 칸 (대각 이동 불가)
+ANCHOR_K = 11
+
+
+def _banded_edit_ops(ref: np.ndarray, var: np.ndarray, budget: int) -> Optional[Tuple[int, List[Tuple]]]:
+    """
+    |i - j| <= budget 대각 밴드 안에서 편집 거리를 계산하고 경로를 역추적합니다.
+    행마다 numpy로 밴드 전체를 갱신 (삽입 방향 의존성은 누적 최솟값으로 처리) → O(len(ref) * budget).
+    행의 최솟값이 budget을 넘으면 바로 중단합니다.
+    반환: (distance, [(i1, i2, j1, j2), ...] 같지 않은 구간) 또는 None (budget 초과)
+    """
+    if abs(len(ref) - len(var)) > budget:
+        return None
+    # 공통 접두/접미는 정렬할 필요 없음 (반복 서열처럼 앵커가 없는 경우에도 DP 영역이 작아짐)
+    shortest = min(len(ref), len(var))
+    differs = np.flatnonzero(ref[:shortest] != var[:shortest])
+    prefix = int(differs[0]) if len(differs) else shortest
+    differs = np.flatnonzero(ref[::-1][:shortest - prefix] != var[::-1][:shortest - prefix])
+    suffix = int(differs[0]) if len(differs) else shortest - prefix
+    ref, var = ref[prefix:len(ref) - suffix], var[prefix:len(var) - suffix]
+    result = _banded_core(ref, var, budget)
+    if result is None:
+        return None
+    return result[0], [(i1 + prefix, i2 + prefix, j1 + prefix, j2 + prefix) for i1, i2, j1, j2 in result[1]]
+
+
+def _banded_core(ref: np.ndarray, var: np.ndarray, budget: int) -> Optional[Tuple[int, List[Tuple]]]:
+    n, m = len(ref), len(var)
+    if n == 0 or m == 0:
+        return max(n, m), ([(0, n, 0, m)] if n or m else [])
+
+    band = min(budget, max(n, m))  # 편집 거리는 max(n, m)을 넘지 않음
+    width = 2 * band + 1
+    offsets = np.arange(width)
+    var_padded = np.concatenate((np.full(band + 1, _PAD, np.uint8), var,
+                                 np.full(band + 1 + max(0, n - m), _PAD, np.uint8)))
+    prev = np.where((offsets >= band) & (offsets - band <= m), offsets - band, _INF)
+    moves = np.empty((n + 1, width), dtype=np.uint8)  # 0: 대각(일치/치환), 1: ref 삭제, 2: var 삽입
+    moves[0] = 2
+    for i in range(1, n + 1):
+        window = var_padded[i:i + width]  # var[j - 1], j = i - band + offset
+        diag = np.where(window == _PAD, _INF, prev + (window != ref[i - 1]))
+        up = np.append(prev[1:], _INF) + 1
+        best = np.minimum(diag, up)
+        row = np.minimum.accumulate(best - offsets) + offsets
+        j = i - band + offsets
+        row[(j < 0) | (j > m)] = _INF
+        moves[i] = np.where(row < best, 2, np.where(diag <= up, 0, 1))
+        if row.min() > budget:
+            return None
+        prev = row
+
+    distance = int(prev[m - n + band])
+    if distance > budget:
+        return None
+
+    # 역추적: 연속된 불일치 칸을 하나의 (i1, i2, j1, j2) 구간으로 묶음
+    spans = []
+    i, j, open_end = n, m, None
+    while i > 0 or j > 0:
+        move = moves[i, j - i + band]
+        if move == 0 and ref[i - 1] == var[j - 1]:
+            if open_end:
+                spans.append((i, open_end[0], j, open_end[1]))
+                open_end = None
+            i, j = i - 1, j - 1
+            continue
+        if open_end is None:
+            open_end = (i, j)
+        if move == 0:
+            i, j = i - 1, j - 1
+        elif move == 1:
+            i -= 1
+        else:
+            j -= 1
+    if open_end:
+        spans.append((0, open_end[0], 0, open_end[1]))
+    return distance, spans[::-1]
+
+
+def _anchor_blocks(ref: np.ndarray, var: np.ndarray, k: int = ANCHOR_K) -> List[Tuple[int, int, int]]:
+    """
+    양쪽에서 한 번씩만 나오는 k-mer를 앵커로 삼아 순서가 맞는 최장 사슬(LIS)을 만들고
+    같은 대각선의 연속된 앵커를 정확 일치 블록 (ref_start, var_start, length)으로 합칩니다.
+    """
+    def unique_kmers(codes):
+        values, valid = kmer_codes(BASE_CODES[codes], k)
+        positions = np.flatnonzero(valid)
+        kmers, first, counts = np.unique(values[positions], return_index=True, return_counts=True)
+        return kmers[counts == 1], positions[first[counts == 1]]
+
+    ref_kmers, ref_pos = unique_kmers(ref)
+    var_kmers, var_pos = unique_kmers(var)
+    _, ri, vi = np.intersect1d(ref_kmers, var_kmers, assume_unique=True, return_indices=True)
+    if len(ri) == 0:
+        return []
+    order = np.argsort(ref_pos[ri])
+    a_ref, a_var = ref_pos[ri][order], var_pos[vi][order]
+
+    if len(a_var) > 1 and not np.all(np.diff(a_var) > 0):
+        # var 위치의 최장 증가 부분열 (재배열/반복으로 순서가 어긋난 앵커 제거)
+        tails, tail_index, parent = [], [], np.full(len(a_var), -1)
+        for idx, value in enumerate(a_var.tolist()):
+            pos = bisect.bisect_left(tails, value)
+            if pos:
+                parent[idx] = tail_index[pos - 1]
+            if pos == len(tails):
+                tails.append(value)
+                tail_index.append(idx)
+            else:
+                tails[pos] = value
+                tail_index[pos] = idx
+        chain, idx = [], tail_index[-1]
+        while idx >= 0:
+            chain.append(idx)
+            idx = parent[idx]
+        keep = np.array(chain[::-1])
+        a_ref, a_var = a_ref[keep], a_var[keep]
+
+    blocks = []
+    for r, v in zip(a_ref.tolist(), a_var.tolist()):
+        if blocks:
+            br, bv, length = blocks[-1]
+            if r - v == br - bv and r <= br + length:
+                blocks[-1] = (br, bv, r + k - br)
+                continue
+            # 앞 블록과 겹치는 부분은 잘라냄
+            shift = max(br + length - r, bv + length - v, 0)
+            if shift >= k:
+                continue
+            r, v = r + shift, v + shift
+            blocks.append((r, v, k - shift))
+        else:
+            blocks.append((r, v, k))
+    return blocks
+
+
+def sequence_identity(reference: str, variant: str, max_diff_ops: int = 200,
+                      min_identity: float = 0.0) -> Tuple[float, List]:
+    """
+    두 서열의 동일성(identity = 1 - 편집 거리 / 긴 서열 길이)과 reference → variant 변경 목록(diff)을 계산합니다.
+    - 길이가 같으면 위치별 치환(substitution) 수가 편집 거리의 상한 (치환 2개 이하면 바로 반환)
+    - k-mer 앵커 사슬 사이의 구간만 밴드 편집 거리로 정렬 (삽입/삭제 포함, 밴드 폭 = 남은 허용 편집 수)
+    - min_identity에 도달할 수 없다고 판단되는 즉시 중단하고 (min_identity보다 작은 상한값, [])을 반환
+    diff 항목: [op, ref_start, ref_end, variant_segment] (op: 'replace' | 'delete' | 'insert')
+    """
+    if not reference or not variant:
+        return 0.0, []
+
+    longest = max(len(reference), len(variant))
+    budget = int((1.0 - min_identity) * longest + 1e-9)  # 허용 편집 수
+    below = (1.0 - (budget + 1) / longest, [])
+    if abs(len(reference) - len(variant)) > budget:
+        return below
+
+    ref = np.frombuffer(reference.encode('ascii', 'replace'), dtype=np.uint8)
+    var = np.frombuffer(variant.encode('ascii', 'replace'), dtype=np.uint8)
+    hamming = None
+    if len(ref) == len(var):
+        positions = np.flatnonzero(ref != var)
+        identity = 1.0 - len(positions) / longest
+        if len(positions) <= max_diff_ops:
+            hamming = (identity, [['replace', int(i), int(i) + 1, variant[i]] for i in positions])
+        if hamming and len(positions) <= 2:
+            return hamming  # 삽입+삭제 쌍으로는 더 줄일 수 없음
+        budget = min(budget, len(positions))  # 치환만으로도 이 거리는 가능 → 정렬은 더 짧은 경우만 찾음
+
+    # 앵커 블록 사이(앞/뒤 포함) 구간을 남은 편집 허용량 안에서 정렬
+    distance, spans = 0, []
+    prev_r = prev_v = 0
+    for r, v, length in _anchor_blocks(ref, var) + [(len(ref), len(var), 0)]:
+        a, b = ref[prev_r:r], var[prev_v:v]
+        if len(a) == len(b) and np.count_nonzero(a != b) <= 2:
+            # 같은 길이, 치환 2개 이하: 삽입+삭제로 더 줄일 수 없음
+            gap = (int(np.count_nonzero(a != b)), [(i, i + 1, i, i + 1) for i in np.flatnonzero(a != b).tolist()])
+        else:
+            gap = _banded_edit_ops(a, b, budget - distance)
+        if gap is None:
+            break
+        distance += gap[0]
+        spans.extend((prev_r + i1, prev_r + i2, prev_v + j1, prev_v + j2) for i1, i2, j1, j2 in gap[1])
+        prev_r, prev_v = r + length, v + length
+    else:
+        identity = 1.0 - distance / longest
+        if hamming and hamming[0] >= identity:
+            return hamming
+        diff = []
+        for i1, i2, j1, j2 in spans[:max_diff_ops]:
+            op = 'replace' if i1 < i2 and j1 < j2 else 'delete' if i1 < i2 else 'insert'
+            diff.append([op, i1, i2, variant[j1:j2]])
+        return identity, diff
+    return hamming if hamming and hamming[0] >= min_identity else below
+
+
+class SimilarityIndex:
+    """
+    k-mer MinHash 서명 + 밴드 LSH 인덱스 (SQLite 저장).
+    - sequence_signatures: record_id → MinHash 서명 (uint64 x num_perm BLOB)
+    - lsh_buckets: (band, bucket) → record_id, 같은 버킷을 공유하는 레코드만 후보로 비교
+    유사도는 서명 일치 비율(Jaccard 추정)과 Mash 거리로 반환합니다.
+    """
+    MAX_KMERS_PER_BLOCK = 8192
+    KEYED_ON_ROWID = False
+
+    def __init__(self, conn, k: int = 16, num_perm: int = 64, bands: int = 16):
+        assert num_perm % bands == 0, "num_perm must be divisible by bands"
+        self.conn = conn
+        self.k = k
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = np.random.RandomState(0x5EED)
+        self.seeds = rng.randint(0, 2**63 - 1, size=num_perm, dtype=np.int64).astype(np.uint64)[:, None]
+
+    # ========== Schema ==========
+    def create_schema(self, cursor) -> bool:
+        """테이블을 생성합니다. 반환: 새로 만들었는지 (기존 레코드 색인은 DatabaseManager가 백그라운드로 채움)"""
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='sequence_signatures'")
+        is_new = cursor.fetchone() is None
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sequence_signatures (
+                record_id TEXT PRIMARY KEY,
+                kmer_size INTEGER NOT NULL,
+                signature BLOB NOT NULL
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS lsh_buckets (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                record_id TEXT NOT NULL,
+                PRIMARY KEY (band, bucket, record_id)
+            ) WITHOUT ROWID
+        """)
+        return is_new
+
+    # ========== Sketching ==========
+    def signature(self, seq: str) -> Optional[np.ndarray]:
+        """canonical k-mer 집합의 MinHash 서명. 유효한 k-mer가 없으면 None."""
+        codes, valid = canonical_kmer_codes(encode_sequence(seq), self.k)
+        kmers = np.unique(codes[valid])
+        if len(kmers) == 0:
+            return None
+
+        sig = np.full(self.num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+        for start in range(0, len(kmers), self.MAX_KMERS_PER_BLOCK):
+            block = kmers[start:start + self.MAX_KMERS_PER_BLOCK]
+            hashed = _mix64(block[None, :] ^ self.seeds)
+            np.minimum(sig, hashed.min(axis=1), out=sig)
+        return sig
+
+    def _band_buckets(self, sig: np.ndarray) -> List[int]:
+        buckets = []
+        for band in range(self.bands):
+            chunk = sig[band * self.rows:(band + 1) * self.rows].tobytes()
+            digest = hashlib.blake2b(chunk, digest_size=8).digest()
+            buckets.append(int.from_bytes(digest, 'little', signed=True))
+        return buckets
+
+    def add(self, cursor, record_id: str, seq: str) -> bool:
+        """레코드 서명을 계산해 저장하고 LSH 버킷에 등록합니다 (커밋은 호출자 담당)."""
+        return self.store(cursor, record_id, self.signature(seq))
+
+    def prepare(self, seq: str) -> Optional[np.ndarray]:
+        """쓰기 락 밖에서 미리 계산할 색인 데이터 (= MinHash 서명)."""
+        return self.signature(seq)
+
+    def store(self, cursor, record_id: str, sig: Optional[np.ndarray]) -> bool:
+        """미리 계산한 서명을 저장합니다. 서명이 없으면(짧은 서열) 아무것도 하지 않습니다."""
+        if sig is None:
+            return False
+        cursor.execute(
+            "INSERT OR REPLACE INTO sequence_signatures (record_id, kmer_size, signature) VALUES (?, ?, ?)",
+            (record_id, self.k, sig.tobytes())
+        )
+        cursor.executemany(
+            "INSERT OR IGNORE INTO lsh_buckets (band, bucket, record_id) VALUES (?, ?, ?)",
+            [(band, bucket, record_id) for band, bucket in enumerate(self._band_buckets(sig))]
+        )
+        return True
+
+    # ========== Query ==========
+    def get_signature(self, record_id: str) -> Optional[np.ndarray]:
+        row = self.conn.execute(
+            "SELECT signature FROM sequence_signatures WHERE record_id = ?", (record_id,)
+        ).fetchone()
+        return np.frombuffer(row[0], dtype=np.uint64) if row else None
+
+    def mash_distance(self, jaccard: float) -> Optional[float]:
+        """Mash 거리 D = -1/k * ln(2J / (1 + J)). J=0이면 None(무한대)."""
+        if jaccard <= 0:
+            return None
+        return max(0.0, -1.0 / self.k * math.log(2 * jaccard / (1 + jaccard)))
+
+    def query(self, sig: np.ndarray, limit: int = 10, min_jaccard: float = 0.0,
+              exclude: Optional[str] = None, conn=None) -> List[Dict]:
+        """LSH 후보를 모은 뒤 서명을 비교해 Jaccard 추정값 순으로 이웃을 반환합니다."""
+        conn = conn or self.conn
+        buckets = self._band_buckets(sig)
+        placeholders = ', '.join(['(?, ?)'] * self.bands)
+        params = [v for pair in enumerate(buckets) for v in pair]
+        candidates = [r[0] for r in conn.execute(
+            f"SELECT DISTINCT record_id FROM lsh_buckets WHERE (band, bucket) IN (VALUES {placeholders})",
+            params
+        ).fetchall() if r[0] != exclude]
+        if not candidates:
+            return []
+
+        results = []
+        for start in range(0, len(candidates), 500):
+            batch = candidates[start:start + 500]
+            rows = conn.execute(
+                f"SELECT record_id, signature FROM sequence_signatures WHERE record_id IN ({', '.join('?' * len(batch))})",
+                batch
+            ).fetchall()
+            for record_id, blob in rows:
+                other = np.frombuffer(blob, dtype=np.uint64)
+                jaccard = float(np.mean(other == sig))
+                if jaccard >= min_jaccard:
+                    distance = self.mash_distance(jaccard)
+                    results.append({
+                        'record_id': record_id,
+                        'jaccard': round(jaccard, 4),
+                        'mash_distance': round(distance, 6) if distance is not None else None
+                    })
+
+        results.sort(key=lambda r: r['jaccard'], reverse=True)
+        return results[:limit]
+
+    def find_near_duplicate(self, conn, seq: str, min_identity: float, record_type: Optional[str] = None,
+                            max_candidates: int = 5, sig: Optional[np.ndarray] = None,
+                            pending: Optional[List[Dict]] = None) -> Optional[Dict]:
+        """
+        동일성 min_identity 이상인 기존 대표 서열을 찾습니다 (record_type이 주어지면 같은 타입만).
+        LSH 후보를 기대 Jaccard 하한으로 거른 뒤, 상위 후보만 실제 동일성을 계산합니다.
+        쓰기 락 밖에서 읽기 스냅샷(conn)으로 호출합니다. pending: conn에 아직 보이지 않는 같은 배치의 새 레코드
+        ({'record_id', 'dna_sequence', 'record_type', 'signature'})
+        Returns: {'record_id', 'identity', 'diff'} 또는 None
+        """
+        sig = self.signature(seq) if sig is None else sig
+        if sig is None:
+            return None
+
+        # 치환율 (1 - p)일 때 k-mer 보존 확률 ~ p^k → 기대 Jaccard = p^k / (2 - p^k), 추정 오차를 고려해 절반까지 허용
+        conserved = min_identity ** self.k
+        min_jaccard = 0.5 * conserved / (2 - conserved)
+        candidates = self.query(sig, limit=max_candidates, min_jaccard=min_jaccard, conn=conn)
+        local = {}
+        for item in pending or []:
+            if item.get('signature') is not None:
+                jaccard = float(np.mean(item['signature'] == sig))
+                if jaccard >= min_jaccard:
+                    candidates.append({'record_id': item['record_id'], 'jaccard': jaccard})
+                    local[item['record_id']] = (item['dna_sequence'], item['record_type'])
+        candidates = sorted(candidates, key=lambda c: c['jaccard'], reverse=True)[:max_candidates]
+
+        best = None
+        for candidate in candidates:
+            row = local.get(candidate['record_id']) or conn.execute(
+                "SELECT dna_sequence, record_type FROM genetic_records WHERE record_id = ?", (candidate['record_id'],)
+            ).fetchone()
+            if not row or (record_type and row[1] != record_type):
+                continue
+            # 이미 찾은 후보보다 높아야 의미가 있으므로 그 동일성을 하한으로 사용 (그보다 낮으면 조기 중단)
+            floor = max(min_identity, best['identity']) if best else min_identity
+            identity, diff = sequence_identity(row[0], seq, min_identity=floor)
+            if identity >= min_identity and (best is None or identity > best['identity']):
+                best = {'record_id': candidate['record_id'], 'identity': identity, 'diff': diff}
+        return best
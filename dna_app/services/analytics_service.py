@@ -0,0 +1,231 @@
+import csv
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+
+class AnalyticsMirror:
+    """
+    genetic_records와 파싱된 source_metadata를 로컬 DuckDB 파일에 컬럼형으로 복제합니다.
+    - SQLite가 변경되면(PRAGMA data_version) 주기적으로 전체 export → 스테이징 테이블 교체
+    - 동기화는 백그라운드 스레드에서 진행되며, 요청은 마지막으로 완성된 미러를 조회
+    - duckdb 패키지가 없으면 is_ready()가 False이고 분석 API는 기존 Python 집계를 사용
+    """
+    GROUP_COLUMNS = {
+        'virus_type': "virus_type || COALESCE(' ' || subtype, '')",
+        'host': 'host',
+        'location': 'location',
+        'year': 'year',
+        'gene': 'gene',
+    }
+    BUCKETS = ('day', 'week', 'month', 'year')
+
+    def __init__(self, db_manager, mirror_path: str, metadata_parser: Callable,
+                 refresh_interval: int = 30):
+        self.db_manager = db_manager
+        self.mirror_path = mirror_path
+        self.metadata_parser = metadata_parser
+        self.refresh_interval = refresh_interval
+        self.conn = None
+        self._watch_conn = None
+        self._synced_version = None
+        self._last_sync = 0.0
+        self._ready = False
+        self._sync_lock = threading.Lock()
+
+        if duckdb is None:
+            print("[Analytics] duckdb not installed. Columnar mirror disabled.")
+            return
+
+        try:
+            self.conn = duckdb.connect(self.mirror_path)
+            self._watch_conn = self.db_manager.open_reader()
+            tables = {row[0] for row in self.conn.execute("SHOW TABLES").fetchall()}
+            self._ready = {'records', 'record_metadata'} <= tables
+        except Exception as e:
+            print(f"[Analytics] Mirror unavailable: {e}")
+            self.conn = None
+
+    def is_available(self) -> bool:
+        return self.conn is not None
+
+    def is_ready(self) -> bool:
+        """미러가 한 번 이상 동기화되어 조회 가능한 상태인지 확인하고, 오래되었으면 백그라운드 갱신을 시작합니다."""
+        if not self.is_available():
+            return False
+        self.refresh_async()
+        return self._ready
+
+    def _source_version(self) -> Optional[int]:
+        try:
+            return self._watch_conn.execute("PRAGMA data_version").fetchone()[0]
+        except Exception:
+            return None
+
+    def is_stale(self) -> bool:
+        if not self._ready:
+            return True
+        if time.time() - self._last_sync < self.refresh_interval:
+            return False
+        return self._source_version() != self._synced_version
+
+    def refresh_async(self):
+        """미러가 오래되었으면 백그라운드 스레드에서 동기화합니다 (이미 진행 중이면 무시)."""
+        if not self.is_stale() or self._sync_lock.locked():
+            return
+        threading.Thread(target=self.sync, daemon=True).start()
+
+    def sync(self, force: bool = False) -> bool:
+        """SQLite 스냅샷을 CSV로 내보낸 뒤 DuckDB로 COPY 하여 미러 테이블을 교체합니다."""
+        if not self.is_available():
+            return False
+        if not self._sync_lock.acquire(blocking=False):
+            return False
+        try:
+            if not force and not self.is_stale():
+                return True
+            version = self._source_version()
+            started = time.time()
+
+            tmp_dir = tempfile.mkdtemp(prefix='analytics_', dir=os.path.dirname(self.mirror_path) or None)
+            records_csv = os.path.join(tmp_dir, 'records.csv')
+            metadata_csv = os.path.join(tmp_dir, 'record_metadata.csv')
+            try:
+                n_records = self._export_snapshot(records_csv, metadata_csv)
+
+                cur = self.conn.cursor()
+                cur.execute("""
+                    CREATE OR REPLACE TABLE records_raw (
+                        record_id VARCHAR, record_type VARCHAR, birth_time VARCHAR,
+                        death_time VARCHAR, occurrence_count BIGINT, sequence_length BIGINT
+                    )
+                """)
+                cur.execute("""
+                    CREATE OR REPLACE TABLE record_metadata_staging (
+                        record_id VARCHAR, accession VARCHAR, virus_type VARCHAR, subtype VARCHAR,
+                        host VARCHAR, location VARCHAR, year INTEGER, gene VARCHAR
+                    )
+                """)
+                cur.execute("COPY records_raw FROM ? (HEADER, NULLSTR '')", [records_csv])
+                # birth_time은 저장 경로마다 형식이 달라(ISO 'T' / 공백 구분) 변환 실패 시 NULL 처리
+                cur.execute("""
+                    CREATE OR REPLACE TABLE records_staging AS
+                    SELECT * REPLACE (TRY_CAST(birth_time AS TIMESTAMP) AS birth_time) FROM records_raw
+                """)
+                cur.execute("DROP TABLE records_raw")
+                cur.execute("COPY record_metadata_staging FROM ? (HEADER, NULLSTR '')", [metadata_csv])
+
+                cur.execute("BEGIN TRANSACTION")
+                cur.execute("DROP TABLE IF EXISTS records")
+                cur.execute("DROP TABLE IF EXISTS record_metadata")
+                cur.execute("ALTER TABLE records_staging RENAME TO records")
+                cur.execute("ALTER TABLE record_metadata_staging RENAME TO record_metadata")
+                cur.execute("COMMIT")
+            finally:
+                for path in (records_csv, metadata_csv):
+                    if os.path.exists(path):
+                        os.remove(path)
+                os.rmdir(tmp_dir)
+
+            self._synced_version = version
+            self._last_sync = time.time()
+            self._ready = True
+            print(f"[Analytics] Mirror synced: {n_records} records in {self._last_sync - started:.2f}s")
+            return True
+        except Exception as e:
+            print(f"[Analytics] Mirror sync failed: {e}")
+            return False
+        finally:
+            self._sync_lock.release()
+
+    def _export_snapshot(self, records_csv: str, metadata_csv: str) -> int:
+        """단일 읽기 스냅샷에서 레코드와 파싱된 메타데이터를 CSV로 씁니다."""
+        n_records = 0
+        with self.db_manager.read_snapshot() as conn, \
+                open(records_csv, 'w', newline='', encoding='utf-8') as rf, \
+                open(metadata_csv, 'w', newline='', encoding='utf-8') as mf:
+            records_writer = csv.writer(rf)
+            metadata_writer = csv.writer(mf)
+            records_writer.writerow(['record_id', 'record_type', 'birth_time', 'death_time',
+                                     'occurrence_count', 'sequence_length'])
+            metadata_writer.writerow(['record_id', 'accession', 'virus_type', 'subtype',
+                                      'host', 'location', 'year', 'gene'])
+
+            cursor = conn.execute("""
+                SELECT record_id, record_type, birth_time, death_time, occurrence_count,
+                       length(dna_sequence), source_metadata
+                FROM genetic_records
+            """)
+            while True:
+                rows = cursor.fetchmany(1000)
+                if not rows:
+                    break
+                for record_id, record_type, birth_time, death_time, count, length, meta in rows:
+                    records_writer.writerow([record_id, record_type, birth_time, death_time,
+                                             count or 1, length])
+                    if not meta or meta == '[]':
+                        continue
+                    for p in self.metadata_parser(meta):
+                        metadata_writer.writerow([record_id, p['accession'], p['virus_type'], p['subtype'],
+                                                  p['host'], p['location'], p['year'], p['gene']])
+                n_records += len(rows)
+        return n_records
+
+    # ========== Query Methods ==========
+    def group_counts(self, column: str, limit: Optional[int] = None, order: str = 'count') -> Dict:
+        """record_metadata에 대한 GROUP BY 집계 ({값: 개수})."""
+        expr = self.GROUP_COLUMNS[column]
+        order_by = "n DESC, k" if order == 'count' else "k"
+        query = f"""
+            SELECT {expr} AS k, COUNT(*) AS n
+            FROM record_metadata
+            WHERE {column} IS NOT NULL
+            GROUP BY k
+            ORDER BY {order_by}
+        """
+        params = []
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        rows = self.conn.cursor().execute(query, params).fetchall()
+        return {k: n for k, n in rows}
+
+    def distinct_values(self, column: str) -> List:
+        expr = self.GROUP_COLUMNS[column]
+        rows = self.conn.cursor().execute(
+            f"SELECT DISTINCT {expr} FROM record_metadata WHERE {column} IS NOT NULL"
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def time_buckets(self, bucket: str = 'month', record_type: Optional[str] = None) -> List[Dict]:
+        """birth_time 기준 시간 버킷별 레코드 수와 누적 관측(occurrence) 수."""
+        if bucket not in self.BUCKETS:
+            raise ValueError(f"bucket must be one of {self.BUCKETS}")
+        query = f"""
+            SELECT date_trunc('{bucket}', birth_time) AS bucket,
+                   COUNT(*) AS records, SUM(occurrence_count) AS occurrences
+            FROM records
+        """
+        params = []
+        if record_type:
+            query += " WHERE record_type = ?"
+            params.append(record_type)
+        query += " GROUP BY bucket ORDER BY bucket"
+        rows = self.conn.cursor().execute(query, params).fetchall()
+        return [{'bucket': b.date().isoformat() if b else None, 'records': r, 'occurrences': int(o or 0)}
+                for b, r, o in rows]
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+        if self._watch_conn:
+            self._watch_conn.close()
+            self._watch_conn = None
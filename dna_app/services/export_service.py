@@ -0,0 +1,168 @@
+from datetime import datetime
+from typing import Callable, Iterator, List, Optional
+
+from dna_app.services.sequence_normalizer import as_canonical
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+FORMATS = ('parquet', 'arrow')
+INCLUDES = ('metadata', 'predictions')
+
+
+def is_available() -> bool:
+    return pa is not None
+
+
+class _ChunkSink:
+    """Arrow writer 출력을 모아 두었다가 배치마다 꺼내 보내는 쓰기 전용 file-like 객체."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        out = b''.join(self.chunks)
+        self.chunks.clear()
+        return out
+
+
+def _parse_time(value) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ArrowExporter:
+    """
+    genetic_records를 Parquet(row group 단위) 또는 Arrow IPC 스트림으로 내보냅니다.
+    - 읽기 스냅샷 커서에서 batch_size 행씩 읽어 RecordBatch로 만들고 즉시 전송 → 메모리는 배치 크기로 제한
+    - record_type, virus_type, host 등 반복되는 범주형 컬럼은 dictionary 인코딩
+    - include: 'metadata' (최근 source 헤더 파싱 결과), 'predictions' (현재 모델의 배치 예측)
+    """
+    CATEGORICAL = pa.dictionary(pa.int32(), pa.string()) if pa else None
+
+    def __init__(self, db_manager, metadata_parser: Callable = None, ml_service=None):
+        self.db_manager = db_manager
+        self.metadata_parser = metadata_parser
+        self.ml_service = ml_service
+
+    def schema(self, include: List[str]):
+        fields = [
+            pa.field('record_id', pa.string(), nullable=False),
+            pa.field('record_type', self.CATEGORICAL),
+            pa.field('dna_sequence', pa.large_string()),
+            pa.field('sequence_length', pa.int32()),
+            pa.field('birth_time', pa.timestamp('us')),
+            pa.field('death_time', pa.timestamp('us')),
+            pa.field('occurrence_count', pa.int64()),
+        ]
+        if 'metadata' in include:
+            fields += [
+                pa.field('accession', pa.string()),
+                pa.field('virus_type', self.CATEGORICAL),
+                pa.field('subtype', self.CATEGORICAL),
+                pa.field('host', self.CATEGORICAL),
+                pa.field('location', self.CATEGORICAL),
+                pa.field('year', pa.int32()),
+                pa.field('gene', self.CATEGORICAL),
+            ]
+        if 'predictions' in include:
+            fields += [
+                pa.field('predicted_type', self.CATEGORICAL),
+                pa.field('confidence', pa.float32()),
+            ]
+        return pa.schema(fields)
+
+    def _batch(self, rows, schema, include: List[str]):
+        record_ids, sequences, record_types, birth, death, counts, metas = zip(*rows)
+        columns = {
+            'record_id': list(record_ids),
+            'record_type': list(record_types),
+            'dna_sequence': list(sequences),
+            'sequence_length': [len(s) if s else 0 for s in sequences],
+            'birth_time': [_parse_time(t) for t in birth],
+            'death_time': [_parse_time(t) for t in death],
+            'occurrence_count': [c or 1 for c in counts],
+        }
+        if 'metadata' in include:
+            keys = ('accession', 'virus_type', 'subtype', 'host', 'location', 'year', 'gene')
+            for key in keys:
+                columns[key] = []
+            for meta in metas:
+                parsed = self.metadata_parser(meta) if meta and meta != '[]' else []
+                latest = parsed[-1] if parsed else {}
+                for key in keys:
+                    columns[key].append(latest.get(key))
+        if 'predictions' in include:
+            predictions = self.ml_service.predict_batch(as_canonical(sequences), persist=True)
+            columns['predicted_type'] = [p['predicted_type'] for p in predictions]
+            columns['confidence'] = [p['confidence'] for p in predictions]
+
+        arrays = []
+        for field in schema:
+            values = columns[field.name]
+            if pa.types.is_dictionary(field.type):
+                arrays.append(pa.array(values, type=pa.string()).dictionary_encode().cast(field.type))
+            else:
+                arrays.append(pa.array(values, type=field.type))
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    def stream(self, fmt: str = 'parquet', include: List[str] = (), record_type: Optional[str] = None,
+               batch_size: int = 10000) -> Iterator[bytes]:
+        """내보내기 파일을 바이트 청크로 생성합니다 (Parquet: 배치 = row group)."""
+        include = list(include)
+        schema = self.schema(include)
+        sink = _ChunkSink()
+        if fmt == 'parquet':
+            writer = pq.ParquetWriter(sink, schema, compression='zstd')
+        else:
+            writer = pa.ipc.new_stream(sink, schema)
+
+        query = ("SELECT record_id, dna_sequence, record_type, birth_time, death_time, occurrence_count, "
+                 "source_metadata FROM genetic_records")
+        params = []
+        if record_type:
+            query += " WHERE record_type = ?"
+            params.append(record_type)
+
+        try:
+            with self.db_manager.read_snapshot() as conn:
+                cursor = conn.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    batch = self._batch(rows, schema, include)
+                    if fmt == 'parquet':
+                        writer.write_batch(batch, row_group_size=len(rows))
+                    else:
+                        writer.write_batch(batch)
+                    chunk = sink.drain()
+                    if chunk:
+                        yield chunk
+        finally:
+            writer.close()
+        yield sink.drain()
@@ -0,0 +1,90 @@
+import gzip
+import io
+import mmap
+import os
+from typing import Iterable, Iterator, Tuple, Union
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+class _PrefixedStream(io.RawIOBase):
+    """이미 읽은 앞부분(prefix)을 먼저 돌려준 뒤 나머지 스트림을 이어서 읽습니다."""
+
+    def __init__(self, prefix: bytes, stream):
+        self.prefix, self.stream = prefix, stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self.prefix:
+            n = min(len(buffer), len(self.prefix))
+            buffer[:n] = self.prefix[:n]
+            self.prefix = self.prefix[n:]
+            return n
+        return self.stream.readinto(buffer)
+
+
+def _binary_lines(stream) -> Iterator[bytes]:
+    """바이너리 file-like 객체의 줄 iterator. gzip 매직 바이트가 보이면 압축을 풀며 읽습니다."""
+    if not hasattr(stream, 'peek'):
+        stream = io.BufferedReader(stream)
+    head = stream.peek(2)[:2]
+    if len(head) < 2:
+        # peek은 원시 스트림을 한 번만 읽으므로 조각나서 도착하는 입력에서는 1바이트만 보일 수 있음
+        head = stream.read(2)
+        stream = io.BufferedReader(_PrefixedStream(head, stream))
+    if head == GZIP_MAGIC:
+        stream = gzip.GzipFile(fileobj=stream)
+    return iter(stream)
+
+
+def _path_lines(path: str) -> Iterator[bytes]:
+    """파일 경로의 줄 iterator. 비압축 파일은 mmap으로 읽어 파이썬 버퍼 복사를 줄이고, gzip은 스트리밍 해제합니다."""
+    with open(path, 'rb') as f:
+        if f.read(2) == GZIP_MAGIC:
+            f.seek(0)
+            with gzip.GzipFile(fileobj=f) as gz:
+                yield from gz
+            return
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield from iter(mm.readline, b'')
+
+
+def _lines(source) -> Iterator[Union[str, bytes]]:
+    if isinstance(source, (str, os.PathLike)):
+        # 파일 경로
+        return _path_lines(os.fspath(source))
+    if hasattr(source, 'read'):
+        if isinstance(source, io.TextIOBase):
+            return iter(source)
+        return _binary_lines(source)
+    # requests Response.iter_lines() 등 줄(str/bytes) iterable
+    return iter(source)
+
+
+def iter_fasta(source: Union[str, Iterable, io.IOBase]) -> Iterator[Tuple[str, str]]:
+    """
+    FASTA를 스트리밍으로 읽어 레코드가 완성될 때마다 (header, sequence)를 생성합니다.
+    source: 파일 경로 (비압축은 mmap), 바이너리/텍스트 file-like 객체 (gzip 자동 감지), 또는 줄 iterable (resp.iter_lines())
+    한 번에 메모리에 올라가는 것은 현재 레코드 하나뿐입니다.
+    """
+    header = None
+    parts = []
+    for line in _lines(source):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', 'replace')
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('>'):
+            if header is not None:
+                yield header, ''.join(parts)
+            header = line[1:].strip()
+            parts = []
+        elif header is not None:
+            parts.append(line)
+    if header is not None:
+        yield header, ''.join(parts)
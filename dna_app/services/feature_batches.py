@@ -0,0 +1,66 @@
+from itertools import islice
+from typing import Iterable, Iterator, List
+
+import numpy as np
+
+from dna_app.services.sequence_normalizer import canonical
+
+
+def iter_chunks(items: Iterable, size: int) -> Iterator[List]:
+    """iterable을 최대 size개씩 나눈 리스트로 순회합니다 (리스트/제너레이터 모두 전체를 복사하지 않음)."""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class BatchTransformMixin:
+    """
+    특징 추출기 공통 배치 변환 (BiologicalFeatureExtractor, SequenceFeatureExtractor).
+    하위 클래스는 n_features_out과 _featurize(row, seq)를 구현합니다 (row: 0으로 초기화된 출력 행, seq: 정규화된 서열).
+    - transform(X, batch_size, dtype, out): 미리 할당한 출력 배열(np.memmap 포함)에 배치 단위로 기록
+    - iter_transform(X, batch_size, dtype): 특징 블록을 차례로 yield → 전체 행렬 없이 고정 메모리로 처리
+    """
+    DEFAULT_BATCH_SIZE = 1000
+
+    def transform(self, X, batch_size=None, dtype=np.float64, out=None):
+        """
+        X: List of DNA strings (out을 주면 길이를 모르는 iterable도 가능)
+        batch_size: 한 번에 읽어 기록할 서열 수 (np.memmap 출력은 배치마다 flush)
+        dtype: 출력 dtype (out을 주면 out의 dtype)
+        out: (n_samples, n_features) 출력 배열 또는 np.memmap
+        Returns: numpy array of shape (n_samples, n_features)
+        """
+        if out is None:
+            if not hasattr(X, '__len__'):
+                X = list(X)
+            out = np.empty((len(X), self.n_features_out), dtype=dtype)
+        elif out.ndim != 2 or out.shape[1] != self.n_features_out:
+            raise ValueError(f"out must have shape (n_samples, {self.n_features_out}), got {out.shape}")
+
+        filled = 0
+        for chunk in iter_chunks(X, batch_size or self.DEFAULT_BATCH_SIZE):
+            if filled + len(chunk) > len(out):
+                raise ValueError(f"out has {len(out)} rows but X has more samples")
+            self._fill_block(out[filled:filled + len(chunk)], chunk)
+            filled += len(chunk)
+            if isinstance(out, np.memmap):
+                out.flush()
+        if filled != len(out):
+            raise ValueError(f"out has {len(out)} rows but X has {filled} samples")
+        return out
+
+    def iter_transform(self, X, batch_size=None, dtype=np.float64) -> Iterator[np.ndarray]:
+        """X를 batch_size개씩 변환한 (len(chunk), n_features) 블록을 차례로 반환합니다."""
+        for chunk in iter_chunks(X, batch_size or self.DEFAULT_BATCH_SIZE):
+            block = np.empty((len(chunk), self.n_features_out), dtype=dtype)
+            self._fill_block(block, chunk)
+            yield block
+
+    def _fill_block(self, block, seqs):
+        block[:] = 0
+        for row, seq in zip(block, seqs):
+            # 수집 단계에서 정규화된 CanonicalSequence는 그대로 사용
+            self._featurize(row, canonical(seq))
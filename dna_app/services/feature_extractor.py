@@ -2,14 +2,19 @@ import numpy as np
 import math
 from collections import Counter
 from sklearn.base import BaseEstimator, TransformerMixin
+from dna_app.services.feature_batches import BatchTransformMixin
+from dna_app.services.sequence_encoding import STRICT_CODES, shannon_entropy, small_kmer_codes, to_bytes
 
-class BiologicalFeatureExtractor(BaseEstimator, TransformerMixin):
+class BiologicalFeatureExtractor(BatchTransformMixin, BaseEstimator, TransformerMixin):
     """
     DNA 서열로부터 생물학적으로 유의미한 수치형 특징들을 추출합니다.
     1. GC Content
     2. Sequence Entropy (Complexity)
     3. K-mer Frequencies (compositional bias)
     """
+    # 특징 정의(순서/계산식)가 바뀌면 올려서 특징 저장소(feature_store)의 이전 벡터를 무효화
+    VERSION = 1
+
     def __init__(self, kmer_size=3):
         self.kmer_size = kmer_size
         self.kmers = self._generate_kmers(kmer_size)
@@ -23,45 +28,54 @@ class BiologicalFeatureExtractor(BaseEstimator, TransformerMixin):
     def fit(self, X, y=None):
         return self
 
-    def transform(self, X):
-        """
-        X: List of DNA strings
-        Returns: numpy array of shape (n_samples, n_features)
-        """
-        features = []
-        for seq in X:
-            # Normalize
-            if not seq:
-                seq = ""
-            seq = seq.upper().replace('U', 'T') 
-            
-            row = []
-            length = len(seq)
-            
-            # 1. GC Content
-            if length > 0:
-                gc_count = seq.count('G') + seq.count('C')
-                gc_content = gc_count / length
-            else:
-                gc_content = 0
-            row.append(gc_content)
-            
-            # 2. Shannon Entropy (Sequence Complexity)
-            entropy = self._calculate_entropy(seq)
-            row.append(entropy)
-            
-            # 3. K-mer Frequency Profile (Normalized)
-            total_kmers = length - self.kmer_size + 1
-            if total_kmers > 0:
-                counts = Counter([seq[i:i+self.kmer_size] for i in range(total_kmers)])
-                for kmer in self.kmers:
-                    row.append(counts.get(kmer, 0) / total_kmers)
-            else:
-                row.extend([0] * len(self.kmers))
-                
-            features.append(row)
-            
-        return np.array(features)
+    @property
+    def n_features_out(self):
+        return 2 + len(self.kmers)
+
+    def _featurize(self, row, seq):
+        """정규화된 서열 하나의 특징을 0으로 초기화된 row에 기록합니다 (transform/iter_transform 공용)."""
+        length = len(seq)
+        if not seq.isascii():
+            # 비 ASCII 문자는 바이트 단위 계산과 문자 수가 달라지므로 문자열 경로 사용
+            row[:] = self._transform_text(seq)
+            return
+        raw = to_bytes(seq)
+        histogram = np.bincount(raw, minlength=256)
+        
+        # 1. GC Content
+        if length > 0:
+            row[0] = int(histogram[ord('G')] + histogram[ord('C')]) / length
+        
+        # 2. Shannon Entropy (Sequence Complexity)
+        row[1] = shannon_entropy(seq, histogram)
+        
+        # 3. K-mer Frequency Profile (Normalized)
+        # 2-bit 코드 → 롤링 k-mer 정수 코드 → bincount (N 등 ACGT 외 염기를 포함한 윈도우는 분모에만 포함)
+        total_kmers = length - self.kmer_size + 1
+        if total_kmers > 0:
+            counts = self._kmer_counts(STRICT_CODES[raw])
+            row[2:] = counts / total_kmers
+
+    def _transform_text(self, seq):
+        """문자열 슬라이스 기반 계산 (비 ASCII 입력용 기존 경로)."""
+        row = []
+        length = len(seq)
+        row.append((seq.count('G') + seq.count('C')) / length if length > 0 else 0)
+        row.append(self._calculate_entropy(seq))
+        total_kmers = length - self.kmer_size + 1
+        if total_kmers > 0:
+            counts = Counter([seq[i:i+self.kmer_size] for i in range(total_kmers)])
+            row.extend(counts.get(kmer, 0) / total_kmers for kmer in self.kmers)
+        else:
+            row.extend([0] * len(self.kmers))
+        return row
+
+    def _kmer_counts(self, codes):
+        """k-mer 코드별 등장 횟수 (kmers 목록 순서). codes: STRICT_CODES로 인코딩한 배열"""
+        values, valid = small_kmer_codes(codes, self.kmer_size)
+        if valid is not None:
+            values = values[valid]
+        return np.bincount(values, minlength=len(self.kmers))
 
     def _calculate_entropy(self, seq):
         """Calculate Shannon entropy of the sequence per base"""
@@ -0,0 +1,282 @@
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from dna_app.database.job_queue import JobQueue, LeaseLost
+from dna_app.services.ncbi_client import EutilsError
+from dna_app.services.sequence_normalizer import try_normalize
+
+
+class HarvestService:
+    """
+    재개 가능한 NCBI 수집 작업.
+    - 작업 시작 시 esearch usehistory=y로 검색을 한 번 실행하고 수집할 UID 목록을 DB(harvest_job_uids)에 고정
+    - 페이지는 고정한 목록의 position 구간을 id로 efetch → WebEnv 만료/재시작 후에도 검색을 다시 실행하지 않으므로
+      새로 등록된 레코드로 결과 집합이나 순서가 바뀌지 않음
+    - 각 페이지의 레코드 저장과 체크포인트(next_retstart, added, duplicates)를 같은 트랜잭션으로 커밋
+      → 중단된 작업은 마지막으로 커밋된 지점부터 정확히 재개 (중복 upsert 없음)
+    - 실행권은 DB의 임대(owner + lease_expires_at)로 관리: 실행 중에는 lease_seconds / 3 마다 연장하고,
+      체크포인트는 임대를 가진 경우에만 커밋 → 웹 프로세스와 dna_worker가 같은 작업을 동시에 실행하지 않음
+    """
+    PAGE_SIZE = 200
+
+    def __init__(self, db_manager, record_service, recover_interrupted: bool = True,
+                 owner_id: Optional[str] = None, lease_seconds: float = 60.0):
+        self.db_manager = db_manager
+        self.record_service = record_service
+        self.owner_id = owner_id or JobQueue.default_worker_id()
+        self.lease_seconds = lease_seconds
+        self._threads: Dict[str, threading.Thread] = {}
+        self._pause_requested = set()
+        self._lock = threading.Lock()
+        if recover_interrupted:
+            # 임대가 만료된 작업만 interrupted로 표시 (소유 프로세스가 종료됨). 다른 프로세스가 실행 중인 작업은 그대로
+            self.db_manager.execute_write(
+                "UPDATE harvest_jobs SET status = 'interrupted', owner = NULL, lease_expires_at = NULL, updated_at = ? "
+                "WHERE status IN ('pending', 'running') AND (lease_expires_at IS NULL OR lease_expires_at < ?)",
+                (datetime.now().isoformat(), time.time())
+            )
+
+    @property
+    def ncbi(self):
+        return self.record_service.ncbi
+
+    # ========== Job Table ==========
+    COLUMNS = ['job_id', 'record_type', 'term', 'sort', 'webenv', 'query_key', 'total_count', 'target_count',
+               'pinned_count', 'next_retstart', 'added', 'duplicates', 'status', 'error', 'owner', 'lease_expires_at',
+               'created_at', 'updated_at']
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        with self.db_manager.read_snapshot() as conn:
+            row = conn.execute(f"SELECT {', '.join(self.COLUMNS)} FROM harvest_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return dict(zip(self.COLUMNS, row)) if row else None
+
+    def list_jobs(self, limit: int = 50) -> List[Dict]:
+        with self.db_manager.read_snapshot() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM harvest_jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [dict(zip(self.COLUMNS, r)) for r in rows]
+
+    def _release(self, job_id: str, **fields):
+        """임대를 가진 경우에만 상태를 기록하고 임대를 반납합니다 (임대를 잃었으면 새 소유자의 상태를 덮어쓰지 않음)."""
+        fields.update(owner=None, lease_expires_at=None, updated_at=datetime.now().isoformat())
+        assignments = ', '.join(f"{k} = ?" for k in fields)
+        self.db_manager.execute_write(f"UPDATE harvest_jobs SET {assignments} WHERE job_id = ? AND owner = ?",
+                                      list(fields.values()) + [job_id, self.owner_id])
+
+    # ========== Lease ==========
+    def _claim(self, job_id: str) -> bool:
+        """작업의 임대를 가져옵니다. 완료됐거나 다른 프로세스가 유효한 임대를 가지고 있으면 False."""
+        now = time.time()
+        return self.db_manager.execute_write("""
+            UPDATE harvest_jobs SET status = 'running', error = NULL, owner = ?, lease_expires_at = ?, updated_at = ?
+            WHERE job_id = ? AND status != 'completed'
+              AND (owner IS NULL OR owner = ? OR lease_expires_at IS NULL OR lease_expires_at < ?)
+        """, (self.owner_id, now + self.lease_seconds, datetime.now().isoformat(), job_id, self.owner_id, now)) > 0
+
+    def _keep_lease(self, job_id: str, done: threading.Event, lost: threading.Event):
+        while not done.wait(max(self.lease_seconds / 3, 0.05)):
+            try:
+                renewed = self.db_manager.execute_write(
+                    "UPDATE harvest_jobs SET lease_expires_at = ? WHERE job_id = ? AND owner = ?",
+                    (time.time() + self.lease_seconds, job_id, self.owner_id)
+                )
+            except Exception as e:
+                # 일시적 오류는 다음 주기에 다시 시도 (임대 만료 전까지 여유가 있음)
+                print(f"[Harvest] Lease renewal failed for {job_id[:8]}: {e}")
+                continue
+            if not renewed:
+                lost.set()
+                return
+
+    def _check_owner(self, cursor, job_id: str):
+        """트랜잭션 안에서 임대 소유를 확인합니다. 잃었으면 LeaseLost → 롤백."""
+        owner = cursor.execute("SELECT owner FROM harvest_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if owner is None or owner[0] != self.owner_id:
+            raise LeaseLost(job_id)
+
+    # ========== Control ==========
+    def start_job(self, record_type: str = 'DNA', count: int = 1000, sort: str = 'relevance',
+                  background: bool = True) -> Dict:
+        """새 수집 작업을 만들고 실행합니다."""
+        return self._launch(self.create_job(record_type, count, sort), background)
+
+    def create_job(self, record_type: str = 'DNA', count: int = 1000, sort: str = 'relevance') -> str:
+        """임대를 가진 새 수집 작업을 만들고 job_id를 반환합니다 (실행은 run_job)."""
+        job_id = str(uuid.uuid4())
+        now = datetime.now().isoformat()
+        # 임대를 가진 상태로 생성 → 다른 프로세스의 복구 단계가 interrupted로 바꾸지 않음
+        self.db_manager.execute_write("""
+            INSERT INTO harvest_jobs (job_id, record_type, term, sort, target_count, status, owner, lease_expires_at,
+                                      created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, 'running', ?, ?, ?, ?)
+        """, (job_id, record_type, self.record_service.ncbi_term(record_type),
+              'date' if sort == 'date' else 'relevance', int(count), self.owner_id, time.time() + self.lease_seconds,
+              now, now))
+        return job_id
+
+    def resume_job(self, job_id: str, background: bool = True, ctx=None) -> Optional[Dict]:
+        """
+        중단/일시정지/실패한 작업을 체크포인트부터 이어서 실행합니다.
+        ctx: 큐 작업 컨텍스트 (background=False일 때만, run_job 참고)
+        """
+        job = self.get_job(job_id)
+        if job is None:
+            return None
+        if job['status'] == 'completed' or self.is_running(job_id):
+            return job
+        if not self._claim(job_id):
+            print(f"[Harvest] Job {job_id[:8]} is leased by {job['owner']}; not resuming")
+            return self.get_job(job_id)
+        return self._launch(job_id, background, ctx)
+
+    def pause_job(self, job_id: str) -> Optional[Dict]:
+        """현재 페이지 저장이 끝나면 멈추도록 요청합니다."""
+        job = self.get_job(job_id)
+        if job and self.is_running(job_id):
+            self._pause_requested.add(job_id)
+        return job
+
+    def is_running(self, job_id: str) -> bool:
+        thread = self._threads.get(job_id)
+        return thread is not None and thread.is_alive()
+
+    def _launch(self, job_id: str, background: bool, ctx=None) -> Dict:
+        """임대를 가진 작업을 실행합니다."""
+        if not background:
+            self.run_job(job_id, ctx)
+            return self.get_job(job_id)
+        with self._lock:
+            thread = threading.Thread(target=self.run_job, args=(job_id,), daemon=True, name=f'harvest-{job_id[:8]}')
+            self._threads[job_id] = thread
+            thread.start()
+        return self.get_job(job_id)
+
+    # ========== Worker ==========
+    def _pin_result_set(self, job: Dict) -> Dict:
+        """
+        esearch history로 검색을 한 번 실행하고, 수집할 앞 target_count개 UID를 harvest_job_uids에 저장합니다.
+        이후 페이지는 이 목록의 position 구간을 id로 efetch → WebEnv가 만료되거나 프로세스가 재시작되어도
+        검색을 다시 실행하지 않으므로 새로 등록된 레코드 때문에 결과 집합/순서가 바뀌지 않습니다.
+        (UID 목록을 다 받기 전에 history가 만료되면 아직 아무것도 저장하지 않았으므로 처음부터 다시 고정)
+        """
+        for attempt in range(2):
+            history = self.ncbi.esearch_history(job['term'], sort=job['sort'])
+            wanted = min(job['target_count'], history['count'])
+            uids = self.ncbi.history_uids(history['webenv'], history['query_key'], wanted)
+            if len(uids) == wanted:
+                break
+            print(f"[Harvest] Job {job['job_id'][:8]} history returned {len(uids)}/{wanted} UIDs, re-running esearch")
+        else:
+            raise EutilsError(f"could not pin the result set ({len(uids)}/{wanted} UIDs)")
+
+        now = datetime.now().isoformat()
+        with self.db_manager.transaction() as cursor:
+            self._check_owner(cursor, job['job_id'])
+            cursor.execute("DELETE FROM harvest_job_uids WHERE job_id = ?", (job['job_id'],))
+            cursor.executemany("INSERT INTO harvest_job_uids (job_id, position, uid) VALUES (?, ?, ?)",
+                               [(job['job_id'], position, uid) for position, uid in enumerate(uids)])
+            cursor.execute(
+                "UPDATE harvest_jobs SET webenv = ?, query_key = ?, total_count = ?, pinned_count = ?, updated_at = ? "
+                "WHERE job_id = ?",
+                (history['webenv'], history['query_key'], history['count'], len(uids), now, job['job_id'])
+            )
+        job.update(webenv=history['webenv'], query_key=history['query_key'], total_count=history['count'],
+                   pinned_count=len(uids))
+        # esearch가 돌려준 건수로 ncbi_meta 캐시도 갱신 (별도 count 왕복 불필요)
+        self.record_service.meta_cache.put(f"{job['record_type']}|{job['term']}", history['count'])
+        print(f"[Harvest] Job {job['job_id'][:8]} pinned {len(uids)} UIDs (of {history['count']} matches)")
+        return job
+
+    def _page_uids(self, job_id: str, start: int, count: int) -> List[str]:
+        with self.db_manager.read_snapshot() as conn:
+            rows = conn.execute(
+                "SELECT uid FROM harvest_job_uids WHERE job_id = ? AND position >= ? AND position < ? ORDER BY position",
+                (job_id, start, start + count)
+            ).fetchall()
+        return [uid for uid, in rows]
+
+    @staticmethod
+    def _page_counts(job: Dict, results) -> Dict:
+        """upsert 결과(is_new)로 누적 신규/중복 수를 셉니다 (이미 있던 서열은 added에 넣지 않음)."""
+        new = sum(1 for _, is_new in results if is_new)
+        return {'added': job['added'] + new, 'duplicates': (job['duplicates'] or 0) + len(results) - new}
+
+    def _checkpoint_writer(self, job: Dict, next_retstart: int):
+        def write(cursor, results):
+            self._check_owner(cursor, job['job_id'])  # 임대를 잃었으면 이 페이지 전체를 롤백
+            counts = self._page_counts(job, results)
+            cursor.execute(
+                "UPDATE harvest_jobs SET next_retstart = ?, added = ?, duplicates = ?, updated_at = ? WHERE job_id = ?",
+                (next_retstart, counts['added'], counts['duplicates'], datetime.now().isoformat(), job['job_id'])
+            )
+        return write
+
+    def _complete(self, job_id: str):
+        with self.db_manager.transaction() as cursor:
+            self._check_owner(cursor, job_id)
+            cursor.execute("UPDATE harvest_jobs SET status = 'completed', owner = NULL, lease_expires_at = NULL, "
+                           "updated_at = ? WHERE job_id = ?", (datetime.now().isoformat(), job_id))
+            cursor.execute("DELETE FROM harvest_job_uids WHERE job_id = ?", (job_id,))
+
+    def run_job(self, job_id: str, ctx=None):
+        """
+        임대를 가진 작업을 실행합니다 (_claim 또는 create_job 이후).
+        ctx: Job/JobContext (선택). 페이지마다 진행 상황을 기록하고, 취소 요청 시 현재 페이지까지 저장한 뒤 paused로 멈춤
+        """
+        job = self.get_job(job_id)
+        if job is None:
+            print(f"[Harvest] Job {job_id[:8]} not found")
+            return
+        print(f"[Harvest] Job {job_id[:8]} {job['record_type']} from {job['next_retstart']}/{job['target_count']}")
+        done, lost = threading.Event(), threading.Event()
+        keeper = threading.Thread(target=self._keep_lease, args=(job_id, done, lost), daemon=True)
+        keeper.start()
+        try:
+            if job['pinned_count'] is None:
+                # 새 작업 (또는 UID 목록 도입 전에 만든 작업: 현재 결과 집합을 고정하고 체크포인트부터 계속)
+                job = self._pin_result_set(job)
+
+            while True:
+                end = job['pinned_count']
+                if job['next_retstart'] >= end:
+                    self._complete(job_id)
+                    print(f"[Harvest] Job {job_id[:8]} completed: {job['added']} records")
+                    return
+                if lost.is_set():
+                    raise LeaseLost(job_id)
+                if ctx is not None:
+                    ctx.total = end
+                    ctx.set(fetched=job['next_retstart'], inserted=job['added'], duplicates=job['duplicates'] or 0)
+                if job_id in self._pause_requested or (ctx is not None and ctx.cancel_requested):
+                    self._pause_requested.discard(job_id)
+                    self._release(job_id, status='paused')
+                    print(f"[Harvest] Job {job_id[:8]} paused at {job['next_retstart']}")
+                    return
+
+                uids = self._page_uids(job_id, job['next_retstart'], self.PAGE_SIZE)
+                if not uids:
+                    raise EutilsError(f"pinned UID list is missing positions from {job['next_retstart']}")
+                records = list(self.ncbi.iter_efetch_fasta(uids))
+
+                canonical = ((header, try_normalize(seq)) for header, seq in records)
+                batch = [{
+                    "record_id": str(uuid.uuid4()), "dna_sequence": seq, "birth_time": datetime.now(),
+                    "record_type": job['record_type'], "source_info": header
+                } for header, seq in canonical if seq is not None and len(seq) >= 100]
+                next_retstart = job['next_retstart'] + len(uids)
+                results = self.db_manager.upsert_records(batch, before_commit=self._checkpoint_writer(job, next_retstart))
+                job.update(next_retstart=next_retstart, **self._page_counts(job, results))
+                print(f"[Harvest] Job {job_id[:8]} {job['next_retstart']}/{end} "
+                      f"({job['added']} added, {job['duplicates']} duplicates)")
+        except LeaseLost:
+            print(f"[Harvest] Job {job_id[:8]} lost its lease; another process owns it now")
+        except Exception as e:
+            print(f"[Harvest] Job {job_id[:8]} failed: {e}")
+            self._release(job_id, status='failed', error=str(e))
+        finally:
+            done.set()
+            keeper.join()
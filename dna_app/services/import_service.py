@@ -0,0 +1,72 @@
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from dna_app.services.fasta_parser import iter_fasta
+from dna_app.services.sequence_normalizer import ambiguity_stats, try_normalize
+
+
+class FastaImporter:
+    """
+    로컬 FASTA / FASTA.gz 대량 적재 (dna_import.py CLI와 /api/records/import 업로드 공용).
+    - iter_fasta 스트리밍 파싱 (비압축 파일 경로는 mmap, gzip 자동 감지) → 메모리에는 현재 배치만 유지
+    - 서열 정규화(대문자, U→T, IUPAC 검증): 유효하지 않은 레코드는 배치 전체를 실패시키지 않고 건너뜀
+    - batch_size개씩 upsert_records 하나의 트랜잭션으로 저장 (정확/근사 중복 병합은 DB 계층이 처리)
+    - 진행 상황: 읽은 레코드, 신규/중복/짧아서 제외/유효하지 않은 수, 모호 염기 수, 처리량(records/s)
+    """
+    DEFAULT_BATCH_SIZE = 1000
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+
+    def import_fasta(self, source, record_type: str = 'DNA', min_length: int = 0,
+                     batch_size: int = DEFAULT_BATCH_SIZE, collapse_near_duplicates: Optional[bool] = None,
+                     progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        source: 파일 경로, file-like 객체 또는 줄 iterable (iter_fasta 참고)
+        progress(stats): 배치를 커밋할 때마다 호출
+        반환: {'records', 'added', 'duplicates', 'skipped_short', 'invalid', 'ambiguous_records', 'ambiguous_bases',
+               'batches', 'elapsed_seconds', 'records_per_sec'}
+        """
+        stats = {"records": 0, "added": 0, "duplicates": 0, "skipped_short": 0, "invalid": 0,
+                 "ambiguous_records": 0, "ambiguous_bases": 0, "batches": 0,
+                 "elapsed_seconds": 0.0, "records_per_sec": 0.0}
+        started = time.time()
+        batch = []
+
+        def flush():
+            results = self.db_manager.upsert_records(batch, collapse_near_duplicates=collapse_near_duplicates)
+            added = sum(1 for _, is_new in results if is_new)
+            stats["added"] += added
+            stats["duplicates"] += len(results) - added
+            stats["batches"] += 1
+            batch.clear()
+            elapsed = time.time() - started
+            stats["elapsed_seconds"] = round(elapsed, 3)
+            stats["records_per_sec"] = round(stats["records"] / elapsed, 1) if elapsed > 0 else 0.0
+            if progress:
+                progress(stats)
+
+        for header, seq in iter_fasta(source):
+            stats["records"] += 1
+            seq = try_normalize(seq) if seq else seq
+            if seq is None:
+                stats["invalid"] += 1
+                continue
+            if not seq or len(seq) < min_length:
+                stats["skipped_short"] += 1
+                continue
+            ambiguous = ambiguity_stats(seq)["ambiguous_bases"]
+            if ambiguous:
+                stats["ambiguous_records"] += 1
+                stats["ambiguous_bases"] += ambiguous
+            batch.append({
+                "record_id": str(uuid.uuid4()), "dna_sequence": seq, "birth_time": datetime.now(),
+                "record_type": record_type, "source_info": header
+            })
+            if len(batch) >= batch_size:
+                flush()
+        if batch or not stats["batches"]:
+            flush()
+        return stats
@@ -0,0 +1,152 @@
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+
+class JobCancelled(Exception):
+    """작업 함수가 취소 요청을 확인하고 중단할 때 발생시킵니다."""
+
+
+class Job:
+    """
+    백그라운드 작업 하나의 상태.
+    작업 함수는 job.add(...)/job.set(...)으로 카운터를 갱신하고, 반복 사이에 job.check_cancelled()를 호출합니다.
+    """
+    COUNTERS = ('fetched', 'inserted', 'duplicates', 'failed')
+    FINAL_STATES = {'completed', 'failed', 'cancelled'}
+
+    def __init__(self, kind: str, params: Dict):
+        self.job_id = str(uuid.uuid4())
+        self.kind = kind
+        self.params = params
+        self.state = 'queued'
+        self.counters = {name: 0 for name in self.COUNTERS}
+        self.total = None
+        self.message = None
+        self.result = None
+        self.error = None
+        self.created_at = datetime.now().isoformat()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._on_done = None
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, **counts):
+        with self._lock:
+            self.counters.update(counts)
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            'job_id': self.job_id, 'kind': self.kind, 'params': self.params, 'state': self.state,
+            'counters': counters, 'total': self.total, 'message': self.message, 'result': self.result,
+            'error': self.error, 'cancel_requested': self.cancel_requested,
+            'created_at': self.created_at, 'started_at': self.started_at, 'finished_at': self.finished_at
+        }
+
+
+class JobManager:
+    """
+    프로세스 내 백그라운드 작업 실행기 (NCBI 수집, 업로드 적재 등).
+    - 요청 핸들러는 submit() 후 바로 job_id를 반환 → threaded=False 서버에서도 다른 요청이 막히지 않음
+    - 상태: queued → running → completed | failed | cancelled
+    - 최근 history_limit개 작업만 메모리에 보관
+    """
+
+    def __init__(self, max_workers: int = 1, history_limit: int = 200):
+        self.history_limit = history_limit
+        self._jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='job')
+
+    def submit(self, kind: str, fn: Callable[[Job], Optional[Dict]],
+               on_done: Optional[Callable[[Job], None]] = None, **params) -> Job:
+        """
+        fn(job)을 워커에서 실행합니다. fn의 반환값은 job.result로 저장됩니다.
+        on_done(job)은 종료 상태(completed/failed/cancelled, 시작 전 취소 포함)에서 정확히 한 번 호출됩니다 (임시 파일 정리 등).
+        """
+        job = Job(kind, params)
+        job._on_done = on_done
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._prune()
+        self._pool.submit(self._run, job, fn)
+        print(f"[Jobs] Queued {kind} job {job.job_id[:8]}")
+        return job
+
+    def _run(self, job: Job, fn):
+        if job.cancel_requested:
+            job.state, job.finished_at = 'cancelled', datetime.now().isoformat()
+            self._finalize(job)
+            return
+        job.state, job.started_at = 'running', datetime.now().isoformat()
+        try:
+            job.result = fn(job)
+            job.state = 'cancelled' if job.cancel_requested else 'completed'
+        except JobCancelled:
+            job.state = 'cancelled'
+        except Exception as e:
+            job.state, job.error = 'failed', str(e)
+            print(f"[Jobs] {job.kind} job {job.job_id[:8]} failed: {e}")
+        job.finished_at = datetime.now().isoformat()
+        print(f"[Jobs] {job.kind} job {job.job_id[:8]} {job.state} {job.counters}")
+        self._finalize(job)
+
+    @staticmethod
+    def _finalize(job: Job):
+        with job._lock:
+            on_done, job._on_done = job._on_done, None
+        if on_done is None:
+            return
+        try:
+            on_done(job)
+        except Exception as e:
+            print(f"[Jobs] on_done for {job.kind} job {job.job_id[:8]} failed: {e}")
+
+    def _prune(self):
+        finished = [jid for jid, j in self._jobs.items() if j.state in Job.FINAL_STATES]
+        for jid in finished[:max(0, len(self._jobs) - self.history_limit)]:
+            del self._jobs[jid]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def list(self, kind: Optional[str] = None) -> List[Job]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [j for j in reversed(jobs) if kind is None or j.kind == kind]
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """취소를 요청합니다. 대기 중이면 시작하지 않고, 실행 중이면 다음 확인 지점에서 멈춥니다."""
+        job = self.get(job_id)
+        if job and job.state not in Job.FINAL_STATES:
+            job._cancel.set()
+        return job
+
+    def shutdown(self):
+        for job in self.list():
+            job._cancel.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        # cancel_futures로 버려진 대기 작업은 _run이 호출되지 않으므로 여기서 정리
+        for job in self.list():
+            if job.state == 'queued':
+                job.state, job.finished_at = 'cancelled', datetime.now().isoformat()
+                self._finalize(job)
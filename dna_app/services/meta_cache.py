@@ -0,0 +1,124 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class PersistentTTLCache:
+    """
+    system_metadata에 영속화되는 TTL 캐시 (stale-while-revalidate).
+    - ttl 이내: 캐시 값 반환 (네트워크 없음)
+    - ttl 경과: 이전 값을 바로 반환하고 백그라운드 스레드에서 갱신 (키별로 한 번만)
+    - 값이 없을 때만 호출자가 loader를 기다림 (동시 호출은 같은 로드를 공유)
+    - 갱신 실패 시 이전 값을 계속 사용하고 retry_after초 동안 재시도하지 않음
+    - 값이 없는 상태에서 로드가 실패해도 retry_after초 동안은 loader를 다시 호출하지 않고 바로 LookupError
+      (호출자가 대체 값을 반환, 장애 중에 요청마다 외부 호출이 몰리지 않음)
+    프로세스 메모리에도 보관하므로 히트 시 DB 조회도 하지 않습니다.
+    """
+
+    def __init__(self, db_manager, namespace: str, ttl: float = 3600, retry_after: float = 60):
+        self.db_manager = db_manager
+        self.namespace = namespace
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self._entries: Dict[str, Dict] = {}
+        self._inflight: Dict[str, threading.Event] = {}
+        self._failed_at: Dict[str, float] = {}
+        self._errors: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _storage_key(self, key: str) -> str:
+        return f"cache:{self.namespace}:{hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]}"
+
+    def _load_entry(self, key: str) -> Optional[Dict]:
+        entry = self._entries.get(key)
+        if entry is not None or self.db_manager is None:
+            return entry
+        raw = self.db_manager.get_metadata(self._storage_key(key))
+        if raw:
+            try:
+                entry = json.loads(raw)
+            except ValueError:
+                entry = None
+            # sha1 앞부분 충돌 방지: 저장된 원래 키가 같을 때만 사용
+            if entry and entry.get('key') == key:
+                self._entries[key] = entry
+                return entry
+        return None
+
+    def put(self, key: str, value: Any):
+        entry = {'key': key, 'value': value, 'fetched_at': time.time()}
+        with self._lock:
+            self._entries[key] = entry
+            self._failed_at.pop(key, None)
+            self._errors.pop(key, None)
+        if self.db_manager is not None:
+            self.db_manager.set_metadata(self._storage_key(key), json.dumps(entry))
+        return entry
+
+    def get(self, key: str, loader: Callable[[], Any]) -> Dict:
+        """
+        반환: {'value', 'fetched_at', 'age_seconds', 'stale'}
+        캐시 값이 없고 loader도 실패하면 loader의 예외를 그대로 전달하고,
+        이후 retry_after초 동안은 loader를 호출하지 않고 LookupError를 발생시킵니다.
+        """
+        with self._lock:
+            entry = self._load_entry(key)
+            now = time.time()
+            if entry is not None:
+                age = now - entry['fetched_at']
+                stale = age >= self.ttl
+                if stale and key not in self._inflight and now - self._failed_at.get(key, 0) >= self.retry_after:
+                    self._inflight[key] = threading.Event()
+                    threading.Thread(target=self._refresh, args=(key, loader), daemon=True,
+                                     name=f'{self.namespace}-refresh').start()
+                return {'value': entry['value'], 'fetched_at': entry['fetched_at'],
+                        'age_seconds': round(age, 1), 'stale': stale}
+
+            failed_at = self._failed_at.get(key)
+            if failed_at is not None and now - failed_at < self.retry_after:
+                raise LookupError(f"{self.namespace}: no value for {key!r} "
+                                  f"(load failed {now - failed_at:.0f}s ago: {self._errors.get(key)})")
+
+            waiting = self._inflight.get(key)
+            if waiting is None:
+                self._inflight[key] = threading.Event()
+
+        if waiting is not None:
+            # 다른 호출이 로드 중 → 그 결과를 기다림
+            waiting.wait()
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is None:
+                raise LookupError(f"{self.namespace}: no value for {key!r}")
+            return {'value': entry['value'], 'fetched_at': entry['fetched_at'], 'age_seconds': 0.0, 'stale': False}
+
+        try:
+            entry = self.put(key, loader())
+        except Exception as e:
+            self._record_failure(key, e)
+            raise
+        finally:
+            self._release(key)
+        return {'value': entry['value'], 'fetched_at': entry['fetched_at'], 'age_seconds': 0.0, 'stale': False}
+
+    def _refresh(self, key: str, loader: Callable[[], Any]):
+        try:
+            self.put(key, loader())
+        except Exception as e:
+            self._record_failure(key, e)
+            print(f"[Cache] {self.namespace} refresh failed for {key!r}: {e}")
+        finally:
+            self._release(key)
+
+    def _record_failure(self, key: str, error: Exception):
+        with self._lock:
+            self._failed_at[key] = time.time()
+            self._errors[key] = str(error)
+
+    def _release(self, key: str):
+        with self._lock:
+            event = self._inflight.pop(key, None)
+        if event:
+            event.set()
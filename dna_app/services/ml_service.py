@@ -1,11 +1,13 @@
 import joblib
 import os
 import numpy as np
-from dna_app.services.feature_extractor import BiologicalFeatureExtractor
+from dna_app.database.feature_store import compute_features
 
 class MLService:
-    def __init__(self, model_path: str):
+    def __init__(self, model_path: str, db_manager=None):
         self.model_path = model_path
+        # 있으면 수집 시점에 저장된 특징 벡터를 읽음 (없으면 매번 계산)
+        self.db_manager = db_manager
         self.model = None
         self._load_model()
 
@@ -20,10 +22,7 @@ class MLService:
                 self.classifier = joblib.load(self.model_path)
                 self.scaler = joblib.load(scaler_path)
                 
-                # 2. 전처리 클래스 (커스텀이므로 직접 초기화)
-                self.extractor = BiologicalFeatureExtractor(kmer_size=3)
-                
-                # 3. self.model도 설정 (combined-insights 등에서 체크용)
+                # 2. self.model도 설정 (combined-insights 등에서 체크용)
                 self.model = self.classifier
                 
                 print(f"ML components (classifier + scaler) loaded successfully from '{model_dir}'")
@@ -48,16 +47,23 @@ class MLService:
     def is_ready(self) -> bool:
         return self.model is not None
 
-    def predict(self, dna_sequence: str):
+    def features(self, dna_sequences, persist: bool = True):
+        """GenetiForest 특징 행렬: 특징 저장소가 있으면 저장된 벡터를 읽고, 없으면 계산합니다."""
+        if self.db_manager is not None:
+            return self.db_manager.get_features('genetiforest', dna_sequences, persist=persist)
+        return compute_features('genetiforest', dna_sequences)
+
+    def predict(self, dna_sequence: str, persist: bool = False):
         """
         DNA 서열의 타입을 예측하고 결과를 반환합니다.
         api/records.py 에서 기대하는 형식인 {'predicted_type': ..., 'confidence': ...} 를 리턴합니다.
+        persist: 새로 계산한 특징 벡터를 저장소에 저장할지 (DB에 저장된 서열일 때만 True, 요청 입력은 저장하지 않음)
         """
         if self.classifier:
             try:
                 # 1. 수동 파이프라인 적용
                 # DNA 시퀀스 -> 특징 추출 -> 스케일링 -> 예측
-                X_features = self.extractor.transform([dna_sequence])
+                X_features = self.features([dna_sequence], persist=persist)
                 X_scaled = self.scaler.transform(X_features)
                 
                 pred_type = self.classifier.predict(X_scaled)[0]
@@ -85,6 +91,25 @@ class MLService:
                 "confidence": 0.88
             }
 
+    def predict_batch(self, dna_sequences, persist: bool = False):
+        """여러 서열을 한 번의 특징 추출/스케일링으로 예측합니다. predict()와 같은 형식의 dict 목록을 반환합니다."""
+        if not dna_sequences:
+            return []
+        if self.model is None:
+            return [self.predict(seq, persist=persist) for seq in dna_sequences]
+
+        try:
+            X_scaled = self.scaler.transform(self.features(list(dna_sequences), persist=persist))
+            preds = self.classifier.predict(X_scaled)
+            if hasattr(self.classifier, 'predict_proba'):
+                confidences = np.max(self.classifier.predict_proba(X_scaled), axis=1)
+            else:
+                confidences = np.full(len(preds), 0.95)
+            return [{"predicted_type": str(p), "confidence": float(c)} for p, c in zip(preds, confidences)]
+        except Exception as e:
+            print(f"Batch prediction error: {e}")
+            return [{"predicted_type": "Unknown", "confidence": 0.0} for _ in dna_sequences]
+
     def predict_dna_type(self, dna_sequence: str) -> str:
         """기존 코드와의 호환성을 위해 유지합니다."""
         res = self.predict(dna_sequence)
@@ -0,0 +1,280 @@
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from dna_app.services.fasta_parser import iter_fasta
+
+DEFAULT_BASE_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
+
+
+class TokenBucket:
+    """
+    스레드 안전 토큰 버킷. acquire()는 토큰이 생길 때까지 대기합니다.
+    capacity 기본값은 1 → 버스트 없이 요청 간격이 항상 1/rate 이상 (NCBI의 초당 요청 수 제한은
+    어느 1초 구간에서도 지켜야 하므로, 유휴 후에 rate개를 한꺼번에 보내지 않도록).
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        if rate <= 0 or capacity < 1:
+            raise ValueError("rate must be > 0 and capacity >= 1")
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class EutilsError(Exception):
+    """재시도 후에도 E-utilities 요청이 실패했을 때 발생합니다."""
+
+
+class ChunkEvent(NamedTuple):
+    """efetch_chunks가 생성하는 이벤트: 청크의 레코드 배치, done=True면 그 청크의 마지막 이벤트."""
+    index: int
+    ids: List[str]
+    records: List[Tuple[str, str]]
+    error: Optional[Exception]
+    done: bool
+
+
+class EutilsClient:
+    """
+    NCBI E-utilities 클라이언트.
+    - 공유 requests.Session (keep-alive, 커넥션 풀)
+    - 토큰 버킷 속도 제한: API 키가 있으면 초당 10회, 없으면 3회 (NCBI 정책)
+    - 429/5xx/네트워크 오류는 지수 백오프(+지터)로 재시도, Retry-After 헤더 우선
+    - base_url을 바꾸면 로컬 대체 HTTP 서버로 테스트할 수 있습니다.
+    """
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+    EFETCH_BATCH = 200  # NCBI 권장: id가 많으면 POST + 배치
+    ESEARCH_PAGE = 10000  # esearch retmax 상한
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, api_key: Optional[str] = None,
+                 email: Optional[str] = None, tool: str = "DNA_G_CONSOLE",
+                 rate: Optional[float] = None, max_retries: int = 5, backoff: float = 0.5,
+                 timeout: tuple = (5, 30)):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.email = email
+        self.tool = tool
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.limiter = TokenBucket(rate or (10 if api_key else 3))
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _params(self, params: Dict) -> Dict:
+        params = dict(params, tool=self.tool)
+        if self.email:
+            params['email'] = self.email
+        if self.api_key:
+            params['api_key'] = self.api_key
+        return params
+
+    def _redact(self, error) -> str:
+        """오류 메시지(URL 포함)에서 API 키를 가립니다."""
+        message = str(error)
+        return message.replace(self.api_key, '***') if self.api_key else message
+
+    def request(self, endpoint: str, params: Dict, method: str = 'GET', stream: bool = False) -> requests.Response:
+        """
+        속도 제한과 재시도를 적용해 E-utilities 엔드포인트(예: 'esearch.fcgi')를 호출합니다.
+        stream=True면 본문을 읽지 않은 응답을 반환합니다 (재시도는 응답 헤더를 받기 전까지만).
+        """
+        url = f"{self.base_url}/{endpoint}"
+        params = self._params(params)
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            try:
+                if method == 'POST':
+                    resp = self.session.post(url, data=params, timeout=self.timeout, stream=stream)
+                else:
+                    resp = self.session.get(url, params=params, timeout=self.timeout, stream=stream)
+                if resp.status_code not in self.RETRY_STATUS:
+                    resp.raise_for_status()
+                    return resp
+                resp.close()
+                last_error = EutilsError(f"HTTP {resp.status_code} from {endpoint}")
+                retry_after = resp.headers.get('Retry-After')
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = e
+                retry_after = None
+
+            if attempt == self.max_retries:
+                break
+            try:
+                delay = float(retry_after)
+            except (TypeError, ValueError):
+                delay = self.backoff * (2 ** attempt) * (1 + random.random() * 0.25)
+            print(f"[NCBI] {endpoint} retry {attempt + 1}/{self.max_retries} in {delay:.2f}s ({self._redact(last_error)})")
+            time.sleep(delay)
+
+        raise EutilsError(f"{endpoint} failed after {self.max_retries + 1} attempts: {self._redact(last_error)}")
+
+    # ========== E-utilities ==========
+    def esearch(self, term: str, db: str = "nucleotide", retmax: int = 20, retstart: int = 0,
+                sort: Optional[str] = None) -> Dict:
+        """esearch 결과의 'esearchresult' 객체 (count, idlist 등)."""
+        params = {"db": db, "term": term, "retmode": "json", "retmax": retmax, "retstart": retstart}
+        if sort:
+            params["sort"] = sort
+        return self.request("esearch.fcgi", params).json().get("esearchresult", {})
+
+    def esearch_history(self, term: str, db: str = "nucleotide", sort: Optional[str] = None) -> Dict:
+        """
+        usehistory=y로 검색 결과를 NCBI history 서버에 저장합니다.
+        반환: {'count', 'webenv', 'query_key'} - 이후 efetch는 검색을 다시 실행하지 않고 이 결과 집합을 페이지로 읽습니다.
+        """
+        params = {"db": db, "term": term, "retmode": "json", "retmax": 0, "usehistory": "y"}
+        if sort:
+            params["sort"] = sort
+        result = self.request("esearch.fcgi", params).json().get("esearchresult", {})
+        if not result.get("webenv") or not result.get("querykey"):
+            raise EutilsError(f"esearch did not return history (WebEnv/query_key): {result.get('errorlist') or result}")
+        return {"count": int(result.get("count", 0)), "webenv": result["webenv"], "query_key": str(result["querykey"])}
+
+    def history_uids(self, webenv: str, query_key: str, count: int, db: str = "nucleotide") -> List[str]:
+        """history 결과 집합의 앞 count개 UID를 efetch rettype=uilist로 ESEARCH_PAGE개씩 읽습니다."""
+        uids = []
+        while len(uids) < count:
+            params = {"db": db, "WebEnv": webenv, "query_key": query_key, "retstart": len(uids),
+                      "retmax": min(self.ESEARCH_PAGE, count - len(uids)), "rettype": "uilist", "retmode": "text"}
+            page = [line.strip() for line in self.request("efetch.fcgi", params, method='POST').text.splitlines()]
+            page = [uid for uid in page if uid.isdigit()]
+            if not page:
+                break
+            uids.extend(page)
+        return uids
+
+    def iter_efetch_history(self, webenv: str, query_key: str, retstart: int, retmax: int,
+                            db: str = "nucleotide") -> Iterator[Tuple[str, str]]:
+        """history 결과 집합의 [retstart, retstart + retmax) 구간을 FASTA로 스트리밍 파싱합니다."""
+        params = {"db": db, "WebEnv": webenv, "query_key": query_key, "retstart": retstart, "retmax": retmax,
+                  "rettype": "fasta", "retmode": "text"}
+        with self.request("efetch.fcgi", params, method='POST', stream=True) as resp:
+            yield from iter_fasta(resp.iter_lines())
+
+    def esearch_ids(self, term: str, count: int, retstart: int = 0, sort: Optional[str] = None,
+                    db: str = "nucleotide") -> List[str]:
+        """count개까지의 id를 ESEARCH_PAGE 단위로 나눠 조회합니다."""
+        ids = []
+        while len(ids) < count:
+            page = self.esearch(term, db=db, retmax=min(self.ESEARCH_PAGE, count - len(ids)),
+                                retstart=retstart + len(ids), sort=sort).get("idlist", [])
+            if not page:
+                break
+            ids.extend(page)
+        return ids
+
+    def count(self, term: str, db: str = "nucleotide") -> int:
+        return int(self.esearch(term, db=db, retmax=0).get("count", 0))
+
+    def efetch(self, ids: List[str], db: str = "nucleotide", rettype: str = "fasta",
+               retmode: str = "text") -> str:
+        """id 목록을 EFETCH_BATCH개씩 POST로 가져와 이어 붙인 본문을 반환합니다."""
+        return "".join(self._efetch_one(ids[start:start + self.EFETCH_BATCH], db, rettype, retmode)
+                       for start in range(0, len(ids), self.EFETCH_BATCH))
+
+    def _efetch_one(self, ids: List[str], db: str, rettype: str, retmode: str) -> str:
+        params = {"db": db, "id": ",".join(ids), "rettype": rettype, "retmode": retmode}
+        return self.request("efetch.fcgi", params, method='POST').text
+
+    def iter_efetch_fasta(self, ids: List[str], db: str = "nucleotide") -> Iterator[Tuple[str, str]]:
+        """
+        FASTA efetch 응답을 스트리밍으로 받아 레코드가 완성될 때마다 (header, sequence)를 생성합니다.
+        응답 전체를 메모리에 올리지 않으므로 다운로드 중에도 호출자가 바로 저장할 수 있습니다.
+        """
+        for start in range(0, len(ids), self.EFETCH_BATCH):
+            params = {"db": db, "id": ",".join(ids[start:start + self.EFETCH_BATCH]),
+                      "rettype": "fasta", "retmode": "text"}
+            with self.request("efetch.fcgi", params, method='POST', stream=True) as resp:
+                yield from iter_fasta(resp.iter_lines())
+
+    def efetch_chunks(self, ids: List[str], chunk_size: int = EFETCH_BATCH, workers: int = 3,
+                      chunk_retries: int = 2, db: str = "nucleotide", batch_size: int = 100,
+                      queue_size: int = 8) -> Iterator[ChunkEvent]:
+        """
+        id 목록을 청크로 나눠 스레드 풀에서 동시에 FASTA efetch 합니다 (모든 워커가 같은 속도 제한을 공유).
+        각 워커는 응답을 스트리밍으로 파싱하면서 batch_size개씩 크기 제한 큐(queue_size)에 넣고,
+        호출자는 다운로드가 끝나기 전에 배치를 받아 저장합니다 → 메모리는 청크 크기와 무관하게
+        (queue_size + workers) * batch_size 레코드로 고정되고, 저장이 느리면 워커가 대기합니다.
+        실패한 청크는 그 청크만 chunk_retries번까지 다시 받으며, 이미 전달한 레코드는 건너뜁니다.
+        도착 순서대로 ChunkEvent를 생성하고, 청크마다 마지막 이벤트는 done=True (최종 실패 시 error 포함).
+        """
+        chunks = [ids[start:start + chunk_size] for start in range(0, len(ids), chunk_size)]
+        events = queue.Queue(maxsize=max(1, queue_size))
+        stop = threading.Event()
+
+        def put(event) -> bool:
+            while not stop.is_set():
+                try:
+                    events.put(event, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def fetch(index, chunk):
+            delivered = 0
+            for attempt in range(chunk_retries + 1):
+                try:
+                    batch = []
+                    for position, record in enumerate(self.iter_efetch_fasta(chunk, db)):
+                        if position < delivered:
+                            continue
+                        batch.append(record)
+                        if len(batch) >= batch_size:
+                            if not put(ChunkEvent(index, chunk, batch, None, False)):
+                                return
+                            delivered += len(batch)
+                            batch = []
+                    put(ChunkEvent(index, chunk, batch, None, True))
+                    return
+                except Exception as error:
+                    if stop.is_set():
+                        return
+                    if attempt < chunk_retries:
+                        print(f"[NCBI] efetch chunk {index} failed ({self._redact(error)}), retrying "
+                              f"from record {delivered}")
+                        continue
+                    put(ChunkEvent(index, chunk, [], error, True))
+
+        pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='efetch')
+        try:
+            for index, chunk in enumerate(chunks):
+                pool.submit(fetch, index, chunk)
+            remaining = len(chunks)
+            while remaining:
+                event = events.get()
+                remaining -= event.done
+                yield event
+        finally:
+            stop.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        self.session.close()
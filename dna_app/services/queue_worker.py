@@ -0,0 +1,284 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from dna_app.database.job_queue import JobQueue, LeaseLost
+from dna_app.services.job_service import JobCancelled
+
+
+def resolve_job_path(base_dir: str, path) -> str:
+    """
+    큐 작업 payload의 path를 base_dir 아래의 실제 경로로 해석합니다.
+    상대 경로는 base_dir 기준, '..'이나 심볼릭 링크로 base_dir 밖을 가리키면 ValueError.
+    """
+    if not isinstance(path, str) or not path.strip():
+        raise ValueError("'path' is required")
+    base = os.path.realpath(base_dir)
+    resolved = os.path.realpath(os.path.join(base, path))
+    if resolved == base or os.path.commonpath([base, resolved]) != base:
+        raise ValueError(f"'path' must be a file under {base}")
+    return resolved
+
+
+class JobContext:
+    """
+    큐 작업 실행 중 핸들러에 전달되는 컨텍스트.
+    job_service.Job과 같은 인터페이스(add/set/total/cancel_requested/check_cancelled)라서
+    RecordService.fetch_real_samples_from_ncbi(job=...) 같은 기존 코드에 그대로 넘길 수 있습니다.
+    """
+
+    def __init__(self, job: Dict, save_payload: Optional[Callable[[Dict], None]] = None):
+        self.job_id = job['job_id']
+        self.kind = job['kind']
+        self.payload = job['payload'] or {}
+        self.attempt = job['attempts']
+        self.counters = dict(job['progress'] or {})
+        self.total = None
+        self.message = None
+        self._cancel = threading.Event()
+        self._lost = threading.Event()
+        self._lock = threading.Lock()
+        self._save_payload = save_payload
+
+    def update_payload(self, **fields):
+        """payload에 값을 기록합니다. 재시도는 갱신된 payload로 실행됩니다 (예: 첫 시도에서 만든 harvest_job_id)."""
+        self.payload.update(fields)
+        if self._save_payload:
+            self._save_payload(self.payload)
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, **counts):
+        with self._lock:
+            self.counters.update(counts)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            progress = dict(self.counters)
+        if self.total is not None:
+            progress['total'] = self.total
+        return progress
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set() or self._lost.is_set()
+
+    def check_cancelled(self):
+        if self._lost.is_set():
+            raise LeaseLost(self.job_id)
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+
+class QueueWorker:
+    """
+    job_queue에서 작업을 임대해 실행하는 워커 (dna_worker.py에서 프로세스별로 하나씩 실행).
+    - 실행 중에는 별도 스레드가 lease_seconds / 3 마다 하트비트로 임대 연장 + 진행 상황 기록
+    - 취소 요청이나 임대 상실은 핸들러가 ctx.check_cancelled()를 호출하는 지점에서 반영
+    - 핸들러 예외 → 재시도 횟수가 남았으면 백오프 후 다시 대기열로
+    """
+
+    def __init__(self, job_queue: JobQueue, handlers: Dict[str, Callable[[Dict, JobContext], Any]],
+                 worker_id: Optional[str] = None, poll_interval: float = 2.0):
+        self.queue = job_queue
+        self.handlers = handlers
+        self.worker_id = worker_id or JobQueue.default_worker_id()
+        self.poll_interval = poll_interval
+        self.stop_event = threading.Event()
+
+    @property
+    def kinds(self) -> List[str]:
+        return list(self.handlers)
+
+    def run(self, once: bool = False):
+        """stop()이 호출될 때까지 작업을 처리합니다. once=True면 대기열이 빌 때까지만."""
+        print(f"[Worker] {self.worker_id} started (kinds: {', '.join(self.kinds)})")
+        while not self.stop_event.is_set():
+            if self.run_one():
+                continue
+            if once:
+                break
+            self.stop_event.wait(self.poll_interval)
+        print(f"[Worker] {self.worker_id} stopped")
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run_one(self) -> bool:
+        """작업 하나를 가져와 실행합니다. 반환: 실행한 작업이 있었는지"""
+        job = self.queue.claim(self.worker_id, self.kinds)
+        if job is None:
+            return False
+        ctx = JobContext(job, save_payload=lambda payload: self.queue.update_payload(job['job_id'], self.worker_id, payload))
+        print(f"[Worker] Running {job['kind']} job {job['job_id'][:8]} (attempt {job['attempts']}/{job['max_attempts']})")
+
+        done = threading.Event()
+        beat = threading.Thread(target=self._heartbeat_loop, args=(ctx, done), daemon=True)
+        beat.start()
+        started = time.time()
+        try:
+            result = self.handlers[job['kind']](ctx.payload, ctx)
+            outcome = 'lost' if ctx._lost.is_set() else 'cancelled' if ctx._cancel.is_set() else 'completed'
+        except LeaseLost:
+            outcome, result = 'lost', None
+        except JobCancelled:
+            outcome, result = 'cancelled', None
+        except Exception as e:
+            outcome, result = 'failed', f"{type(e).__name__}: {e}"
+        finally:
+            done.set()
+            beat.join()
+
+        try:
+            if outcome == 'completed':
+                self.queue.heartbeat(ctx.job_id, self.worker_id, ctx.snapshot())
+                self.queue.complete(ctx.job_id, self.worker_id, result)
+            elif outcome == 'cancelled':
+                self.queue.heartbeat(ctx.job_id, self.worker_id, ctx.snapshot())
+                self.queue.mark_cancelled(ctx.job_id, self.worker_id)
+            elif outcome == 'failed':
+                print(f"[Worker] {job['kind']} job {job['job_id'][:8]} failed: {result}")
+                self.queue.fail(ctx.job_id, self.worker_id, result, job['attempts'], job['max_attempts'])
+        except LeaseLost:
+            outcome = 'lost'
+        if outcome == 'lost':
+            print(f"[Worker] Lost lease on job {job['job_id'][:8]}; another worker will retry it")
+        print(f"[Worker] {job['kind']} job {job['job_id'][:8]} {outcome} in {time.time() - started:.1f}s")
+        return True
+
+    def _heartbeat_loop(self, ctx: JobContext, done: threading.Event):
+        interval = max(self.queue.lease_seconds / 3, 0.05)
+        while not done.wait(interval):
+            try:
+                if self.queue.heartbeat(ctx.job_id, self.worker_id, ctx.snapshot()):
+                    ctx._cancel.set()
+            except LeaseLost:
+                ctx._lost.set()
+                return
+            except Exception as e:
+                # DB 잠금 등 일시적 오류는 다음 하트비트에서 다시 시도 (임대 만료 전까지 여유가 있음)
+                print(f"[Worker] Heartbeat failed for {ctx.job_id[:8]}: {e}")
+
+
+# ========== Handlers ==========
+def build_handlers(db_manager, config) -> Dict[str, Callable[[Dict, JobContext], Any]]:
+    """
+    기본 작업 종류별 핸들러. 무거운 모듈(sklearn, pyarrow)은 해당 작업을 처음 실행할 때 import 합니다.
+    - fetch_samples: {"count", "record_type", "sort", "collapse_near_duplicates"}
+    - harvest:       {"harvest_job_id"} (재개) 또는 {"count", "record_type", "sort"} (새 작업, 만든 harvest_job_id를
+                     payload에 기록하므로 재시도는 같은 작업을 재개)
+    - import:        {"path", "record_type", "min_length", "batch_size"} (워커가 읽을 수 있는 경로)
+    - retrain, sequence_train: {}
+    - export:        {"path", "format": "parquet"|"arrow", "include": [...], "record_type"}
+    """
+    services = {}
+
+    def record_service():
+        if 'record' not in services:
+            from dna_app.services.ncbi_client import EutilsClient
+            from dna_app.services.record_service import RecordService
+            services['record'] = RecordService(db_manager, ncbi_client=EutilsClient(
+                base_url=config.NCBI_EUTILS_URL, api_key=config.NCBI_API_KEY, email=config.NCBI_EMAIL
+            ), meta_ttl=config.NCBI_META_TTL_SECONDS)
+        return services['record']
+
+    def fetch_samples(payload, ctx):
+        created = record_service().fetch_real_samples_from_ncbi(
+            count=int(payload.get('count', 10)), record_type=payload.get('record_type', 'DNA'),
+            sort=payload.get('sort', 'relevance'), collapse_near_duplicates=payload.get('collapse_near_duplicates'),
+            job=ctx
+        )
+        return {"added": len(created)}
+
+    def harvest(payload, ctx):
+        from dna_app.services.harvest_service import HarvestService
+        if 'harvest' not in services:
+            # 복구 단계는 웹 프로세스에 맡김 (작업 실행권은 harvest_jobs의 임대로 확인)
+            services['harvest'] = HarvestService(db_manager, record_service(), recover_interrupted=False,
+                                                 lease_seconds=config.HARVEST_LEASE_SECONDS)
+        service = services['harvest']
+        if payload.get('harvest_job_id'):
+            job = service.resume_job(payload['harvest_job_id'], background=False, ctx=ctx)
+        else:
+            job_id = service.create_job(record_type=payload.get('record_type', 'DNA'),
+                                        count=int(payload.get('count', 1000)), sort=payload.get('sort', 'relevance'))
+            # 재시도가 새 작업을 만들지 않고 이 작업을 체크포인트부터 재개하도록 먼저 기록
+            ctx.update_payload(harvest_job_id=job_id)
+            service.run_job(job_id, ctx)
+            job = service.get_job(job_id)
+        if job is None:
+            raise ValueError(f"harvest job not found: {payload.get('harvest_job_id')}")
+        ctx.check_cancelled()  # 취소 요청으로 paused가 된 경우
+        if job['status'] == 'failed':
+            raise RuntimeError(job['error'])
+        if job['status'] != 'completed':
+            # 다른 프로세스가 임대를 가진 채 실행 중 (임대 만료 후 재시도에서 재개)
+            raise RuntimeError(f"harvest job {job['job_id']} is {job['status']} (owner: {job['owner']})")
+        ctx.set(inserted=job['added'], duplicates=job['duplicates'] or 0)
+        return {"harvest_job_id": job['job_id'], "status": job['status'], "added": job['added'],
+                "duplicates": job['duplicates'] or 0}
+
+    def import_fasta(payload, ctx):
+        from dna_app.services.import_service import FastaImporter
+
+        def progress(stats):
+            ctx.set(fetched=stats['records'], inserted=stats['added'], duplicates=stats['duplicates'])
+            ctx.check_cancelled()
+        path = resolve_job_path(config.IMPORT_DIR, payload.get('path'))
+        return FastaImporter(db_manager).import_fasta(
+            path, record_type=payload.get('record_type', 'DNA'),
+            min_length=int(payload.get('min_length', 0)),
+            batch_size=int(payload.get('batch_size', FastaImporter.DEFAULT_BATCH_SIZE)), progress=progress
+        )
+
+    def training(train_fn_name):
+        def run(payload, ctx):
+            import train_model
+            # ctx를 넘겨 단계 사이마다 취소 요청 확인 (취소되면 기존 모델 파일을 덮어쓰지 않음)
+            success, message = getattr(train_model, train_fn_name)(config.MODEL_FILE, db_manager.db_path, job=ctx)
+            if not success:
+                raise RuntimeError(message)
+            return {"message": message}
+        return run
+
+    def export(payload, ctx):
+        from dna_app.services import export_service
+        path = resolve_job_path(config.EXPORT_DIR, payload.get('path'))
+        if not export_service.is_available():
+            raise RuntimeError("pyarrow is not installed")
+        include = list(payload.get('include', []))
+        ml_service = None
+        if 'predictions' in include:
+            from dna_app.services.ml_service import MLService
+            ml_service = MLService(model_path=config.MODEL_FILE, db_manager=db_manager)
+        from dna_app.api.analysis import parse_metadata
+        exporter = export_service.ArrowExporter(db_manager, metadata_parser=parse_metadata, ml_service=ml_service)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        written = 0
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in exporter.stream(payload.get('format', 'parquet'), include=include,
+                                             record_type=payload.get('record_type')):
+                    f.write(chunk)
+                    written += len(chunk)
+                    ctx.set(bytes=written)
+                    ctx.check_cancelled()
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return {"path": path, "bytes": written}
+
+    return {
+        'fetch_samples': fetch_samples,
+        'harvest': harvest,
+        'import': import_fasta,
+        'retrain': training('retrain_model_from_db'),
+        'sequence_train': training('train_sequence_model'),
+        'export': export,
+    }
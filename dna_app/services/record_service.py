@@ -1,48 +1,64 @@
-import requests
 import uuid
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Tuple
 import sqlite3
 import os
+from dna_app.database.feature_store import sequence_hash
+from dna_app.services.meta_cache import PersistentTTLCache
+from dna_app.services.ncbi_client import EutilsClient
+from dna_app.services.sequence_normalizer import try_normalize
 
 class RecordService:
-    def __init__(self, db_manager=None, db_file=None):
+    # 대량 수집: efetch 청크 크기와 동시 요청 수 (속도 제한은 EutilsClient가 공유)
+    FETCH_CHUNK_SIZE = 200
+    FETCH_WORKERS = 3
+
+    def __init__(self, db_manager=None, db_file=None, ncbi_client: EutilsClient = None, meta_ttl: float = 3600):
+        # NCBI E-utilities 클라이언트 (세션 재사용, 속도 제한, 재시도)
+        self.ncbi = ncbi_client or EutilsClient()
+        # 마지막 NCBI 수집 작업의 청크별 진행 상황
+        self.fetch_progress = {}
         if db_manager:
             self.db_file = db_manager.db_path
             self.db_manager = db_manager
         else:
             self.db_file = db_file
             self.db_manager = None
+        # NCBI 전체 건수 캐시 (record_type + 검색어별, system_metadata에 영속화, 만료 시 백그라운드 갱신)
+        self.meta_cache = PersistentTTLCache(self.db_manager, 'ncbi_count', ttl=meta_ttl)
 
     def get_db_connection(self):
         conn = sqlite3.connect(self.db_file)
         conn.row_factory = sqlite3.Row
         return conn
 
-    def get_ncbi_meta(self, record_type='DNA') -> Dict:
-        """NCBI에서 현재 조건에 맞는 전체 데이터 개수를 조회합니다."""
-        search_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
-        
-        # Query based on type
-        term = "Viruses[Organism] AND 200:1000[SLEN] AND biomol_genomic[PROP]"
+    @staticmethod
+    def ncbi_term(record_type='DNA') -> str:
+        """수집 대상 NCBI 검색어 (바이러스, 200~1000bp, DNA=genomic / RNA=mRNA)."""
         if record_type == 'RNA':
-            term = "Viruses[Organism] AND 200:1000[SLEN] AND biomol_mrna[PROP]"
-            
-        search_params = {
-            "db": "nucleotide",
-            "term": term,
-            "retmode": "json",
-            "retmax": 0
-        }
+            return "Viruses[Organism] AND 200:1000[SLEN] AND biomol_mrna[PROP]"
+        return "Viruses[Organism] AND 200:1000[SLEN] AND biomol_genomic[PROP]"
+
+    def get_ncbi_meta(self, record_type='DNA') -> Dict:
+        """
+        NCBI에서 현재 조건에 맞는 전체 데이터 개수를 조회합니다.
+        TTL 캐시를 거치므로 보통은 esearch 왕복 없이 반환되며, 만료된 값은 반환 후 백그라운드에서 갱신됩니다.
+        """
+        term = self.ncbi_term(record_type)
+
         try:
-            resp = requests.get(search_url, params=search_params, timeout=10)
-            data = resp.json()
-            return {"total_count": int(data.get("esearchresult", {}).get("count", 0))}
+            cached = self.meta_cache.get(f"{record_type}|{term}", lambda: self.ncbi.count(term))
+            return {"total_count": cached['value'], "fetched_at": cached['fetched_at'], "stale": cached['stale']}
         except Exception as e:
             print(f"NCBI Meta Error: {e}")
-            return {"total_count": 5000}
+            return {"total_count": 5000, "fallback": True}
 
-    def fetch_real_samples_from_ncbi(self, count=20, record_type='DNA', sort='relevance') -> List[str]:
+    def fetch_real_samples_from_ncbi(self, count=20, record_type='DNA', sort='relevance', collapse_near_duplicates=None,
+                                     job=None) -> List[str]:
+        """
+        NCBI에서 count개를 수집해 저장하고 새로 추가된 record_id 목록을 반환합니다.
+        job: JobManager 작업이면 카운터(fetched/inserted/duplicates/failed)를 갱신하고 청크 사이에서 취소를 확인
+        """
         print(f"[RecordService] Fetching {count} real viral {record_type} samples from NCBI... (Sort: {sort})")
         
         # Load Offset from DB
@@ -67,11 +83,7 @@ class RecordService:
                 conn.close()
             except: pass
 
-        search_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
-        
-        term = "Viruses[Organism] AND 200:1000[SLEN] AND biomol_genomic[PROP]"
-        if record_type == 'RNA':
-            term = "Viruses[Organism] AND 200:1000[SLEN] AND biomol_mrna[PROP]"
+        term = self.ncbi_term(record_type)
             
         # Map sort param to NCBI values
         # 'relevance' -> 'relevance'
@@ -80,21 +92,9 @@ class RecordService:
         if sort == 'date':
             ncbi_sort = 'date' # Sort by publication date (newest first)
 
-        search_params = {
-            "db": "nucleotide",
-            "term": term,
-            "retmode": "json",
-            "retmax": count,
-            "retstart": start_ret,
-            "sort": ncbi_sort
-        }
-        
         id_list = []
         try:
-            resp = requests.get(search_url, params=search_params, timeout=10)
-            resp.raise_for_status()
-            data = resp.json()
-            id_list = data.get("esearchresult", {}).get("idlist", [])
+            id_list = self.ncbi.esearch_ids(term, count, retstart=start_ret, sort=ncbi_sort)
         except Exception as e:
             print(f"Search Error: {e}")
             return []
@@ -102,76 +102,73 @@ class RecordService:
         if not id_list:
             return []
 
-        fetch_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
-        fetch_params = {
-            "db": "nucleotide",
-            "id": ",".join(id_list),
-            "rettype": "fasta",
-            "retmode": "text"
-        }
-
+        # 청크 단위 동시 efetch → 파싱된 청크를 바로 배치 쓰기
         created_ids = []
-        try:
-            resp = requests.get(fetch_url, params=fetch_params, timeout=20)
-            resp.raise_for_status()
-            fasta_data = resp.text
-            
-            parsed_records = []
-            current_header = ""
-            current_seq = []
-            
-            for line in fasta_data.split('\n'):
-                if line.startswith('>'):
-                    if current_header:
-                        parsed_records.append({'header': current_header, 'seq': "".join(current_seq)})
-                    current_header = line[1:].strip()
-                    current_seq = []
-                else:
-                    current_seq.append(line.strip())
-            
-            if current_header:
-                parsed_records.append({'header': current_header, 'seq': "".join(current_seq)})
-
-            if self.db_manager:
-                for rec in parsed_records[:count]:
-                    seq = rec['seq']
-                    header = rec['header']
-                    
-                    if len(seq) < 100: continue
-
-                    # Upsert (Deduplication handled in DB)
-                    rid = str(uuid.uuid4())
-                    self.db_manager.upsert_record(rid, seq, datetime.now(), record_type, source_info=header)
-                    created_ids.append(rid)
-            else:
-                conn = self.get_db_connection()
-                cursor = conn.cursor()
+        total_chunks = (len(id_list) + self.FETCH_CHUNK_SIZE - 1) // self.FETCH_CHUNK_SIZE
+        self.fetch_progress = {
+            "record_type": record_type, "requested": len(id_list), "total_chunks": total_chunks,
+            "done_chunks": 0, "failed_chunks": 0, "failed_ids": 0, "added": 0, "duplicates": 0,
+            "started_at": datetime.now().isoformat(), "finished": False
+        }
+        if job:
+            job.total = len(id_list)
+        settled = set()  # 성공/실패가 확정된 청크
+        succeeded = set()  # 모든 레코드를 받아 저장한 청크 (오프셋 계산용)
+        received = {}  # 청크별로 받은 레코드 수
+        failed = set()  # 저장 중 오류가 난 청크
+        for event in self.ncbi.efetch_chunks(id_list, chunk_size=self.FETCH_CHUNK_SIZE, workers=self.FETCH_WORKERS):
+            progress = self.fetch_progress
+            index = event.index
+            if event.records and index not in failed:
+                # 청크 다운로드가 끝나기 전에 도착한 배치부터 저장
                 try:
-                    cursor.execute("SELECT record_type FROM genetic_records LIMIT 1")
-                except:
-                     cursor.execute("ALTER TABLE genetic_records ADD COLUMN record_type TEXT DEFAULT 'DNA'")
-                
-                for seq in sequences[:count]:
-                    if len(seq) < 100: continue
-                    # Check Duplicates
-                    cursor.execute("SELECT 1 FROM genetic_records WHERE dna_sequence = ? LIMIT 1", (seq,))
-                    if cursor.fetchone():
-                        print("[RecordService] Duplicate sequence skipped.")
-                        continue
-
-                    rid = str(uuid.uuid4())
-                    cursor.execute(
-                        "INSERT INTO genetic_records (record_id, dna_sequence, birth_time, record_type) VALUES (?, ?, ?, ?)",
-                        (rid, seq, datetime.now().isoformat(), record_type)
-                    )
-                    created_ids.append(rid)
-                conn.commit()
-                conn.close()
-        except Exception as e:
-            print(f"Fetch Error: {e}")
+                    parsed_records = [(header, seq) for header, seq in event.records if len(seq) >= 100]
+                    if self.db_manager:
+                        # Upsert (Deduplication handled in DB)
+                        results = self.ingest_fasta(parsed_records, record_type,
+                                                    collapse_near_duplicates=collapse_near_duplicates)
+                        batch_created = [rid for rid, is_new in results if is_new]
+                        duplicates = len(results) - len(batch_created)
+                    else:
+                        batch_created = self._insert_records_direct([seq for _, seq in parsed_records], record_type)
+                        duplicates = len(parsed_records) - len(batch_created)
+                    received[index] = received.get(index, 0) + len(event.records)
+                    created_ids.extend(batch_created)
+                    progress["added"] += len(batch_created)
+                    progress["duplicates"] += duplicates
+                    if job:
+                        job.add(fetched=len(event.records), inserted=len(batch_created), duplicates=duplicates)
+                except Exception as e:
+                    failed.add(index)
+                    print(f"Fetch Error (chunk {index + 1}/{total_chunks}): {e}")
+            if event.done:
+                settled.add(index)
+                if event.error is not None or index in failed:
+                    missing = len(event.ids) - received.get(index, 0)
+                    progress["failed_chunks"] += 1
+                    progress["failed_ids"] += missing
+                    if job:
+                        job.add(failed=missing)
+                    if event.error is not None:
+                        print(f"Fetch Error (chunk {index + 1}/{total_chunks}): {event.error}")
+                else:
+                    succeeded.add(index)
+                    progress["done_chunks"] += 1
+                    print(f"[RecordService] Chunk {index + 1}/{total_chunks}: {received.get(index, 0)} records "
+                          f"({progress['done_chunks']}/{total_chunks} done, {progress['added']} added)")
+            if job and job.cancel_requested:
+                # 남은 청크는 efetch_chunks 종료 시 취소됨
+                print(f"[RecordService] Fetch cancelled after {len(settled)}/{total_chunks} chunks")
+                break
+        self.fetch_progress["finished"] = True
 
-        # Save Offset to DB
+        # Save Offset to DB (취소되거나 실패한 청크가 있으면 앞에서부터 연속으로 성공한 청크까지만 전진, 다음 수집에서 재시도)
         new_offset = start_ret + count
+        if len(succeeded) < total_chunks:
+            contiguous = 0
+            while contiguous in succeeded:
+                contiguous += 1
+            new_offset = start_ret + min(count, contiguous * self.FETCH_CHUNK_SIZE)
         if self.db_manager:
             self.db_manager.set_metadata(offset_key, str(new_offset))
         else:
@@ -185,3 +182,67 @@ class RecordService:
                 print(f"Offset Save Error: {e}")
 
         return created_ids
+
+    def ingest_fasta(self, records, record_type: str = 'DNA', min_length: int = 0, batch_size: int = 500,
+                     collapse_near_duplicates=None) -> List[Tuple[str, bool]]:
+        """
+        (header, sequence) iterable(예: iter_fasta 스트림)을 batch_size개씩 upsert_records로 저장합니다.
+        입력을 끝까지 모으지 않으므로 다운로드/업로드가 진행되는 동안 저장이 함께 진행됩니다.
+        서열은 정규화(대문자, U→T, IUPAC 검증)하며 유효하지 않은 레코드는 건너뜁니다.
+        반환: 저장된 레코드별 (record_id, is_new) - 중복이면 기존 record_id, is_new=False
+        """
+        results = []
+        batch = []
+
+        def flush():
+            results.extend(self.db_manager.upsert_records(batch, collapse_near_duplicates=collapse_near_duplicates))
+            batch.clear()
+
+        for header, seq in records:
+            seq = try_normalize(seq)
+            if seq is None or len(seq) < min_length:
+                continue
+            batch.append({
+                "record_id": str(uuid.uuid4()), "dna_sequence": seq, "birth_time": datetime.now(),
+                "record_type": record_type, "source_info": header
+            })
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+        return results
+
+    def _insert_records_direct(self, sequences: List[str], record_type: str) -> List[str]:
+        """db_manager 없이 사용할 때의 직접 삽입 (정확 중복만 건너뜀)."""
+        created_ids = []
+        conn = self.get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT record_type FROM genetic_records LIMIT 1")
+        except:
+             cursor.execute("ALTER TABLE genetic_records ADD COLUMN record_type TEXT DEFAULT 'DNA'")
+
+        for seq in sequences:
+            seq = try_normalize(seq)
+            if seq is None:
+                continue
+            # Check Duplicates (seq_hash 유니크 인덱스)
+            seq_hash = sequence_hash(seq)
+            cursor.execute("SELECT 1 FROM genetic_records WHERE seq_hash = ?", (seq_hash,))
+            if cursor.fetchone():
+                print("[RecordService] Duplicate sequence skipped.")
+                continue
+
+            rid = str(uuid.uuid4())
+            try:
+                cursor.execute(
+                    "INSERT INTO genetic_records (record_id, dna_sequence, birth_time, record_type, seq_hash) VALUES (?, ?, ?, ?, ?)",
+                    (rid, seq, datetime.now().isoformat(), record_type, seq_hash)
+                )
+            except sqlite3.IntegrityError:
+                print("[RecordService] Duplicate sequence skipped.")
+                continue
+            created_ids.append(rid)
+        conn.commit()
+        conn.close()
+        return created_ids
@@ -0,0 +1,107 @@
+import math
+
+import numpy as np
+
+# 2-bit 염기 코드: A=0, C=1, G=2, T/U=3 (대소문자 무관)
+# N 및 기타 IUPAC 모호 염기 등 나머지 문자는 INVALID(4)
+INVALID = 4
+BASE_CODES = np.full(256, INVALID, dtype=np.uint8)
+for _code, _base in enumerate('ACGT'):
+    BASE_CODES[ord(_base)] = _code
+    BASE_CODES[ord(_base.lower())] = _code
+BASE_CODES[ord('U')] = BASE_CODES[ord('u')] = 3
+
+# 특징 추출용 엄격한 코드표: 대문자 ACGT만 유효 (문자열 슬라이스 비교와 같은 의미 - 소문자/U/N/IUPAC은 INVALID)
+STRICT_CODES = np.full(256, INVALID, dtype=np.uint8)
+for _code, _base in enumerate('ACGT'):
+    STRICT_CODES[ord(_base)] = _code
+
+
+def to_bytes(seq) -> np.ndarray:
+    """문자열/bytes 서열을 uint8 배열로 변환합니다 (복사 없이 bytes 버퍼를 그대로 사용)."""
+    if isinstance(seq, str):
+        seq = seq.encode('ascii', 'replace')
+    return np.frombuffer(seq, dtype=np.uint8)
+
+
+def encode_sequence(seq) -> np.ndarray:
+    """서열을 2-bit 염기 코드 배열(uint8, 유효하지 않은 염기는 INVALID)로 인코딩합니다."""
+    return BASE_CODES[to_bytes(seq)]
+
+
+def kmer_codes(codes: np.ndarray, k: int):
+    """
+    인코딩된 서열에서 모든 k-mer의 정수 코드를 계산합니다 (k <= 32).
+    각 윈도우의 코드는 2-bit 염기를 앞에서부터 이어 붙인 값이므로
+    ['A','C','G','T'] 사전식 순서의 k-mer 목록 인덱스와 같습니다.
+
+    Returns: (values, valid) - values[i]는 codes[i:i+k]의 코드(uint64),
+             valid[i]는 윈도우에 INVALID 염기가 없는지 여부
+    """
+    n_windows = len(codes) - k + 1
+    if n_windows <= 0:
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=bool)
+
+    c = (codes & 3).astype(np.uint64)
+    values = np.zeros(n_windows, dtype=np.uint64)
+    for j in range(k):
+        values = (values << np.uint64(2)) | c[j:j + n_windows]
+
+    invalid = np.concatenate(([0], np.cumsum(codes == INVALID)))
+    valid = (invalid[k:] - invalid[:-k]) == 0
+    return values, valid
+
+
+def canonical_kmer_codes(codes: np.ndarray, k: int):
+    """
+    정방향/역상보 k-mer 중 작은 코드(canonical k-mer)를 계산합니다.
+    Returns: (values, valid) - kmer_codes()와 동일한 형식
+    """
+    forward, valid = kmer_codes(codes, k)
+    n_windows = len(forward)
+    if n_windows == 0:
+        return forward, valid
+
+    complement = (3 - (codes & 3)).astype(np.uint64)
+    reverse = np.zeros(n_windows, dtype=np.uint64)
+    for j in range(k):
+        reverse |= complement[j:j + n_windows] << np.uint64(2 * j)
+    return np.minimum(forward, reverse), valid
+
+
+def small_kmer_codes(codes: np.ndarray, k: int):
+    """
+    특징 추출용 k-mer 코드 (k <= 16, intp 배열 → np.bincount에 바로 사용).
+    Returns: (values, valid) - valid는 INVALID 염기를 포함하지 않는 윈도우 마스크 (INVALID가 없으면 None)
+    """
+    n_windows = len(codes) - k + 1
+    if n_windows <= 0:
+        return np.zeros(0, dtype=np.intp), None
+    values = np.zeros(n_windows, dtype=np.intp)
+    bases = codes & 3
+    for j in range(k):
+        values <<= 2
+        values |= bases[j:j + n_windows]
+    bad = codes == INVALID
+    if not bad.any():
+        return values, None
+    invalid = np.concatenate(([0], np.cumsum(bad)))
+    return values, (invalid[k:] - invalid[:-k]) == 0
+
+
+def shannon_entropy(seq: str, histogram: np.ndarray) -> float:
+    """
+    바이트 히스토그램(np.bincount(to_bytes(seq), minlength=256))으로 문자 단위 Shannon 엔트로피를 계산합니다.
+    Counter(seq) 기반 계산과 비트 단위로 같은 값이 되도록 문자 첫 등장 순서로 합산합니다.
+    """
+    total = len(seq)
+    if not total:
+        return 0
+    symbols = np.flatnonzero(histogram).tolist()
+    if len(symbols) > 1:
+        symbols.sort(key=lambda s: seq.find(chr(s)))
+    entropy = 0
+    for count in histogram[symbols].tolist():
+        p = count / total
+        entropy -= p * math.log2(p)
+    return entropy
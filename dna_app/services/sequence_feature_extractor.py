@@ -1,9 +1,73 @@
 import numpy as np
 import math
+from typing import Dict
 from collections import Counter
 from sklearn.base import BaseEstimator, TransformerMixin
+from dna_app.services.feature_batches import BatchTransformMixin
+from dna_app.services.sequence_encoding import STRICT_CODES, shannon_entropy, small_kmer_codes, to_bytes
+from dna_app.services.sequence_normalizer import canonical
 
-class SequenceFeatureExtractor(BaseEstimator, TransformerMixin):
+REPEAT_UNITS = (2, 3, 4)
+
+
+def _char_codes(seq: str) -> np.ndarray:
+    """문자 단위 비교용 배열: ASCII는 바이트 그대로, 그 외 문자가 있으면 UTF-32 코드 포인트"""
+    if seq.isascii():
+        return to_bytes(seq)
+    return np.frombuffer(seq.encode('utf-32-le'), dtype='<u4')
+
+
+def tandem_repeats(chars: np.ndarray, units=REPEAT_UNITS, window: int = 0, detailed: bool = False) -> Dict:
+    """
+    단순 반복(SSR) 점수: 단위 길이 u마다 서열을 u만큼 민 자기 자신과 비교(eq[j] = chars[j] == chars[j+u])하고,
+    길이 u 구간 합(누적합 차)이 u인 시작 위치 = 바로 뒤에 같은 단위가 이어지는 위치를 셉니다.
+    문자열 슬라이스 비교(seq[i:i+u] == seq[i+u:i+2u], i < len - 2u)와 같은 결과이며 O(n) 입니다.
+
+    반환: {'count', 'score'} (+ detailed: 'by_unit', 'longest_run', window > 0이면 'density')
+    - longest_run: 같은 단위가 2번 이상 이어진 가장 긴 구간의 염기 수
+    - density: window 염기 구간별로 반복이 시작되는 위치의 비율
+    """
+    length = len(chars)
+    result = {'count': 0, 'score': 0}
+    if detailed:
+        result.update(by_unit={u: 0 for u in units}, longest_run=0)
+    if length < 6:
+        if detailed and window:
+            result['density'] = [0.0] * -(-length // window)
+        return result
+
+    starts = np.zeros(length, dtype=bool) if detailed and window else None
+    count = 0
+    for u in units:
+        n = length - 2 * u
+        if n <= 0:
+            continue
+        eq = chars[u:] == chars[:-u]
+        matched = np.concatenate(([0], np.cumsum(eq)))
+        hits = (matched[u:u + n] - matched[:n]) == u
+        unit_count = int(np.count_nonzero(hits))
+        count += unit_count
+        if not detailed:
+            continue
+        result['by_unit'][u] = unit_count
+        if starts is not None:
+            starts[:n] |= hits
+        if unit_count:
+            # eq가 연속으로 r개 참이면 주기 u인 r + u 염기 구간
+            edges = np.diff(np.concatenate(([0], eq.view(np.int8), [0])))
+            run = int((np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)).max())
+            result['longest_run'] = max(result['longest_run'], run + u)
+
+    result['count'] = count
+    result['score'] = count / length
+    if starts is not None:
+        bounds = np.arange(0, length, window)
+        sizes = np.diff(np.append(bounds, length))
+        result['density'] = (np.add.reduceat(starts, bounds) / sizes).round(4).tolist()
+    return result
+
+
+class SequenceFeatureExtractor(BatchTransformMixin, BaseEstimator, TransformerMixin):
     """
     시퀀스 고유의 생물학적 특징을 추출하는 고급 피처 추출기.
     
@@ -18,6 +82,12 @@ class SequenceFeatureExtractor(BaseEstimator, TransformerMixin):
     8. Repeat Pattern Score (Simple Sequence Repeat)
     9. Transition/Transversion Potential
     """
+    # 특징 정의(순서/계산식)가 바뀌면 올려서 특징 저장소(feature_store)의 이전 벡터를 무효화
+    VERSION = 1
+
+    # 사용하는 k-mer 빈도 특징 수 (kmers 사전식 순서의 앞부분)
+    KMER_FEATURES = 20
+
     def __init__(self, kmer_size=5):
         self.kmer_size = kmer_size
         self.kmers = self._generate_kmers(kmer_size)
@@ -25,6 +95,14 @@ class SequenceFeatureExtractor(BaseEstimator, TransformerMixin):
                               'TA', 'TT', 'TG', 'TC',
                               'GA', 'GT', 'GG', 'GC',
                               'CA', 'CT', 'CG', 'CC']
+        self.n_kmer_features = min(self.KMER_FEATURES, len(self.kmers))
+        # k-mer 코드 → 특징 열 (사용하지 않는 k-mer는 -1): 전체 4^k 빈도 목록을 만들지 않음
+        self._kmer_slots = np.full(len(self.kmers), -1, dtype=np.intp)
+        self._kmer_slots[:self.n_kmer_features] = np.arange(self.n_kmer_features)
+        # 디뉴클레오타이드 코드(ACGT 순서) → dinucleotides 목록 순서
+        self._di_order = np.array([
+            4 * 'ACGT'.index(di[0]) + 'ACGT'.index(di[1]) for di in self.dinucleotides
+        ])
     
     def _generate_kmers(self, k):
         """Generate all possible k-mers"""
@@ -35,59 +113,90 @@ class SequenceFeatureExtractor(BaseEstimator, TransformerMixin):
     def fit(self, X, y=None):
         return self
 
-    def transform(self, X):
+    @property
+    def n_features_out(self):
+        return 4 + self.n_kmer_features + len(self.dinucleotides) + 2 + 12
+
+    def _featurize(self, row, seq):
+        """정규화된 서열 하나의 특징을 0으로 초기화된 row에 기록합니다 (transform/iter_transform 공용)."""
+        if seq.isascii():
+            self._fill_row(row, seq)
+        else:
+            # 비 ASCII 문자는 바이트 단위 계산과 문자 수가 달라지므로 문자열 경로 사용
+            row[:] = self._reference_row(seq)
+
+    def _fill_row(self, row, seq):
         """
-        X: List of DNA strings
-        Returns: numpy array of shape (n_samples, n_features)
+        한 서열의 특징 행을 채웁니다. 서열을 한 번 인코딩한 뒤
+        바이트 히스토그램(GC, skew, 엔트로피, CpG 기대값), 2-mer 코드(디뉴클레오타이드, CpG),
+        k-mer 코드(사용하는 k-mer만), 코돈 위치 행렬에서 모든 통계를 계산합니다.
         """
-        features = []
-        for seq in X:
-            if not seq:
-                seq = ""
-            seq = seq.upper().replace('U', 'T')
-            
-            row = []
-            length = len(seq)
-            
-            # 1. GC Content
-            gc_content = self._calc_gc_content(seq, length)
-            row.append(gc_content)
-            
-            # 2. GC Skew
-            gc_skew = self._calc_gc_skew(seq)
-            row.append(gc_skew)
-            
-            # 3. AT Skew
-            at_skew = self._calc_at_skew(seq)
-            row.append(at_skew)
-            
-            # 4. Shannon Entropy
-            entropy = self._calc_entropy(seq)
-            row.append(entropy)
-            
-            # 5. 5-mer Frequency (Top 20 most variable k-mers)
-            kmer_features = self._calc_kmer_freq(seq, length)
-            row.extend(kmer_features[:20])  # Limit to 20 k-mers
-            
-            # 6. Dinucleotide Bias (16 features)
-            di_features = self._calc_dinucleotide_freq(seq, length)
-            row.extend(di_features)
-            
-            # 7. Repeat Pattern Score
-            repeat_score = self._calc_repeat_score(seq)
-            row.append(repeat_score)
-            
-            # 8. CpG Ratio (특히 바이러스에서 중요)
-            cpg_ratio = self._calc_cpg_ratio(seq, length)
-            row.append(cpg_ratio)
-            
-            # 9. Codon Position Bias (3개 위치별 염기 분포)
-            codon_bias = self._calc_codon_position_bias(seq)
-            row.extend(codon_bias)
-            
-            features.append(row)
-            
-        return np.array(features)
+        length = len(seq)
+        raw = to_bytes(seq)
+        codes = STRICT_CODES[raw]
+        histogram = np.bincount(raw, minlength=256)
+        a, c, g, t = (int(histogram[ord(base)]) for base in 'ACGT')
+        n_kmer = self.n_kmer_features
+
+        # 1-3. GC Content, GC Skew, AT Skew
+        if length:
+            row[0] = (g + c) / length
+        if g + c:
+            row[1] = (g - c) / (g + c)
+        if a + t:
+            row[2] = (a - t) / (a + t)
+
+        # 4. Shannon Entropy
+        row[3] = shannon_entropy(seq, histogram)
+
+        # 5. k-mer Frequency (사용하는 k-mer만 집계)
+        total_kmers = length - self.kmer_size + 1
+        if total_kmers > 0:
+            values, valid = small_kmer_codes(codes, self.kmer_size)
+            slots = self._kmer_slots[values]
+            keep = slots >= 0 if valid is None else (slots >= 0) & valid
+            row[4:4 + n_kmer] = np.bincount(slots[keep], minlength=n_kmer) / total_kmers
+
+        # 6. Dinucleotide Bias (16 features) + 8. CpG Ratio
+        di_start = 4 + n_kmer
+        cpg_col = di_start + 16 + 1
+        if length >= 2:
+            values, valid = small_kmer_codes(codes, 2)
+            di_counts = np.bincount(values if valid is None else values[valid], minlength=16)
+            row[di_start:di_start + 16] = di_counts[self._di_order] / (length - 1)
+            expected = (c * g) / length
+            if expected:
+                row[cpg_col] = int(di_counts[4 * 1 + 2]) / expected  # 'CG'
+
+        # 7. Repeat Pattern Score
+        row[cpg_col - 1] = tandem_repeats(raw)['score']
+
+        # 9. Codon Position Bias (3개 위치별 염기 분포, 순서 ATGC)
+        n_codons = length // 3
+        if n_codons:
+            positions = codes[:3 * n_codons].reshape(n_codons, 3)
+            for pos in range(3):
+                counts = np.bincount(positions[:, pos], minlength=5)[[0, 3, 2, 1]]  # A, T, G, C
+                total = int(counts.sum()) or 1
+                row[cpg_col + 1 + 4 * pos:cpg_col + 5 + 4 * pos] = counts / total
+
+    def _reference_row(self, seq):
+        """
+        문자열 기반 기준 구현 (비 ASCII 입력용 경로, verify_features.py의 동등성 검증 기준).
+        """
+        length = len(seq)
+        row = [
+            self._calc_gc_content(seq, length),
+            self._calc_gc_skew(seq),
+            self._calc_at_skew(seq),
+            self._calc_entropy(seq),
+        ]
+        row.extend(self._calc_kmer_freq(seq, length)[:self.n_kmer_features])
+        row.extend(self._calc_dinucleotide_freq(seq, length))
+        row.append(self._calc_repeat_score_slices(seq))
+        row.append(self._calc_cpg_ratio(seq, length))
+        row.extend(self._calc_codon_position_bias(seq))
+        return row
 
     def _calc_gc_content(self, seq, length):
         if length == 0: return 0
@@ -136,6 +245,17 @@ class SequenceFeatureExtractor(BaseEstimator, TransformerMixin):
     
     def _calc_repeat_score(self, seq):
         """Calculate simple sequence repeat score"""
+        return tandem_repeats(_char_codes(seq))['score']
+
+    def repeat_stats(self, seq, window: int = 100) -> Dict:
+        """
+        반복 점수 + 상세 통계: 단위 길이별 반복 수, 가장 긴 탠덤 반복 구간(염기 수),
+        window 염기 구간별 반복 시작 위치 밀도. 점수 계산과 같은 O(n) 패스에서 함께 구합니다.
+        """
+        return tandem_repeats(_char_codes(canonical(seq)), window=window, detailed=True)
+
+    def _calc_repeat_score_slices(self, seq):
+        """문자열 슬라이스 비교 기준 구현 (_reference_row용)"""
         if len(seq) < 6: return 0
         
         repeat_count = 0
@@ -185,7 +305,7 @@ class SequenceFeatureExtractor(BaseEstimator, TransformerMixin):
             "gc_content", "gc_skew", "at_skew", "entropy"
         ]
         # Top 20 k-mers
-        names.extend([f"kmer_{self.kmers[i]}" for i in range(20)])
+        names.extend([f"kmer_{self.kmers[i]}" for i in range(self.n_kmer_features)])
         # Dinucleotides
         names.extend([f"di_{di}" for di in self.dinucleotides])
         # Other features
@@ -0,0 +1,84 @@
+from typing import Dict, Iterable, List, Optional
+
+# IUPAC 뉴클레오타이드 코드 (U는 T로 변환된 뒤 검사)
+CANONICAL_BASES = b'ACGT'
+IUPAC_CODES = b'ACGTRYSWKMBDHVN'
+# 정규화 시 제거하는 문자: 공백/줄바꿈과 정렬 gap
+STRIP_CHARS = b' \t\r\n'
+GAP_CHARS = b'-.'
+
+# 한 번의 bytes.translate로 대문자화 + U→T
+_CANONICAL_TABLE = bytearray(range(256))
+for _c in range(ord('a'), ord('z') + 1):
+    _CANONICAL_TABLE[_c] = _c - 32
+_CANONICAL_TABLE[ord('U')] = _CANONICAL_TABLE[ord('u')] = ord('T')
+_CANONICAL_TABLE = bytes(_CANONICAL_TABLE)
+
+
+class InvalidSequenceError(ValueError):
+    """IUPAC 코드가 아닌 문자가 있거나 정규화 후 빈 서열일 때 발생합니다."""
+
+
+class CanonicalSequence(str):
+    """
+    정규화가 끝난 서열 (대문자, U→T, IUPAC 코드만).
+    특징 추출기는 이 타입이면 upper()/replace() 재정규화를 건너뜁니다.
+    """
+    __slots__ = ()
+    canonical = True
+
+
+def normalize_sequence(seq) -> CanonicalSequence:
+    """
+    수집 단계의 표준 정규화: 공백/gap 제거, 대문자화, U→T, IUPAC 코드 검증.
+    저장/중복 판정/해시는 모두 이 결과를 기준으로 합니다.
+    """
+    if isinstance(seq, CanonicalSequence):
+        return seq
+    if isinstance(seq, str):
+        try:
+            raw = seq.encode('ascii')
+        except UnicodeEncodeError:
+            raise InvalidSequenceError("sequence contains non-ASCII characters")
+    else:
+        raw = bytes(seq)
+    raw = raw.translate(_CANONICAL_TABLE, STRIP_CHARS + GAP_CHARS)
+    if not raw:
+        raise InvalidSequenceError("empty sequence")
+    invalid = raw.translate(None, IUPAC_CODES)
+    if invalid:
+        shown = ''.join(sorted(set(invalid.decode('ascii', 'replace'))))[:10]
+        raise InvalidSequenceError(f"invalid nucleotide code(s): {shown!r}")
+    return CanonicalSequence(raw.decode('ascii'))
+
+
+def try_normalize(seq) -> Optional[CanonicalSequence]:
+    """normalize_sequence와 같지만 유효하지 않으면 None을 반환합니다 (대량 수집에서 레코드 단위로 건너뛰기용)."""
+    try:
+        return normalize_sequence(seq)
+    except (InvalidSequenceError, TypeError):
+        return None
+
+
+def ambiguity_stats(seq: str) -> Dict[str, float]:
+    """정규화된 서열의 모호 염기 통계: ACGT 외 IUPAC 코드 수, 그중 N 수, 비율."""
+    length = len(seq)
+    ambiguous = length - sum(seq.count(base) for base in 'ACGT')
+    return {
+        "length": length,
+        "ambiguous_bases": ambiguous,
+        "n_bases": seq.count('N'),
+        "ambiguity_ratio": round(ambiguous / length, 6) if length else 0.0
+    }
+
+
+def canonical(seq) -> str:
+    """특징 추출기용 fast path: 이미 정규화된 서열은 그대로, 아니면 기존처럼 대문자화 + U→T (검증 없음)."""
+    if getattr(seq, 'canonical', False):
+        return seq
+    return (seq or '').upper().replace('U', 'T')
+
+
+def as_canonical(seqs: Iterable[str]) -> List[CanonicalSequence]:
+    """이미 정규화되어 저장된 서열(genetic_records.dna_sequence)을 재정규화 없이 표시만 합니다."""
+    return [s if isinstance(s, CanonicalSequence) else CanonicalSequence(s or '') for s in seqs]
@@ -1,5 +1,6 @@
 import joblib
 import os
+from dna_app.database.feature_store import compute_features
 from typing import Optional, Tuple, List
 try:
     from lime.lime_text import LimeTextExplainer
@@ -7,8 +8,10 @@ except ImportError:
     LimeTextExplainer = None
 
 class XAIService:
-    def __init__(self, model_dir: str):
+    def __init__(self, model_dir: str, db_manager=None):
         self.model_dir = model_dir
+        # 있으면 원본 서열의 특징 벡터를 특징 저장소에서 읽음
+        self.db_manager = db_manager
         self.pipeline = None
         self.feature_names = None
         self.explainer = None
@@ -30,10 +33,6 @@ class XAIService:
             if os.path.exists(feature_path):
                 self.feature_names = joblib.load(feature_path)
 
-            # 전처리기 초기화
-            from dna_app.services.feature_extractor import BiologicalFeatureExtractor
-            self.extractor = BiologicalFeatureExtractor(kmer_size=3)
-
             if self.classifier and LimeTextExplainer:
                 self.explainer = LimeTextExplainer(class_names=self.classifier.classes_)
             
@@ -57,7 +56,11 @@ class XAIService:
 
         def predict_fn(texts: List[str]):
             # LIME은 문자열 리스트를 입력으로 주므로 전체 파이프라인 수동 적용
-            X_feat = self.extractor.transform(texts)
+            # (섭동된 서열은 일회성이므로 저장하지 않고, 저장소에 있는 원본 서열만 재사용)
+            if self.db_manager is not None:
+                X_feat = self.db_manager.get_features('genetiforest', texts, persist=False)
+            else:
+                X_feat = compute_features('genetiforest', texts)
             X_scaled = self.scaler.transform(X_feat)
             return self.classifier.predict_proba(X_scaled)
 
@@ -0,0 +1,73 @@
+# filename: dna_import.py
+"""
+dna-import: 로컬 FASTA / FASTA.gz 파일을 DB에 대량 적재합니다.
+
+    python dna_import.py archive.fasta.gz more.fa --type DNA --min-length 100 --batch-size 2000
+"""
+import argparse
+import os
+import sys
+
+from config import config
+from dna_app.database.db_manager import DatabaseManager
+from dna_app.services.import_service import FastaImporter
+
+
+def _report(path: str):
+    def progress(stats):
+        print(f"\r[Import] {os.path.basename(path)}: {stats['records']:,} read, {stats['added']:,} new, "
+              f"{stats['duplicates']:,} duplicates, {stats['skipped_short']:,} skipped, {stats['invalid']:,} invalid "
+              f"({stats['records_per_sec']:,.0f} rec/s)", end='', flush=True)
+    return progress
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='dna-import', description='Bulk import FASTA / FASTA.gz files.')
+    parser.add_argument('files', nargs='+', help='FASTA 파일 경로 (.gz 자동 감지)')
+    parser.add_argument('--type', dest='record_type', default='DNA', choices=['DNA', 'RNA'])
+    parser.add_argument('--min-length', type=int, default=0, help='이보다 짧은 서열은 건너뜀')
+    parser.add_argument('--batch-size', type=int, default=FastaImporter.DEFAULT_BATCH_SIZE,
+                        help='트랜잭션당 레코드 수')
+    parser.add_argument('--collapse-near-duplicates', action='store_true', default=None,
+                        help='근사 중복을 대표 서열에 병합 (기본: 서버 설정)')
+    parser.add_argument('--db', default=config.DB_FILE, help='SQLite DB 경로')
+    args = parser.parse_args(argv)
+
+    missing = [f for f in args.files if not os.path.isfile(f)]
+    if missing:
+        parser.error(f"file not found: {', '.join(missing)}")
+
+    config.setup_directories()
+    db_manager = DatabaseManager(
+        db_path=args.db,
+        near_duplicate_identity=config.NEAR_DUPLICATE_IDENTITY if config.NEAR_DUPLICATE_COLLAPSE else None
+    )
+    importer = FastaImporter(db_manager)
+    totals = {"records": 0, "added": 0, "duplicates": 0, "skipped_short": 0, "invalid": 0, "ambiguous_records": 0,
+              "elapsed_seconds": 0.0}
+    try:
+        for path in args.files:
+            stats = importer.import_fasta(
+                path, record_type=args.record_type, min_length=max(args.min_length, 0),
+                batch_size=max(args.batch_size, 1), collapse_near_duplicates=args.collapse_near_duplicates,
+                progress=_report(path)
+            )
+            print()
+            for key in totals:
+                totals[key] += stats[key]
+    except KeyboardInterrupt:
+        # 커밋된 배치까지는 저장되어 있음
+        print("\n[Import] Interrupted.")
+        return 130
+    finally:
+        db_manager.close()
+
+    rate = totals['records'] / totals['elapsed_seconds'] if totals['elapsed_seconds'] else 0
+    print(f"[Import] Done: {totals['records']:,} records from {len(args.files)} file(s), {totals['added']:,} new, "
+          f"{totals['duplicates']:,} duplicates, {totals['skipped_short']:,} skipped, {totals['invalid']:,} invalid, "
+          f"{totals['ambiguous_records']:,} with ambiguous bases in {totals['elapsed_seconds']:.1f}s ({rate:,.0f} rec/s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
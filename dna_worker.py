@@ -0,0 +1,60 @@
+# filename: dna_worker.py
+"""
+dna-worker: 공유 DB의 job_queue에서 작업을 가져와 실행하는 워커 프로세스.
+같은 DB 파일을 보는 여러 프로세스/호스트에서 동시에 실행할 수 있습니다.
+
+    python dna_worker.py --kinds fetch_samples,import --poll 2
+"""
+# run.py와 동일하게 다른 모듈 import 전에 스레드 수 고정 (학습 작업의 OpenMP 충돌 방지)
+import os
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+os.environ.setdefault('MKL_NUM_THREADS', '1')
+
+import argparse
+import signal
+import sys
+
+from config import config
+from dna_app.database.db_manager import DatabaseManager
+from dna_app.database.job_queue import JobQueue
+from dna_app.services.queue_worker import QueueWorker, build_handlers
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='dna-worker', description='Run a job queue worker.')
+    parser.add_argument('--kinds', default='', help='처리할 작업 종류 (쉼표 구분, 기본: 전체)')
+    parser.add_argument('--worker-id', default=None, help='기본: hostname:pid:random')
+    parser.add_argument('--poll', type=float, default=2.0, help='대기열이 비었을 때 폴링 간격 (초)')
+    parser.add_argument('--lease', type=float, default=config.JOB_LEASE_SECONDS, help='임대 시간 (초)')
+    parser.add_argument('--once', action='store_true', help='대기열이 비면 종료')
+    parser.add_argument('--db', default=config.DB_FILE, help='SQLite DB 경로')
+    args = parser.parse_args(argv)
+
+    config.setup_directories()
+    db_manager = DatabaseManager(
+        db_path=args.db,
+        near_duplicate_identity=config.NEAR_DUPLICATE_IDENTITY if config.NEAR_DUPLICATE_COLLAPSE else None
+    )
+    handlers = build_handlers(db_manager, config)
+    if args.kinds:
+        kinds = [k.strip() for k in args.kinds.split(',') if k.strip()]
+        unknown = set(kinds) - set(handlers)
+        if unknown:
+            parser.error(f"unknown job kind(s): {', '.join(sorted(unknown))} (available: {', '.join(handlers)})")
+        handlers = {k: handlers[k] for k in kinds}
+
+    worker = QueueWorker(JobQueue(db_manager, lease_seconds=args.lease), handlers,
+                         worker_id=args.worker_id, poll_interval=args.poll)
+    # SIGTERM: 현재 작업을 마친 뒤 종료 (강제 종료되면 임대 만료 후 다른 워커가 재시도)
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    try:
+        worker.run(once=args.once)
+    except KeyboardInterrupt:
+        print("\n[Worker] Interrupted; unfinished job will be retried after its lease expires.")
+    finally:
+        db_manager.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -34,7 +34,7 @@ if __name__ == "__main__":
     print("--- [Step 2: Initializing Services] ---")
     db_manager = DatabaseManager(db_path=DB_FILE)
     record_service = RecordService(db_manager=db_manager)
-    ml_service = MLService(model_path=MODEL_FILE)
+    ml_service = MLService(model_path=MODEL_FILE, db_manager=db_manager)
     print("-" * 35 + "\n")
 
     # 3. 새로운 유전 정보 생성 및 AI 분석
@@ -18,7 +18,8 @@ class BiologicalFeatureExtractor:
     def transform(self, X):
         features = []
         for seq in X:
-            seq = seq.upper().replace('U', 'T') 
+            if not getattr(seq, 'canonical', False):  # 정규화된 서열(CanonicalSequence)은 그대로
+                seq = (seq or '').upper().replace('U', 'T')
             row = []
             length = len(seq)
             # 1. GC Content
@@ -63,7 +64,8 @@ class SequenceFeatureExtractor:
     def transform(self, X):
         features = []
         for seq in X:
-            seq = seq.upper().replace('U', 'T')
+            if not getattr(seq, 'canonical', False):  # 정규화된 서열(CanonicalSequence)은 그대로
+                seq = (seq or '').upper().replace('U', 'T')
             row = []
             length = len(seq)
             row.append((seq.count('G') + seq.count('C')) / length if length > 0 else 0) # GC
@@ -101,11 +103,16 @@ class SequenceFeatureExtractor:
             if p > 0: e -= p * math.log2(p)
         return e
     def _calc_repeat(self, seq):
+        # seq[i:i+l] == seq[i+l:i+2l] 비교를 배열로: 서열을 l만큼 민 자기 자신과 비교 후 길이 l 구간 합 == l
         if len(seq) < 6: return 0
+        if seq.isascii(): chars = np.frombuffer(seq.encode('ascii'), dtype=np.uint8)
+        else: chars = np.frombuffer(seq.encode('utf-32-le'), dtype='<u4')
         cnt = 0
         for l in [2, 3, 4]:
-            for i in range(len(seq) - l*2):
-                if seq[i:i+l] == seq[i+l:i+l*2]: cnt += 1
+            n = len(seq) - l*2
+            if n <= 0: continue
+            m = np.concatenate(([0], np.cumsum(chars[l:] == chars[:-l])))
+            cnt += int(np.count_nonzero((m[l:l+n] - m[:n]) == l))
         return cnt / len(seq)
     def _calc_cpg(self, seq, length):
         if length < 2: return 0
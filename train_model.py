@@ -1,5 +1,6 @@
 import os
 import random
+import tempfile
 import joblib
 import numpy as np
 import math
@@ -12,7 +13,8 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import Pipeline
 from sklearn.metrics import classification_report
 from dna_app.database.db_manager import DatabaseManager
-from dna_app.services.feature_extractor import BiologicalFeatureExtractor
+from dna_app.database.feature_store import compute_features, feature_dim, get_extractor
+from dna_app.services.sequence_normalizer import as_canonical
 from config import config
 
 
@@ -119,42 +121,84 @@ def train_initial_model(model_path: str):
     return _train_and_save(X, model_path)
 
 
+def _check_cancelled(job):
+    """job(Job/JobContext)이 주어지면 단계 사이마다 취소 요청을 확인합니다 (모델 파일을 덮어쓰기 전 포함)."""
+    if job is not None:
+        job.check_cancelled()
+
+
 # --- 3. DB Retraining ---
-def retrain_model_from_db(model_path: str, db_path: str):
+RETRAIN_CHUNK = 2000  # 읽기 스냅샷에서 한 번에 가져오는 행 수 (서열은 이 만큼만 메모리에 유지)
+
+
+def retrain_model_from_db(model_path: str, db_path: str, job=None):
+    """
+    DB의 모든 레코드로 재학습합니다.
+    하나의 읽기 스냅샷에서 (서열, occurrence_count)를 RETRAIN_CHUNK행씩 스트리밍해 특징은 np.memmap에,
+    가중치는 같은 행에서 바로 기록 → 전체 서열 목록이나 레코드 튜플을 메모리에 올리지 않음.
+    """
     print("[Trainer] Starting model RETRAINING from database...")
     db_manager = DatabaseManager(db_path)
-    records = db_manager.get_all_records()
-    db_manager.close()
+    features_path = None
+    try:
+        with db_manager.read_snapshot() as conn:
+            total = conn.execute("SELECT COUNT(*) FROM genetic_records").fetchone()[0]
+            if total < 10:
+                msg = f"[Trainer] Not enough data. Found {total} records."
+                print(msg)
+                return False, msg
 
-    if len(records) < 10: 
-        msg = f"[Trainer] Not enough data. Found {len(records)} records."
-        print(msg)
-        return False, msg
+            fd, features_path = tempfile.mkstemp(prefix='retrain_', suffix='.f32')
+            os.close(fd)
+            X_features = np.memmap(features_path, dtype=np.float32, mode='w+',
+                                   shape=(total, feature_dim('genetiforest')))
+            weights = np.ones(total, dtype=np.int64)
+            if job is not None:
+                job.total = total
 
-    # Schema: id(0), seq(1), ... count(5)
-    sequences = [row[1] for row in records]
-    
-    # Weights extraction
-    weights = []
-    for row in records:
-        w = 1
-        if len(row) > 5 and row[5] is not None:
-             try: w = int(row[5])
-             except: w = 1
-        weights.append(w)
-    
-    return _train_and_save(sequences, model_path, weights)
+            cursor = conn.execute("SELECT dna_sequence, occurrence_count FROM genetic_records ORDER BY rowid")
+            filled = 0
+            while True:
+                rows = cursor.fetchmany(RETRAIN_CHUNK)
+                if not rows:
+                    break
+                _check_cancelled(job)
+                # DB에는 수집 단계에서 정규화된 서열이 저장되므로 특징 추출 시 재정규화 생략
+                db_manager.get_features('genetiforest', as_canonical(row[0] for row in rows),
+                                        out=X_features[filled:filled + len(rows)])
+                weights[filled:filled + len(rows)] = [int(row[1]) if row[1] else 1 for row in rows]
+                filled += len(rows)
+                if job is not None:
+                    job.set(fetched=filled)
+        X_features.flush()
+        print(f"[Trainer] Streamed features for {filled} records")
+        return _fit_and_save(X_features, model_path, weights, job=job)
+    finally:
+        db_manager.close()
+        if features_path and os.path.exists(features_path):
+            os.remove(features_path)
 
 
 # --- 4. Common Training Logic ---
-def _train_and_save(X: List[str], model_path: str, weights: List[int] = None) -> Tuple[bool, str]:
+def _train_and_save(X: List[str], model_path: str, weights: List[int] = None, db_manager=None,
+                    job=None) -> Tuple[bool, str]:
     if not X: return False, "No data."
-    if weights is None: weights = [1] * len(X)
+    _check_cancelled(job)
     
     # 1. Feature Extraction First (to generate labels)
-    print("[Trainer] Extracting biological features for profiling...")
-    extractor = BiologicalFeatureExtractor(kmer_size=3)
-    X_features = extractor.transform(X)
+    # DB 학습은 수집 시점에 저장된 특징 벡터를 읽음 - 라벨링(K-Means)과 분류기 학습이 같은 행렬을 공유
+    print("[Trainer] Loading biological features for profiling...")
+    if db_manager is not None:
+        X_features = db_manager.get_features('genetiforest', X)
+    else:
+        X_features = compute_features('genetiforest', X)
+    return _fit_and_save(X_features, model_path, weights, job=job)
+
+
+def _fit_and_save(X_features: np.ndarray, model_path: str, weights=None, job=None) -> Tuple[bool, str]:
+    """특징 행렬(ndarray 또는 np.memmap)로 라벨링(K-Means) + 분류기 학습 후 저장합니다."""
+    if weights is None: weights = [1] * len(X_features)
+    _check_cancelled(job)
     
     # 2. Unsupervised Labeling (K-Means)
     # 생물학적 특징을 기반으로 자연스러운 2개 군집(Type A/B)을 발견
@@ -165,16 +209,13 @@ def _train_and_save(X: List[str], model_path: str, weights: List[int] = None) ->
     # Cluster 0 -> Type A, Cluster 1 -> Type B (Mapping might vary, but consistency is key)
     # To make it somewhat consistent, let's say High GC content cluster is always 'Type A'
     # Calculate AVG GC content for cluster 0
-    gc_indices = [0] # 0th feature is GC content
-    cluster_0_indices = [i for i, c in enumerate(clusters) if c == 0]
-    if cluster_0_indices:
-        avg_gc_0 = np.mean([X_features[i][0] for i in cluster_0_indices])
-    else:
-        avg_gc_0 = 0
+    # 0th feature is GC content (memmap도 열 단위로 바로 계산)
+    cluster_0 = clusters == 0
+    avg_gc_0 = float(X_features[cluster_0, 0].mean()) if cluster_0.any() else 0
         
     # If Cluster 0 is High GC, map 0->Type A. Else 0->Type B.
     # We define Type A as the "High GC / Structured" type based on prompt context
-    avg_gc_global = np.mean([f[0] for f in X_features])
+    avg_gc_global = float(X_features[:, 0].mean())
     
     if avg_gc_0 > avg_gc_global:
         label_map = {0: "Type A", 1: "Type B"}
@@ -196,21 +237,20 @@ def _train_and_save(X: List[str], model_path: str, weights: List[int] = None) ->
     # 트리 수를 줄여 약간의 오분류가 발생하도록 유도
     
     X_train, X_test, y_train, y_test, w_train, w_test = train_test_split(
-        X, y_labels, weights, test_size=0.2, random_state=42, stratify=y_labels
+        X_features, y_labels, weights, test_size=0.2, random_state=42, stratify=y_labels
     )
     
     pipeline = Pipeline([
-        ('bio_features', BiologicalFeatureExtractor(kmer_size=3)),
         ('scaler', StandardScaler()),
         ('classifier', RandomForestClassifier(n_estimators=50, max_depth=5, random_state=42))
     ])
     
     pipeline.fit(X_train, y_train, classifier__sample_weight=w_train)
+    _check_cancelled(job)
     
     # Extract raw components for portability
     classifier = pipeline.named_steps['classifier']
     scaler = pipeline.named_steps['scaler']
-    extractor_obj = pipeline.named_steps['bio_features']
     
     y_pred = pipeline.predict(X_test)
     print("\n[Trainer] Evaluation on Test Split:")
@@ -258,7 +298,7 @@ def _train_and_save(X: List[str], model_path: str, weights: List[int] = None) ->
     print(f"[Trainer] Raw Model saved to {model_path}")
     
     # Save Feature Names for XAI
-    feature_names = extractor_obj.get_feature_names_out().tolist()
+    feature_names = get_extractor('genetiforest').get_feature_names_out().tolist()
     fn_path = os.path.join(model_dir, "feature_names.joblib")
     joblib.dump(feature_names, fn_path)
     print(f"[Trainer] Feature names saved to {fn_path}")
@@ -272,13 +312,12 @@ def _train_and_save(X: List[str], model_path: str, weights: List[int] = None) ->
 
 
 # --- 5. Sequence-Specific Training (NEW) ---
-def train_sequence_model(model_path: str, db_path: str):
+def train_sequence_model(model_path: str, db_path: str, job=None):
     """
     시퀀스 고유 특징 학습 - 메타데이터 기반 지도 학습
     기존 임베딩 재학습과 분리된 독립 모델
     """
     from sklearn.ensemble import GradientBoostingClassifier
-    from dna_app.services.sequence_feature_extractor import SequenceFeatureExtractor
     import json
     import re
     
@@ -295,9 +334,9 @@ def train_sequence_model(model_path: str, db_path: str):
         WHERE source_metadata IS NOT NULL AND source_metadata != '[]'
     """)
     records = cursor.fetchall()
-    db_manager.close()
     
     if len(records) < 20:
+        db_manager.close()
         msg = f"[SequenceTrainer] Not enough labeled data. Found {len(records)} records."
         print(msg)
         return False, msg
@@ -334,6 +373,7 @@ def train_sequence_model(model_path: str, db_path: str):
             labels.append(virus_type)
     
     if len(sequences) < 20:
+        db_manager.close()
         msg = f"[SequenceTrainer] Not enough parsed labels. Found {len(sequences)} valid samples."
         print(msg)
         return False, msg
@@ -343,20 +383,27 @@ def train_sequence_model(model_path: str, db_path: str):
     valid_labels = {label for label, count in label_counts.items() if count >= 10}
     
     if len(valid_labels) < 2:
+        db_manager.close()
         msg = f"[SequenceTrainer] Not enough distinct classes. Need at least 2 classes with 10+ samples each."
         print(msg)
         return False, msg
     
     # 유효한 라벨만 필터링
     filtered_data = [(seq, label) for seq, label in zip(sequences, labels) if label in valid_labels]
-    sequences = [d[0] for d in filtered_data]
+    sequences = as_canonical(d[0] for d in filtered_data)
     labels = [d[1] for d in filtered_data]
     
     print(f"[SequenceTrainer] Parsed {len(sequences)} sequences with labels: {Counter(labels)}")
+    if job is not None:
+        job.set(fetched=len(sequences))
     
-    # Feature Extraction
-    extractor = SequenceFeatureExtractor(kmer_size=5)
-    X_features = extractor.transform(sequences)
+    # Feature Extraction (수집 시점에 저장된 ViralBoost 특징 벡터 사용)
+    try:
+        _check_cancelled(job)
+        X_features = db_manager.get_features('viralboost', sequences)
+    finally:
+        db_manager.close()
+    _check_cancelled(job)
     
     # Train/Test Split (희귀 클래스 제거 후 stratify 안전하게 사용)
     try:
@@ -393,6 +440,7 @@ def train_sequence_model(model_path: str, db_path: str):
     ])
     
     pipeline.fit(X_train, y_train, classifier__sample_weight=sample_weights)
+    _check_cancelled(job)
     
     # Extract raw components for portability
     classifier = pipeline.named_steps['classifier']
@@ -0,0 +1,280 @@
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+import io
+import csv
+import gzip
+from datetime import datetime
+
+# Add project root to sys.path
+root_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, root_dir)
+
+from config import config
+
+
+def make_app():
+    """실제 database/ 폴더를 건드리지 않도록 임시 디렉토리를 가리키는 설정으로 앱을 만듭니다."""
+    work_dir = tempfile.mkdtemp()
+    config.DB_FILE = os.path.join(work_dir, 'genetics.db')
+    config.ANALYTICS_MIRROR_FILE = os.path.join(work_dir, 'analytics.duckdb')
+    config.BACKUP_DIR = os.path.join(work_dir, 'backups')
+    config.SANDBOX_CACHE_DIR = os.path.join(work_dir, 'sandbox-cache')
+    config.IMPORT_DIR = os.path.join(work_dir, 'imports')
+    config.EXPORT_DIR = os.path.join(work_dir, 'exports')
+    config.MODEL_FILE = os.path.join(work_dir, 'models', 'missing.joblib')
+    config.BACKUP_INTERVAL_MINUTES = 0
+    from dna_app import create_app
+    app = create_app()
+    app.db_manager.run_index_backfill()
+    return app
+
+
+def close_app(app):
+    app.analytics_mirror.close()
+    app.db_manager.close()
+
+
+def seed_records(app, n=30, seed=1):
+    rng = random.Random(seed)
+    records = [{
+        "record_id": f"rec{seed}-{i:03d}", "dna_sequence": ''.join(rng.choice('ACGT') for _ in range(rng.randint(60, 200))),
+        "birth_time": datetime(2024, 1 + i % 12, 1 + i % 28), "record_type": "DNA", "source_info": f"seed {i}"
+    } for i in range(n)]
+    app.db_manager.upsert_records(records)
+    # 특징 저장소(sequence_features)에도 BLOB 행이 생기도록 저장된 서열의 특징을 저장
+    app.db_manager.get_features('genetiforest', [r['dna_sequence'] for r in records], persist=True)
+    return records
+
+
+def check_table_browser(app):
+    print("--- 1. Table browser on every table ---")
+    client = app.test_client()
+    tables = client.get('/api/database/tables').get_json()['tables']
+    blob_tables = {'kmer_postings', 'sequence_features', 'sequence_signatures'}
+    assert blob_tables <= set(tables), tables
+    for table in tables:
+        for query in ('', '?columns=*'):
+            resp = client.get(f'/api/database/tables/{table}{query}')
+            assert resp.status_code == 200, (table, query, resp.get_json())
+            body = resp.get_json()
+            cursor = body['pagination']['next_cursor']
+            if cursor:
+                resp = client.get(f'/api/database/tables/{table}?cursor={cursor}{query.replace("?", "&")}')
+                assert resp.status_code == 200, (table, 'cursor', resp.get_json())
+            if table in blob_tables and not query:
+                assert all(c['type'].upper() != 'BLOB' for c in body['columns']), (table, body['columns'])
+    print(f"[PASS] all {len(tables)} tables browse with and without columns=*")
+
+    body = client.get('/api/database/tables/sequence_signatures?columns=*').get_json()
+    value = body['rows'][0]['signature']
+    assert isinstance(value, dict) and value['blob_bytes'] > 0 and value['hex'].endswith('...'), value
+    print("[PASS] BLOB values are shown as length plus a hex preview")
+
+
+def count_records(path):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        assert conn.execute("PRAGMA integrity_check").fetchone()[0] == 'ok', path
+        return conn.execute("SELECT COUNT(*) FROM genetic_records").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def check_backup_restore(app):
+    """다른 커넥션(다른 프로세스 역할)이 계속 쓰는 동안 스냅샷/복원이 일관된 DB를 만드는지 확인합니다."""
+    print("\n--- 2. Snapshot and restore under concurrent writes ---")
+    client = app.test_client()
+    db_path = app.config['DB_FILE']
+    # 작은 테스트 DB에서도 스냅샷이 여러 단계로 복사되도록
+    app.backup_manager.pages_per_step = 4
+    stop, written, errors = threading.Event(), [], []
+
+    def writer():
+        conn = sqlite3.connect(db_path, timeout=10)
+        try:
+            while not stop.is_set():
+                key = f"writer:{len(written)}"
+                conn.execute("INSERT INTO system_metadata (key, value) VALUES (?, 'x')", (key,))
+                conn.commit()
+                written.append((key, time.time()))
+                time.sleep(0.001)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            conn.close()
+
+    before = count_records(db_path)
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        resp = client.post('/api/system/backups', json={"label": "verify"})
+        assert resp.status_code == 200, resp.get_json()
+        snapshot = resp.get_json()['snapshot']
+        assert snapshot['steps'] > 1, snapshot
+        seed_records(app, n=20, seed=2)
+        assert count_records(db_path) == before + 20
+        assert count_records(os.path.join(app.config['BACKUP_DIR'], snapshot['name'])) == before
+        print(f"[PASS] snapshot copied in {snapshot['steps']} steps during writes is consistent")
+
+        resp = client.post(f"/api/system/backups/{snapshot['name']}/restore")
+        assert resp.status_code == 200, resp.get_json()
+        result, restored_at = resp.get_json(), time.time()
+        time.sleep(0.1)
+    finally:
+        stop.set()
+        thread.join()
+    assert not errors, errors
+    assert count_records(db_path) == before, "restore must bring back the snapshot's records"
+    after = [key for key, t in written if t > restored_at]
+    conn = sqlite3.connect(db_path)
+    try:
+        kept = {k for (k,) in conn.execute("SELECT key FROM system_metadata WHERE key LIKE 'writer:%'")}
+    finally:
+        conn.close()
+    assert after and set(after) <= kept, "writes committed after the restore must be kept"
+    safety = os.path.join(app.config['BACKUP_DIR'], result['pre_restore_snapshot'])
+    assert count_records(safety) == before + 20
+    assert client.get('/api/database/tables/genetic_records').get_json()['pagination']['total_rows'] == before
+    print(f"[PASS] restore is consistent while another connection kept writing ({len(written)} commits)")
+
+    resp = client.post('/api/system/backups/genetics_00000000_000000.db/restore')
+    assert resp.status_code == 404, resp.status_code
+    print("[PASS] unknown snapshot name returns 404")
+
+
+def check_sandbox_zip(app):
+    """Sandbox ZIP에는 백업/캐시/미러/WAL 파일 대신 DB 스냅샷 하나만 들어가야 합니다."""
+    print("\n--- 3. Sandbox ZIP contents ---")
+    client = app.test_client()
+    work_dir = os.path.dirname(app.config['DB_FILE'])
+    with open(os.path.join(work_dir, 'main.py'), 'w') as f:
+        f.write("print('sandbox')\n")
+    with open(app.config['ANALYTICS_MIRROR_FILE'], 'wb') as f:
+        f.write(b'duckdb')
+    assert os.path.exists(app.config['DB_FILE'] + '-wal') and app.backup_manager.list_snapshots()
+
+    cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        def download():
+            resp = client.get('/api/system/download/sandbox')
+            assert resp.status_code == 200, resp.data[:200]
+            return zipfile.ZipFile(io.BytesIO(resp.data))
+
+        zf = download()
+        names = zf.namelist()
+        assert 'main.py' in names and 'genetics.db' in names, names
+        leaked = [n for n in names if n.startswith(('backups/', 'sandbox-cache/')) or
+                  n.endswith(('-wal', '-shm', '.duckdb'))]
+        assert not leaked, leaked
+        snapshot = os.path.join(tempfile.mkdtemp(), 'genetics.db')
+        with open(snapshot, 'wb') as f:
+            f.write(zf.read('genetics.db'))
+        expected = count_records(app.config['DB_FILE'])
+        assert count_records(snapshot) == expected
+        print(f"[PASS] ZIP has {len(names)} files: a consistent DB snapshot, no backups/cache/mirror/-wal/-shm")
+
+        seed_records(app, n=3, seed=3)
+        zf = download()
+        with open(snapshot, 'wb') as f:
+            f.write(zf.read('genetics.db'))
+        assert count_records(snapshot) == expected + 3
+        cache_dir = app.config['SANDBOX_CACHE_DIR']
+        assert not [n for n in os.listdir(cache_dir) if not n.endswith('.zip')], os.listdir(cache_dir)
+        print("[PASS] writes invalidate the cached ZIP and temporary snapshots are removed")
+    finally:
+        os.chdir(cwd)
+
+
+def check_job_paths(app):
+    print("\n--- 4. Queue job paths ---")
+    client = app.test_client()
+    for kind, path in (('export', '../genetics.db'), ('export', '/tmp/out.parquet'), ('import', '../genetics.db'),
+                       ('import', None)):
+        resp = client.post('/api/jobs', json={"kind": kind, "payload": {"path": path}})
+        assert resp.status_code == 400, (kind, path, resp.get_json())
+    resp = client.post('/api/jobs', json={"kind": "export", "payload": {"path": "2024/records.parquet"}})
+    assert resp.status_code == 202, resp.get_json()
+    app.job_queue.cancel(resp.get_json()['job_id'])
+    print("[PASS] /api/jobs rejects import/export paths outside IMPORT_DIR / EXPORT_DIR")
+
+
+def check_csv_download(app):
+    """CSV 다운로드: gzip 왕복, 컬럼 선택, since/until 날짜 필터 (ISO 'T'와 공백 형식이 섞인 birth_time)"""
+    print("\n--- 5. Database CSV download ---")
+    client = app.test_client()
+    # fetchmany(1000) 배치가 여러 번 돌도록
+    rng = random.Random(33)
+    app.db_manager.upsert_records([{
+        "record_id": f"bulk{i:04d}", "dna_sequence": ''.join(rng.choice('ACGT') for _ in range(80)),
+        "birth_time": datetime(2023, 1 + i % 12, 1 + i % 28, 12, 30), "record_type": "RNA" if i % 3 else "DNA",
+        "source_info": f"bulk {i}"
+    } for i in range(1500)])
+    # 이전 버전이 저장한 공백 구분 birth_time 형식
+    app.db_manager.execute_write("UPDATE genetic_records SET birth_time = replace(birth_time, 'T', ' ') "
+                                 "WHERE record_id LIKE 'rec1-%' AND CAST(substr(record_id, 6) AS INTEGER) % 2 = 0")
+    with app.db_manager.read_snapshot() as conn:
+        stored = conn.execute("SELECT record_id, record_type, birth_time, dna_sequence FROM genetic_records").fetchall()
+
+    def rows_of(data):
+        text = data.decode('utf-8')
+        assert text.startswith('\ufeff')
+        return list(csv.reader(io.StringIO(text[1:])))
+
+    plain = client.get('/api/system/download/database')
+    zipped = client.get('/api/system/download/database?gzip=1')
+    assert plain.status_code == zipped.status_code == 200
+    assert zipped.mimetype == 'application/gzip' and gzip.decompress(zipped.data) == plain.data
+    rows = rows_of(plain.data)
+    header = rows[0]
+    by_id = {r[header.index('record_id')]: r for r in rows[1:]}
+    assert len(rows) - 1 == len(stored) and all(by_id[rid][header.index('dna_sequence')] == seq
+                                                  for rid, _, _, seq in stored)
+    print(f"[PASS] gzip=1 decompresses to the plain CSV ({len(stored)} rows, {len(zipped.data)} vs {len(plain.data)} bytes)")
+
+    rows = rows_of(client.get('/api/system/download/database?columns=record_id,birth_time').data)
+    assert rows[0] == ['record_id', 'birth_time'] and all(len(r) == 2 for r in rows)
+    assert client.get('/api/system/download/database?columns=record_id,secret').status_code == 400
+    print("[PASS] columns= selects and orders columns, unknown columns are rejected")
+
+    for query, keep in (('since=2024-03-01', lambda d: d >= '2024-03-01'),
+                        ('until=2024-06-15', lambda d: d <= '2024-06-15'),
+                        ('since=2024-03-05&until=2024-03-05', lambda d: d == '2024-03-05'),
+                        ('since=2024-02-01&until=2024-05-31&gzip=1', lambda d: '2024-02-01' <= d <= '2024-05-31')):
+        data = client.get(f'/api/system/download/database?columns=record_id&{query}').data
+        rows = rows_of(gzip.decompress(data) if 'gzip=1' in query else data)
+        expected = sorted(rid for rid, _, birth, _ in stored if keep(birth[:10]))
+        assert sorted(r[0] for r in rows[1:]) == expected, (query, len(rows) - 1, len(expected))
+    rows = rows_of(client.get('/api/system/download/database?columns=record_id&record_type=RNA&since=2023-06-01').data)
+    assert sorted(r[0] for r in rows[1:]) == sorted(rid for rid, rtype, birth, _ in stored
+                                                    if rtype == 'RNA' and birth[:10] >= '2023-06-01')
+    unpadded = client.get('/api/system/download/database?columns=record_id&since=2024-3-1').data
+    assert unpadded == client.get('/api/system/download/database?columns=record_id&since=2024-03-01').data
+    for bad in ('since=2024-13-01', 'until=yesterday'):
+        assert client.get(f'/api/system/download/database?{bad}').status_code == 400
+    print("[PASS] since/until filter on the date part of mixed-format birth_time, unpadded dates work, bad dates are rejected")
+
+
+def main():
+    app = make_app()
+    try:
+        seed_records(app)
+        check_table_browser(app)
+        check_backup_restore(app)
+        check_sandbox_zip(app)
+        check_job_paths(app)
+        check_csv_download(app)
+    finally:
+        close_app(app)
+
+    print("\nALL TESTS PASSED.")
+
+
+if __name__ == "__main__":
+    main()
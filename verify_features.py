@@ -0,0 +1,97 @@
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+# Add project root to sys.path
+root_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, root_dir)
+
+from dna_app.services.feature_extractor import BiologicalFeatureExtractor
+from dna_app.services.sequence_feature_extractor import SequenceFeatureExtractor
+from dna_app.services.sequence_normalizer import CanonicalSequence
+
+
+def sample_sequences(count: int = 300, seed: int = 7):
+    """경계 사례(빈 서열, 짧은 서열, N/IUPAC, 소문자, RNA, 공백, 비 ASCII) + 무작위 서열"""
+    rng = random.Random(seed)
+    seqs = ['', 'A', 'AC', 'ACG', 'ACGT', 'ACGTA', 'acgu', 'NNNNNN', 'ACGTNNACGTRYKM', 'AC GT\n',
+            'ACACACACAC', 'ATATATATATAT', 'CGCGCG', 'ÄCGTACGT', CanonicalSequence('AAAAAAAAAAAA')]
+    for _ in range(count):
+        length = rng.choice([2, 4, 5, 6, 7, 50, 500, 3000])
+        alphabet = rng.choice(['ACGT', 'ACGTN', 'ACGTACGTNRY', 'AT', 'acgtu'])
+        seqs.append(''.join(rng.choice(alphabet) for _ in range(length)))
+    return seqs
+
+
+def reference_row(extractor, seq):
+    """문자열 슬라이스/Counter 기반 기준 구현으로 계산한 특징 행"""
+    seq = seq.upper().replace('U', 'T')
+    if isinstance(extractor, SequenceFeatureExtractor):
+        return extractor._reference_row(seq)
+    return extractor._transform_text(seq)
+
+
+def check(name, extractor, seqs):
+    fast = extractor.transform(seqs)
+    reference = np.array([reference_row(extractor, s) for s in seqs])
+    assert fast.shape == reference.shape, f"{name}: shape {fast.shape} != {reference.shape}"
+    mismatched = np.flatnonzero(~np.all(fast == reference, axis=1))
+    assert not len(mismatched), f"{name}: {len(mismatched)} rows differ (first: {seqs[mismatched[0]][:40]!r})"
+    assert fast.shape[1] == len(extractor.get_feature_names_out())
+    print(f"[PASS] {name}: {fast.shape[0]} rows x {fast.shape[1]} features identical to the reference implementation")
+
+
+def main():
+    seqs = sample_sequences()
+
+    print("--- 1. BiologicalFeatureExtractor (GenetiForest) ---")
+    for k in (1, 2, 3, 4):
+        check(f"BiologicalFeatureExtractor(kmer_size={k})", BiologicalFeatureExtractor(kmer_size=k), seqs)
+
+    print("\n--- 2. SequenceFeatureExtractor (ViralBoost) ---")
+    for k in (3, 5):
+        check(f"SequenceFeatureExtractor(kmer_size={k})", SequenceFeatureExtractor(kmer_size=k), seqs)
+
+    print("\n--- 3. Tandem repeat score ---")
+    extractor = SequenceFeatureExtractor()
+    for seq in seqs:
+        expected = extractor._calc_repeat_score_slices(seq)
+        assert extractor._calc_repeat_score(seq) == expected, f"repeat score differs for {seq[:40]!r}"
+    stats = extractor.repeat_stats('ACACACACAC' + 'GATTGATTGATT' + 'A' * 30, window=20)
+    assert stats['longest_run'] == 30 and stats['by_unit'][2] > 0 and len(stats['density']) == 3, stats
+    print(f"[PASS] repeat score identical to slice comparison on {len(seqs)} sequences, repeat_stats: {stats}")
+
+    print("\n--- 4. Standalone ml_models/inference.py extractors ---")
+    sys.path.insert(0, os.path.join(root_dir, 'ml_models'))
+    import inference
+    for standalone, extractor in ((inference.BiologicalFeatureExtractor(), BiologicalFeatureExtractor(kmer_size=3)),
+                                  (inference.SequenceFeatureExtractor(), SequenceFeatureExtractor(kmer_size=5))):
+        assert np.array_equal(standalone.transform(seqs), extractor.transform(seqs)), extractor.__class__.__name__
+        print(f"[PASS] inference.{standalone.__class__.__name__} matches the app extractor")
+
+    print("\n--- 5. Batched / preallocated transform ---")
+    for extractor in (BiologicalFeatureExtractor(kmer_size=3), SequenceFeatureExtractor(kmer_size=5)):
+        full = extractor.transform(seqs)
+        out = np.full((len(seqs), extractor.n_features_out), np.nan, dtype=np.float32)
+        extractor.transform(iter(seqs), batch_size=32, out=out)
+        blocks = list(extractor.iter_transform(seqs, batch_size=50, dtype=np.float32))
+        assert np.array_equal(out, full.astype(np.float32)), extractor.__class__.__name__
+        assert np.array_equal(np.vstack(blocks), out) and max(len(b) for b in blocks) == 50
+        print(f"[PASS] {extractor.__class__.__name__}: batch_size/out/iter_transform match transform (float32)")
+
+    print("\n--- 6. Timing (200 x 5kb) ---")
+    rng = random.Random(1)
+    corpus = [CanonicalSequence(''.join(rng.choice('ACGT') for _ in range(5000))) for _ in range(200)]
+    for extractor in (BiologicalFeatureExtractor(kmer_size=3), SequenceFeatureExtractor(kmer_size=5)):
+        started = time.time()
+        extractor.transform(corpus)
+        print(f"{extractor.__class__.__name__}: {time.time() - started:.3f}s")
+
+    print("\nALL TESTS PASSED.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import gzip
+import io
+import mmap
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime
+
+# Add project root to sys.path
+root_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, root_dir)
+
+from dna_app.database.db_manager import DatabaseManager
+from dna_app.services.fasta_parser import iter_fasta
+from dna_app.services.import_service import FastaImporter
+
+
+class TrickleStream(io.RawIOBase):
+    """read()마다 최대 chunk 바이트만 돌려주는 스트림 (업로드 요청 본문처럼 조각나서 도착하는 입력)"""
+
+    def __init__(self, data: bytes, chunk: int):
+        self.data, self.pos, self.chunk = data, 0, chunk
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = min(self.chunk, len(buffer), len(self.data) - self.pos)
+        buffer[:n] = self.data[self.pos:self.pos + n]
+        self.pos += n
+        return n
+
+
+def sample_fasta(rng, count=40):
+    """
+    레코드 목록과 FASTA 바이트. 서열은 mmap 페이지/버퍼 크기보다 길고 줄 폭, 줄바꿈(LF/CRLF), 빈 줄이 섞여 있으며
+    마지막 줄에는 줄바꿈이 없습니다.
+    """
+    records, out = [], []
+    for i in range(count):
+        seq = ''.join(rng.choice('ACGTN') for _ in range(rng.choice([0, 1, 70, mmap.PAGESIZE - 3, 9000, 20000])))
+        header = f"seq{i} sample {i} |host=human|"
+        records.append((header, seq))
+        newline = rng.choice(['\n', '\r\n'])
+        width = rng.choice([60, 61, 80, 4095, 4096, 10 ** 6])
+        lines = [f">{header}"] + [seq[j:j + width] for j in range(0, len(seq), width)]
+        if rng.random() < 0.3:
+            lines.append('')
+        out.append(newline.join(lines))
+    return records, '\n'.join(out).encode()
+
+
+def check_fasta_sources():
+    print("--- 1. iter_fasta across sources, gzip and chunk/mmap boundaries ---")
+    rng = random.Random(39)
+    records, data = sample_fasta(rng)
+    packed = gzip.compress(data)
+    # 두 gzip 멤버를 이어 붙인 파일 (bgzip / cat a.gz b.gz)
+    half = data.index(b'>seq20')
+    multi = gzip.compress(data[:half]) + gzip.compress(data[half:])
+
+    work = tempfile.mkdtemp()
+    paths = {}
+    for name, payload in (('plain.fasta', data), ('packed.fasta.gz', packed), ('multi.fasta.gz', multi)):
+        paths[name] = os.path.join(work, name)
+        with open(paths[name], 'wb') as f:
+            f.write(payload)
+
+    sources = {
+        'path (mmap)': lambda: paths['plain.fasta'],
+        'path (gzip)': lambda: paths['packed.fasta.gz'],
+        'path (multi-member gzip)': lambda: paths['multi.fasta.gz'],
+        'binary stream': lambda: io.BytesIO(data),
+        'gzip stream': lambda: io.BytesIO(packed),
+        'text stream': lambda: io.StringIO(data.decode()),
+        'line iterable': lambda: iter(data.splitlines()),
+    }
+    for chunk in (1, 7, 4096):
+        sources[f'plain stream in {chunk}-byte reads'] = lambda chunk=chunk: TrickleStream(data, chunk)
+        sources[f'gzip stream in {chunk}-byte reads'] = lambda chunk=chunk: TrickleStream(packed, chunk)
+
+    for name, source in sources.items():
+        parsed = list(iter_fasta(source()))
+        assert parsed == records, f"{name}: {len(parsed)} records, first mismatch at " \
+                                  f"{next((i for i, (a, b) in enumerate(zip(parsed, records)) if a != b), None)}"
+    print(f"[PASS] {len(records)} records (up to 20kb, CRLF, blank lines) parsed identically from {len(sources)} sources")
+
+    empty = os.path.join(work, 'empty.fasta')
+    open(empty, 'wb').close()
+    assert list(iter_fasta(empty)) == [] and list(iter_fasta(io.BytesIO(gzip.compress(b'')))) == []
+    assert list(iter_fasta(io.BytesIO(b'ACGT\n>only header'))) == [('only header', '')]
+    print("[PASS] empty files, empty gzip and a header without sequence")
+
+
+def check_import_counts():
+    """파일 안 중복, 이미 DB에 있는 서열, 정규화 후 같아지는 표기, 근사 중복을 added/duplicates로 정확히 나눠 셉니다."""
+    print("\n--- 2. FastaImporter duplicate counting ---")
+    rng = random.Random(41)
+    fresh = [''.join(rng.choice('ACGT') for _ in range(150)) for _ in range(8)]
+    existing = ''.join(rng.choice('ACGT') for _ in range(150))
+    near = list(fresh[0])
+    near[75] = 'A' if near[75] != 'A' else 'C'
+    entries = [(f"fresh{i}", seq) for i, seq in enumerate(fresh)] + [
+        ('repeat-same-batch', fresh[7]),           # 같은 배치(batch_size=3의 세 번째 배치) 안의 중복
+        ('repeat-later-batch', fresh[1]),          # 다른 배치의 중복
+        ('lowercase-rna', fresh[2].lower().replace('t', 'u')),  # 정규화하면 fresh2
+        ('already-stored', existing),              # 가져오기 전에 DB에 있던 서열
+        ('invalid', 'ACGT' * 30 + 'XZ'),
+        ('short', 'ACGTACGT'),
+        ('empty', ''),
+    ]
+    fasta = os.path.join(tempfile.mkdtemp(), 'dups.fasta')
+    with open(fasta, 'w') as f:
+        f.write(''.join(f">{header}\n{seq}\n" for header, seq in entries))
+
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(), 'import.db'))
+    try:
+        db.upsert_records([{"record_id": "old", "dna_sequence": existing, "birth_time": datetime.now(),
+                            "record_type": "DNA", "source_info": "existing"}])
+        importer = FastaImporter(db)
+        batches = []
+        stats = importer.import_fasta(fasta, min_length=20, batch_size=3, progress=lambda s: batches.append(dict(s)))
+        expected = {'records': len(entries), 'added': 8, 'duplicates': 4, 'invalid': 1, 'skipped_short': 2}
+        assert {k: stats[k] for k in expected} == expected, stats
+        assert stats['batches'] == len(batches) == 4 and batches[-1]['added'] == 8
+        with db.read_snapshot() as conn:
+            total = conn.execute("SELECT COUNT(*) FROM genetic_records").fetchone()[0]
+            counts = dict(conn.execute("SELECT dna_sequence, occurrence_count FROM genetic_records").fetchall())
+        assert total == 9 and counts[fresh[7]] == counts[fresh[1]] == counts[fresh[2]] == counts[existing] == 2, counts
+        print("[PASS] 8 added, 4 duplicates (same batch, later batch, normalized RNA, already stored), 1 invalid, 2 short")
+
+        stats = importer.import_fasta(fasta, min_length=20, batch_size=1000)
+        assert (stats['added'], stats['duplicates'], stats['batches']) == (0, 12, 1), stats
+        print("[PASS] re-importing the same file adds nothing and counts every valid record as a duplicate")
+
+        with open(fasta, 'w') as f:
+            f.write(f">near\n{''.join(near)}\n")
+        stats = importer.import_fasta(fasta, collapse_near_duplicates=True)
+        assert (stats['added'], stats['duplicates']) == (0, 1), stats
+        print("[PASS] a near-duplicate collapsed into its representative counts as a duplicate")
+    finally:
+        db.close()
+
+
+def main():
+    check_fasta_sources()
+    check_import_counts()
+    print("\nALL TESTS PASSED.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime
+
+# Add project root to sys.path
+root_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, root_dir)
+
+from dna_app.database.db_manager import DatabaseManager
+from dna_app.database.similarity_index import sequence_identity
+
+
+def brute_force(sequences, pattern):
+    """{record_id: 매칭 시작 위치 목록} (겹치는 매칭 포함)"""
+    found = {}
+    for record_id, seq in sequences.items():
+        positions = [i for i in range(len(seq) - len(pattern) + 1) if seq.startswith(pattern, i)]
+        if positions:
+            found[record_id] = positions
+    return found
+
+
+def store(db, sequences):
+    results = db.upsert_records([{
+        "record_id": record_id, "dna_sequence": seq, "birth_time": datetime.now(), "record_type": "DNA",
+        "source_info": record_id
+    } for record_id, seq in sequences.items()])
+    assert all(is_new for _, is_new in results), "test sequences must be distinct"
+
+
+def search_all(db, pattern, page=7):
+    """모든 페이지를 읽어 {record_id: positions}와 마지막 total/total_exact를 반환합니다."""
+    found, offset = {}, 0
+    while True:
+        results, total, exact = db.search_motif(pattern, limit=page, offset=offset)
+        for r in results:
+            assert r['record_id'] not in found, f"{pattern}: {r['record_id']} returned on two pages"
+            found[r['record_id']] = r['positions']
+        if len(results) < page:
+            return found, total, exact
+        offset += page
+
+
+def check_motif_index():
+    print("--- 1. Motif search next to N / IUPAC bases ---")
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(), 'motif.db'))
+    try:
+        # 리뷰에서 재현된 사례: 모호 염기 바로 앞의 짧은 모티프
+        store(db, {'edge': 'CCCCCCCCGGANCCCCCCCCCCCC', 'tail': 'TTTTTTTTTTTTTTTTGGA'})
+        found, total, exact = search_all(db, 'GGA')
+        assert found == {'edge': [8], 'tail': [16]} and total == 2 and exact, (found, total, exact)
+        print("[PASS] 'GGA' found right before an N and at the sequence end")
+
+        rng = random.Random(31)
+        sequences = {}
+        for i in range(120):
+            seq = [rng.choice('ACGT') for _ in range(rng.randint(30, 160))]
+            for _ in range(rng.randint(0, 6)):
+                seq[rng.randrange(len(seq))] = rng.choice('NRYKMSW')
+            sequences[f"r{i:03d}"] = ''.join(seq)
+        store(db, sequences)
+        sequences.update({'edge': 'CCCCCCCCGGANCCCCCCCCCCCC', 'tail': 'TTTTTTTTTTTTTTTTGGA'})
+
+        checked = 0
+        for _ in range(300):
+            source = sequences[rng.choice(list(sequences))]
+            m = rng.choice([3, 4, 5, 6, 7, 8, 9, 12, 17])
+            start = rng.randrange(max(1, len(source) - m))
+            pattern = source[start:start + m]
+            if len(pattern) < m or set(pattern) - set('ACGT'):
+                pattern = ''.join(rng.choice('ACGT') for _ in range(m))
+            expected = brute_force(sequences, pattern)
+            found, total, exact = search_all(db, pattern)
+            assert found == {k: v[:100] for k, v in expected.items()}, f"{pattern}: {found} != {expected}"
+            assert exact and total == len(expected), (pattern, total, len(expected))
+            checked += 1
+        print(f"[PASS] {checked} random patterns (3-17 bases) match a brute-force scan across pages")
+
+        results, total, exact = db.search_motif('AAA', limit=1)
+        assert len(results) == 1 and (exact or total >= 1)
+        print("[PASS] short pattern paging stops after the requested page")
+    finally:
+        db.close()
+
+
+def check_motif_reindex():
+    """이전 형식(모호 염기 앞 윈도우 미색인)으로 만든 postings는 시작 시 백필로 다시 색인됩니다."""
+    print("\n--- 2. Postings from the previous format are reindexed ---")
+    path = os.path.join(tempfile.mkdtemp(), 'legacy.db')
+    db = DatabaseManager(path)
+    store(db, {'edge': 'CCCCCCCCGGANCCCCCCCCCCCC'})
+    with db.transaction() as cursor:
+        cursor.execute("DELETE FROM kmer_postings")
+        cursor.execute("UPDATE system_metadata SET value = '1' WHERE key = 'format:kmer_postings'")
+        rowid = cursor.execute("SELECT rowid FROM genetic_records").fetchone()[0]
+        cursor.executemany("INSERT INTO kmer_postings (kmer, record_rowid, positions) VALUES (?, ?, ?)",
+                           [(0, rowid, b'\x01\x00')])
+    db.close()
+
+    db = DatabaseManager(path)
+    try:
+        assert 'kmer_postings' in db.index_backfill_status()
+        db.run_index_backfill()
+        results, total, exact = db.search_motif('GGA')
+        assert [r['record_id'] for r in results] == ['edge'], results
+        print("[PASS] postings from the previous format are rebuilt by the backfill")
+    finally:
+        db.close()
+
+
+def edit_distance(a, b):
+    """밴드/앵커 없이 전체 DP로 계산한 편집 거리 (기준값)"""
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+def mutate(rng, seq, edits):
+    s = list(seq)
+    for _ in range(edits):
+        op, i = rng.choice('sid'), rng.randrange(len(s))
+        if op == 's':
+            s[i] = rng.choice('ACGT')
+        elif op == 'i':
+            s.insert(i, rng.choice('ACGT'))
+        elif len(s) > 1:
+            del s[i]
+    return ''.join(s)
+
+
+def apply_diff(reference, diff):
+    out, pos = [], 0
+    for op, start, end, segment in diff:
+        out.append(reference[pos:start])
+        out.append(segment)
+        pos = end
+    return ''.join(out) + reference[pos:]
+
+
+def check_sequence_identity():
+    print("\n--- 3. Banded identity matches a plain edit-distance DP ---")
+    rng = random.Random(30)
+    pairs = []
+    for _ in range(300):
+        ref = ''.join(rng.choice('ACGT') for _ in range(rng.randint(20, 400)))
+        pairs.append((ref, mutate(rng, ref, rng.randint(0, 25))))
+    for ref, var in pairs:
+        distance, longest = edit_distance(ref, var), max(len(ref), len(var))
+        expected = 1.0 - distance / longest
+        identity, diff = sequence_identity(ref, var)
+        assert abs(identity - expected) < 1e-12, (ref, var, identity, expected)
+        assert apply_diff(ref, diff) == var, (ref, var, diff)
+
+        # 임계값 경계: 정확히 같은 동일성은 통과, 편집 하나 적은 값을 요구하면 그 값 미만으로 조기 중단
+        identity, _ = sequence_identity(ref, var, min_identity=expected)
+        assert abs(identity - expected) < 1e-12, (ref, var, identity, expected)
+        if distance:
+            stricter = 1.0 - (distance - 1) / longest
+            identity, _ = sequence_identity(ref, var, min_identity=stricter)
+            assert identity < stricter, (ref, var, identity, stricter)
+    print(f"[PASS] {len(pairs)} mutated pairs: identity equals 1 - DP distance / longest, diff rebuilds the variant")
+    print("[PASS] min_identity at the exact identity passes; one edit stricter reports below the threshold")
+
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(), 'near.db'))
+    try:
+        ref = ''.join(rng.choice('ACGT') for _ in range(300))
+        var = mutate(rng, ref, 6)
+        store(db, {'ref': ref})
+        expected = 1.0 - edit_distance(ref, var) / max(len(ref), len(var))
+        with db.read_snapshot() as conn:
+            found = db.similarity_index.find_near_duplicate(conn, var, min_identity=expected)
+            missed = db.similarity_index.find_near_duplicate(conn, var, min_identity=expected + 1e-6)
+        assert found and found['record_id'] == 'ref' and abs(found['identity'] - expected) < 1e-12, found
+        assert missed is None, missed
+        print(f"[PASS] find_near_duplicate accepts identity {expected:.4f} at the threshold and rejects just above it")
+    finally:
+        db.close()
+
+
+def check_fts():
+    print("\n--- 4. Full-text search escaping and sync after update/delete ---")
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(), 'fts.db'))
+    try:
+        rng = random.Random(28)
+        headers = {'wuhan': '>MN908947.3 Severe acute respiratory syndrome coronavirus 2 isolate Wuhan-Hu-1 host:human',
+                   'flu': '>CY121680.1 Influenza A virus (A/Boston/DOA2107/2012(H3N2)) "segment 4" AND NOT OR',
+                   'phage': '>NC_001416.1 Enterobacteria phage lambda, complete genome'}
+        db.upsert_records([{"record_id": rid, "dna_sequence": ''.join(rng.choice('ACGT') for _ in range(150)),
+                            "birth_time": datetime.now(), "record_type": "DNA", "source_info": header}
+                           for rid, header in headers.items()])
+
+        expected = {'MN908947.3': ['wuhan'], 'Wuhan-Hu-1': ['wuhan'], 'host:human': ['wuhan'], 'Wuha*': ['wuhan'],
+                    '(A/Boston/DOA2107/2012(H3N2))': ['flu'], '"segment 4"': ['flu'], 'segment "4': ['flu'],
+                    'AND': ['flu'], 'NOT OR': ['flu'], 'NC_001416.1': ['phage'], 'lambda,': ['phage'],
+                    '-phage': ['phage'], 'NEAR(': [], '*': [], '"': [], '': []}
+        for text, record_ids in expected.items():
+            results, total = db.search_records(text)
+            assert [r['record_id'] for r in results] == record_ids and total == len(record_ids), (text, results, total)
+        print(f"[PASS] {len(expected)} queries with FTS5 operators/punctuation are searched literally without errors")
+
+        db.execute_write("UPDATE raw_genetic_captures SET source_info = ? WHERE linked_record_id = 'phage'",
+                         ('>NC_001416.1 Escherichia virus Lambda, renamed',))
+        assert db.search_records('Enterobacteria')[1] == 0
+        assert [r['record_id'] for r in db.search_records('Escherichia')[0]] == ['phage']
+        db.execute_write("DELETE FROM raw_genetic_captures WHERE linked_record_id = 'flu'")
+        assert db.search_records('Influenza') == ([], 0)
+        print("[PASS] capture header updates and deletes are reflected in record search")
+
+        db.create_document('doc1', 'Primer notes', 'ORF1ab "nsp12" primers')
+        assert [r['doc_id'] for r in db.search_documents('nsp12')[0]] == ['doc1']
+        db.update_document('doc1', content='spike RBD primers')
+        assert db.search_documents('nsp12')[1] == 0 and db.search_documents('RBD')[1] == 1
+        db.delete_document('doc1')
+        assert db.search_documents('RBD') == ([], 0) and db.search_documents('Primer')[1] == 0
+        print("[PASS] document updates and deletes are reflected in document search")
+    finally:
+        db.close()
+
+
+def main():
+    check_motif_index()
+    check_motif_reindex()
+    check_sequence_identity()
+    check_fts()
+    print("\nALL TESTS PASSED.")
+
+
+if __name__ == "__main__":
+    main()
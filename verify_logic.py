@@ -1,6 +1,7 @@
 import os
 import sqlite3
 import json
+import threading
 from datetime import datetime
 from dna_app.database.db_manager import DatabaseManager
 
@@ -87,6 +88,70 @@ def main():
     assert weights == [2, 1] or weights == [1, 2], f"Weights mismatch. Got {weights}"
     print("[PASS] Weights extraction verified.")
 
+    print("\n--- 4. Writes Serialized With Open Transactions ---")
+    # 다른 스레드의 문서/기록 쓰기가 진행 중인 트랜잭션을 커밋해 버리면 롤백이 무의미해짐
+    started, release = threading.Event(), threading.Event()
+
+    def failing_transaction():
+        try:
+            with db.transaction() as tx:
+                tx.execute("INSERT INTO system_metadata (key, value) VALUES ('half_written', '1')")
+                started.set()
+                release.wait(5)
+                raise RuntimeError("abort")
+        except RuntimeError:
+            pass
+
+    worker = threading.Thread(target=failing_transaction)
+    worker.start()
+    started.wait(5)
+    writers = [threading.Thread(target=db.create_document, args=("doc1", "Title")),
+               threading.Thread(target=db.update_death_time, args=("id3", datetime.now()))]
+    for t in writers:
+        t.start()
+    release.set()
+    for t in [worker] + writers:
+        t.join()
+    assert db.get_metadata('half_written') is None, "a concurrent write committed another thread's transaction"
+    assert db.get_document("doc1") is not None and db.update_document("doc1", title="Renamed")
+    assert db.delete_document("doc1") and db.get_document("doc1") is None
+    print("[PASS] Rolled-back transaction stayed rolled back; document/death_time writes applied.")
+
+    print("\n--- 5. Canonicalization Merges Colliding Rows ---")
+    # 정규화 전 버전이 저장한 소문자/RNA 표기 행 (정규화 후 seq1과 같은 서열)
+    for rid, raw in (("old_lower", seq1.lower()), ("old_rna", seq1.replace("T", "U"))):
+        cursor.execute("INSERT INTO genetic_records (record_id, dna_sequence, birth_time, occurrence_count, source_metadata) "
+                       "VALUES (?, ?, ?, 3, '[]')", (rid, raw, datetime.now().isoformat()))
+        cursor.execute("INSERT INTO raw_genetic_captures (capture_id, dna_sequence, captured_at, linked_record_id, source_info) "
+                       "VALUES (?, ?, ?, ?, 'legacy')", ("cap_" + rid, raw, datetime.now().isoformat(), rid))
+    cursor.execute("DELETE FROM system_metadata WHERE key = 'migration:canonical_merge'")
+    db.conn.commit()
+    db.close()
+    db = DatabaseManager(TEST_DB)
+    cursor = db.conn.cursor()
+    rows = cursor.execute("SELECT record_id, occurrence_count FROM genetic_records WHERE dna_sequence = ?", (seq1,)).fetchall()
+    assert len(rows) == 1 and rows[0][1] == 2 + 3 + 3, f"Expected one merged row with count 8, got {rows}"
+    linked = {r[0] for r in cursor.execute("SELECT DISTINCT linked_record_id FROM raw_genetic_captures WHERE dna_sequence = ?", (seq1,))}
+    assert linked == {rows[0][0]}, f"Captures should point at the surviving row, got {linked}"
+    print("[PASS] Merged rows:", rows)
+
+    print("\n--- 6. Canonicalization Pages Through Rowid Batches ---")
+    legacy = {f"batch{i}": ("acgu" * 30)[i:] + "ac" * i for i in range(7)}
+    for rid, raw in legacy.items():
+        cursor.execute("INSERT INTO genetic_records (record_id, dna_sequence, birth_time, occurrence_count, source_metadata) "
+                       "VALUES (?, ?, ?, 1, '[]')", (rid, raw, datetime.now().isoformat()))
+    selects = []
+    db.conn.set_trace_callback(lambda sql: selects.append(sql) if sql.startswith("SELECT rowid, record_id") else None)
+    with db.transaction() as tx:
+        db._canonicalize_existing(tx, batch_size=3)
+    db.conn.set_trace_callback(None)
+    stored = dict(cursor.execute(f"SELECT record_id, dna_sequence FROM genetic_records WHERE record_id IN "
+                                 f"({','.join('?' * len(legacy))})", list(legacy)).fetchall())
+    assert stored == {rid: raw.upper().replace('U', 'T') for rid, raw in legacy.items()}, stored
+    total = cursor.execute("SELECT COUNT(*) FROM genetic_records").fetchone()[0]
+    assert len(selects) == total // 3 + 1, f"{len(selects)} batch reads for {total} rows"
+    print(f"[PASS] {total} rows canonicalized in {len(selects)} batched reads of 3")
+
     db.close()
     if os.path.exists(TEST_DB):
         os.remove(TEST_DB)
@@ -0,0 +1,368 @@
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Add project root to sys.path
+root_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, root_dir)
+
+from dna_app.database.db_manager import DatabaseManager
+from dna_app.services.harvest_service import HarvestService
+from dna_app.services.ncbi_client import EutilsClient, TokenBucket
+from dna_app.services.record_service import RecordService
+
+
+class FakeEutils:
+    """
+    로컬 E-utilities 대체 서버 (esearch, usehistory, efetch FASTA / uilist).
+    - records: {uid: 서열}, 검색 결과 순서는 order (publish()로 추가한 레코드가 맨 앞 = 최신순 정렬)
+    - esearch usehistory=y는 그 시점의 순서를 WebEnv에 저장, expire_history()로 모든 WebEnv 만료 (400)
+    - 모든 요청 시각을 requests에 기록
+    - fail_next: 다음 N개 요청에 429 + Retry-After: 0 응답
+    - truncate_next: 다음 N개 efetch 응답을 본문 절반에서 끊음 (스트리밍 도중 연결 끊김)
+    - efetch_budget: 정수면 FASTA efetch를 그만큼만 성공시키고 이후는 exhausted_status (기본 503, 재시도 대상)
+    """
+
+    def __init__(self, records):
+        self.records = dict(records)
+        self.order = list(self.records)
+        self.histories = {}
+        self.requests = []
+        self.fail_next = 0
+        self.truncate_next = 0
+        self.efetch_budget = None
+        self.exhausted_status = 503
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                fake._handle(self, parse_qs(urlparse(self.path).query))
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode()
+                fake._handle(self, parse_qs(body))
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def publish(self, records):
+        """새 레코드 등록 → 이후 검색에서 기존 레코드보다 앞에 옴"""
+        with self._lock:
+            self.records.update(records)
+            self.order = list(records) + self.order
+
+    def expire_history(self):
+        with self._lock:
+            self.histories.clear()
+
+    def count(self, endpoint, **params):
+        return sum(1 for _, e, p in self.requests if e == endpoint and all(p.get(k) == v for k, v in params.items()))
+
+    def _respond(self, handler, status, body='', content_type='text/plain', truncate=False, headers=()):
+        data = body.encode()
+        handler.send_response(status)
+        for name, value in headers:
+            handler.send_header(name, value)
+        handler.send_header('Content-Type', content_type)
+        handler.send_header('Content-Length', str(len(data)))
+        handler.end_headers()
+        if truncate:
+            handler.wfile.write(data[:data.index(b'>', len(data) // 2)])
+            handler.close_connection = True
+            return
+        handler.wfile.write(data)
+
+    def _handle(self, handler, query):
+        params = {key: values[0] for key, values in query.items()}
+        endpoint = urlparse(handler.path).path.rsplit('/', 1)[-1]
+        fasta = endpoint == 'efetch.fcgi' and params.get('rettype') == 'fasta'
+        with self._lock:
+            self.requests.append((time.monotonic(), endpoint, params))
+            failing = self.fail_next > 0
+            self.fail_next -= failing
+            truncate = fasta and not failing and self.truncate_next > 0
+            self.truncate_next -= truncate
+            exhausted = fasta and not failing and self.efetch_budget is not None and self.efetch_budget <= 0
+            if fasta and not failing and self.efetch_budget is not None:
+                self.efetch_budget -= 1
+            order = list(self.order)
+            history = self.histories.get(params.get('WebEnv'))
+        if failing:
+            return self._respond(handler, 429, headers=[('Retry-After', '0')])
+        if exhausted:
+            return self._respond(handler, self.exhausted_status)
+        start, count = int(params.get('retstart', 0)), int(params.get('retmax', 20))
+
+        if endpoint == 'esearch.fcgi':
+            result = {'count': str(len(order)), 'idlist': order[start:start + count]}
+            if params.get('usehistory') == 'y':
+                webenv = f"WE{len(self.histories) + len(self.requests)}"
+                with self._lock:
+                    self.histories[webenv] = order
+                result.update(webenv=webenv, querykey='1')
+            return self._respond(handler, 200, json.dumps({'esearchresult': result}), 'application/json')
+        if endpoint == 'efetch.fcgi':
+            if 'WebEnv' in params:
+                if history is None:
+                    return self._respond(handler, 400, 'Error: WebEnv expired')
+                uids = history[start:start + count]
+            else:
+                uids = [uid for uid in params.get('id', '').split(',') if uid in self.records]
+            if params.get('rettype') == 'uilist':
+                return self._respond(handler, 200, ''.join(f"{uid}\n" for uid in uids))
+            body = ''.join(f">{uid} fake record\n{self.records[uid]}\n" for uid in uids)
+            return self._respond(handler, 200, body, truncate=truncate)
+        return self._respond(handler, 404)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def min_gap(times):
+    return min(b - a for a, b in zip(times, times[1:]))
+
+
+def main():
+    print("--- 1. TokenBucket: no burst after idle ---")
+    bucket = TokenBucket(rate=20)
+    time.sleep(0.3)  # 유휴 시간 동안 토큰이 capacity(1) 이상 쌓이면 안 됨
+    stamps = []
+    threads = [threading.Thread(target=lambda: (bucket.acquire(), stamps.append(time.monotonic()))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stamps.sort()
+    assert min_gap(stamps) >= 0.04, f"burst detected: min gap {min_gap(stamps):.3f}s"
+    print(f"[PASS] 8 concurrent acquires spaced >= 1/rate (min gap {min_gap(stamps):.3f}s)")
+
+    fake = FakeEutils({f"U{i:03d}": "ACGT" * (i + 1) for i in range(30)})
+    client = EutilsClient(base_url=fake.base_url, rate=10, backoff=0.01)
+    try:
+        print("\n--- 2. Client request spacing against the stand-in server ---")
+        for _ in range(5):
+            client.count("fake[All]")
+        times = [t for t, _, _ in fake.requests]
+        assert min_gap(times) >= 0.08, f"requests closer than 1/rate: {min_gap(times):.3f}s"
+        print(f"[PASS] {len(times)} esearch requests, min gap {min_gap(times):.3f}s (rate=10/s)")
+
+        print("\n--- 3. 429 + Retry-After is retried ---")
+        fake.fail_next = 2
+        assert client.count("fake[All]") == 30
+        print("[PASS] recovered after two 429 responses")
+
+        print("\n--- 4. efetch_chunks returns every record ---")
+        ids = client.esearch_ids("fake[All]", 30)
+        fetched = {}
+        finished = 0
+        for event in client.efetch_chunks(ids, chunk_size=7, workers=3, batch_size=3, queue_size=2):
+            assert event.error is None, event.error
+            assert len(event.records) <= 3, "records must arrive in batches, not whole chunks"
+            fetched.update((header.split()[0], seq) for header, seq in event.records)
+            finished += event.done
+        assert fetched == fake.records, f"{len(fetched)} of {len(fake.records)} records"
+        assert finished == (len(ids) + 6) // 7
+        print(f"[PASS] {len(fetched)} records streamed in batches of <= 3 from {finished} chunks")
+
+        print("\n--- 5. efetch_chunks retry resumes a chunk without repeating records ---")
+        fake.records.update({uid: 'ACGT' * 200 for uid in ids[:6]})  # 응답이 여러 번에 나눠 읽히도록
+        fake.truncate_next = 1
+        streamed = [header.split()[0] for event in client.efetch_chunks(ids[:6], chunk_size=6, batch_size=2)
+                    for header, _ in event.records]
+        assert sorted(streamed) == ids[:6], streamed
+        assert fake.truncate_next == 0
+        print("[PASS] chunk re-fetched after a dropped connection, each record delivered once")
+    finally:
+        client.close()
+        fake.close()
+
+    print("\n--- 6. Harvest resumes against the result set pinned at creation ---")
+    check_harvest_pinning()
+
+    print("\n--- 7. Harvest ownership lives in the DB lease ---")
+    check_harvest_lease()
+
+    print("\n--- 8. ncbi_meta cold-miss failure is not retried before retry_after ---")
+    check_meta_cold_failure()
+
+    print("\n--- 9. Harvest counts only new records as added ---")
+    check_harvest_duplicates()
+
+    print("\n--- 10. Sample fetch offset stops at the first failed chunk ---")
+    check_fetch_offset()
+
+    print("\nALL TESTS PASSED.")
+
+
+def random_records(rng, first_uid, count):
+    return {str(uid): ''.join(rng.choice('ACGT') for _ in range(150)) for uid in range(first_uid, first_uid + count)}
+
+
+def check_harvest_pinning():
+    """
+    1페이지 저장 후 efetch가 실패하도록 한 뒤, 새 레코드 등록(검색 순서가 밀림) + WebEnv 만료 상태에서 재개.
+    재개한 작업은 검색을 다시 하지 않고, 생성 시점의 앞 target_count개를 정확히 한 번씩 저장해야 합니다.
+    """
+    rng = random.Random(5)
+    fake = FakeEutils(random_records(rng, 1000, 40))
+    pinned = fake.order[:25]
+    client = EutilsClient(base_url=fake.base_url, rate=50, max_retries=1, backoff=0.01)
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(), 'harvest.db'))
+    try:
+        harvest = HarvestService(db, RecordService(db_manager=db, ncbi_client=client), recover_interrupted=False)
+        harvest.PAGE_SIZE = 10
+
+        fake.efetch_budget = 1
+        job = harvest.start_job(count=25, background=False)
+        assert job['status'] == 'failed' and job['next_retstart'] == 10 and job['pinned_count'] == 25, job
+
+        fake.publish(random_records(rng, 5000, 8))
+        fake.expire_history()
+        fake.efetch_budget = None
+        job = harvest.resume_job(job['job_id'], background=False)
+        assert job['status'] == 'completed' and job['added'] == 25, job
+        assert fake.count('esearch.fcgi') == 1, "resume must not re-run esearch"
+
+        with db.read_snapshot() as conn:
+            stored = {seq: count for seq, count in conn.execute("SELECT dna_sequence, occurrence_count FROM genetic_records")}
+            leftover = conn.execute("SELECT COUNT(*) FROM harvest_job_uids").fetchone()[0]
+        assert set(stored) == {fake.records[uid] for uid in pinned}, "harvested set differs from the pinned set"
+        assert set(stored.values()) == {1}, "a record was ingested twice"
+        assert leftover == 0, "pinned UIDs should be dropped after completion"
+        print(f"[PASS] resumed after failure, new records and WebEnv expiry: {len(stored)} pinned records, one esearch")
+    finally:
+        client.close()
+        fake.close()
+        db.close()
+
+
+
+def check_harvest_lease():
+    """
+    다른 프로세스가 유효한 임대로 실행 중인 작업은 새 프로세스의 복구 단계나 resume이 건드리지 않고,
+    임대가 만료된 작업만 interrupted로 표시된 뒤 재개됩니다.
+    """
+    rng = random.Random(9)
+    fake = FakeEutils(random_records(rng, 2000, 12))
+    client = EutilsClient(base_url=fake.base_url, rate=50, max_retries=1, backoff=0.01)
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(), 'lease.db'))
+    try:
+        web = HarvestService(db, RecordService(db_manager=db, ncbi_client=client), recover_interrupted=False,
+                             owner_id='web')
+        fake.efetch_budget = 0
+        job_id = web.start_job(count=12, background=False)['job_id']
+        assert web.get_job(job_id)['owner'] is None, "a failed job must release its lease"
+        # 다른 프로세스(worker)가 실행 중인 상태를 흉내
+        db.execute_write("UPDATE harvest_jobs SET status = 'running', owner = 'worker', lease_expires_at = ? "
+                         "WHERE job_id = ?", (time.time() + 60, job_id))
+        fake.efetch_budget = None
+
+        restarted = HarvestService(db, web.record_service, owner_id='web-2')
+        job = restarted.get_job(job_id)
+        assert job['status'] == 'running' and job['owner'] == 'worker', "live lease must survive another process's startup"
+        job = restarted.resume_job(job_id, background=False)
+        assert job['status'] == 'running' and job['owner'] == 'worker' and job['added'] == 0, job
+        print("[PASS] a job leased by another process is neither interrupted nor resumed")
+
+        db.execute_write("UPDATE harvest_jobs SET lease_expires_at = ? WHERE job_id = ?", (time.time() - 1, job_id))
+        restarted = HarvestService(db, web.record_service, owner_id='web-3')
+        assert restarted.get_job(job_id)['status'] == 'interrupted'
+        job = restarted.resume_job(job_id, background=False)
+        assert job['status'] == 'completed' and job['added'] == 12 and job['owner'] is None, job
+        print("[PASS] an expired lease is marked interrupted and resumed by the new owner")
+    finally:
+        client.close()
+        fake.close()
+        db.close()
+
+
+
+def check_meta_cold_failure():
+    """캐시 값이 없을 때 count가 실패하면 대체 값을 반환하고, retry_after 전까지 esearch를 다시 호출하지 않습니다."""
+    fake = FakeEutils(random_records(random.Random(1), 100, 5))
+    client = EutilsClient(base_url=fake.base_url, rate=50, max_retries=0, backoff=0.01)
+    try:
+        service = RecordService(db_manager=None, ncbi_client=client)
+        service.meta_cache.retry_after = 0.5
+        fake.fail_next = 1
+        for _ in range(5):
+            assert service.get_ncbi_meta().get('fallback'), "failed cold load must serve the fallback"
+        assert fake.count('esearch.fcgi') == 1, f"{fake.count('esearch.fcgi')} esearch calls during the outage"
+        time.sleep(0.6)
+        assert service.get_ncbi_meta()['total_count'] == 5
+        assert fake.count('esearch.fcgi') == 2
+        print("[PASS] one esearch during the outage, retried after retry_after")
+    finally:
+        client.close()
+        fake.close()
+
+
+def check_harvest_duplicates():
+    """이미 DB에 있는 서열은 added가 아니라 duplicates로 세고, 없는 job_id로 run_job을 불러도 실패하지 않습니다."""
+    rng = random.Random(13)
+    fake = FakeEutils(random_records(rng, 3000, 15))
+    client = EutilsClient(base_url=fake.base_url, rate=50, max_retries=1, backoff=0.01)
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(), 'dups.db'))
+    try:
+        existing = [fake.records[uid] for uid in fake.order[:4]]
+        db.upsert_records([{"record_id": f"old{i}", "dna_sequence": seq, "birth_time": datetime.now(),
+                            "record_type": "DNA", "source_info": "existing"} for i, seq in enumerate(existing)])
+        harvest = HarvestService(db, RecordService(db_manager=db, ncbi_client=client), recover_interrupted=False)
+        harvest.PAGE_SIZE = 6
+        job = harvest.start_job(count=15, background=False)
+        assert job['status'] == 'completed' and (job['added'], job['duplicates']) == (11, 4), job
+        with db.read_snapshot() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM genetic_records").fetchone()[0] == 15
+        print("[PASS] 11 added, 4 duplicates counted from upsert results")
+
+        assert harvest.run_job('missing-job') is None
+        print("[PASS] run_job on an unknown job id returns without raising")
+    finally:
+        client.close()
+        fake.close()
+        db.close()
+
+
+def check_fetch_offset():
+    """실패한 청크가 있으면 ncbi_offset은 앞에서부터 연속으로 성공한 청크까지만 전진하고, 다음 수집이 그 청크부터 다시 받습니다."""
+    rng = random.Random(17)
+    fake = FakeEutils(random_records(rng, 4000, 15))
+    client = EutilsClient(base_url=fake.base_url, rate=50, max_retries=0, backoff=0.01)
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(), 'offset.db'))
+    try:
+        service = RecordService(db_manager=db, ncbi_client=client)
+        service.FETCH_CHUNK_SIZE, service.FETCH_WORKERS = 5, 1
+        fake.efetch_budget, fake.exhausted_status = 1, 400  # 첫 청크만 성공
+        created = service.fetch_real_samples_from_ncbi(count=15)
+        assert len(created) == 5, created
+        assert db.get_metadata('ncbi_offset_DNA') == '5', db.get_metadata('ncbi_offset_DNA')
+        print("[PASS] chunks 2-3 failed: offset advanced over chunk 1 only")
+
+        fake.efetch_budget = None
+        created = service.fetch_real_samples_from_ncbi(count=10)
+        assert len(created) == 10 and db.get_metadata('ncbi_offset_DNA') == '15'
+        with db.read_snapshot() as conn:
+            stored = {seq for (seq,) in conn.execute("SELECT dna_sequence FROM genetic_records")}
+        assert stored == set(fake.records.values()), "the failed chunks must be fetched by the next run"
+        print("[PASS] the next fetch picks up the failed chunks")
+    finally:
+        client.close()
+        fake.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+# Add project root to sys.path
+root_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, root_dir)
+
+from dna_app.database.db_manager import DatabaseManager
+from dna_app.database.job_queue import JobQueue, LeaseLost
+from dna_app.services.job_service import JobCancelled
+from dna_app.services.queue_worker import JobContext, QueueWorker, build_handlers, resolve_job_path
+from verify_ncbi import FakeEutils, random_records
+
+
+def check_claim(db):
+    """여러 워커가 동시에 claim 해도 작업 하나는 한 워커에게만 임대됩니다."""
+    queue = JobQueue(db, lease_seconds=30)
+    jobs = [queue.enqueue('noop')['job_id'] for _ in range(5)]
+    claimed, barrier = [], threading.Barrier(8)
+
+    def claim(worker_id):
+        barrier.wait()
+        while True:
+            job = queue.claim(worker_id, ['noop'])
+            if job is None:
+                return
+            claimed.append(job['job_id'])
+
+    threads = [threading.Thread(target=claim, args=(f"w{i}",)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(claimed) == sorted(jobs), f"claimed {len(claimed)} times for {len(jobs)} jobs"
+    assert queue.claim('late', ['noop']) is None
+    print(f"[PASS] 8 concurrent workers claimed {len(jobs)} jobs exactly once")
+
+
+def check_lease_expiry(db):
+    """임대가 만료된 작업은 다른 워커가 다시 가져가고, 이전 워커의 하트비트/완료는 LeaseLost."""
+    queue = JobQueue(db, lease_seconds=0.2)
+    job_id = queue.enqueue('stuck', max_attempts=2)['job_id']
+    first = queue.claim('dead-worker', ['stuck'])
+    assert first['job_id'] == job_id and first['attempts'] == 1
+    assert queue.claim('other', ['stuck']) is None, "a live lease must not be claimed"
+
+    time.sleep(0.3)
+    second = queue.claim('other', ['stuck'])
+    assert second['job_id'] == job_id and second['attempts'] == 2 and second['lease_owner'] == 'other', second
+    for call in (lambda: queue.heartbeat(job_id, 'dead-worker'), lambda: queue.complete(job_id, 'dead-worker')):
+        try:
+            call()
+            raise AssertionError("the previous owner must lose its lease")
+        except LeaseLost:
+            pass
+    print("[PASS] expired lease re-claimed by another worker, old owner gets LeaseLost")
+
+    time.sleep(0.3)
+    assert queue.claim('third', ['stuck']) is None
+    job = queue.get(job_id)
+    assert job['state'] == 'failed' and 'lease expired' in job['error'], job
+    print("[PASS] lease expiry after max_attempts marks the job failed")
+
+
+def check_retry(db):
+    """핸들러 예외는 백오프 후 재시도, 재시도 횟수를 다 쓰면 failed."""
+    queue = JobQueue(db, lease_seconds=5, retry_backoff=0)
+    calls = []
+
+    def flaky(payload, ctx):
+        calls.append(ctx.attempt)
+        if ctx.attempt < 2:
+            raise RuntimeError("transient")
+        return {"ok": True}
+
+    def broken(payload, ctx):
+        raise RuntimeError("always")
+
+    flaky_id = queue.enqueue('flaky', max_attempts=3)['job_id']
+    broken_id = queue.enqueue('broken', max_attempts=2)['job_id']
+    QueueWorker(queue, {'flaky': flaky, 'broken': broken}, worker_id='w').run(once=True)
+    assert calls == [1, 2], calls
+    job = queue.get(flaky_id)
+    assert job['state'] == 'completed' and job['result'] == {"ok": True} and job['attempts'] == 2, job
+    job = queue.get(broken_id)
+    assert job['state'] == 'failed' and job['attempts'] == 2 and 'always' in job['error'], job
+    print("[PASS] failed attempt retried then completed; exhausted retries end as failed")
+
+
+def check_harvest_retry(db):
+    """
+    새 수집 작업을 만든 큐 작업이 도중에 실패하면, 재시도는 payload에 기록된 harvest_job_id로 같은 작업을 재개합니다.
+    """
+    rng = random.Random(3)
+    fake = FakeEutils(random_records(rng, 3000, 250))  # PAGE_SIZE(200) 보다 많아야 두 번째 페이지에서 실패
+    config = SimpleNamespace(NCBI_EUTILS_URL=fake.base_url, NCBI_API_KEY=None, NCBI_EMAIL=None,
+                             NCBI_META_TTL_SECONDS=60, HARVEST_LEASE_SECONDS=30, MODEL_FILE=None)
+    try:
+        queue = JobQueue(db, lease_seconds=5, retry_backoff=0)
+        handlers = build_handlers(db, config)
+        job_id = queue.enqueue('harvest', {"count": 250}, max_attempts=2)['job_id']
+        fake.efetch_budget, fake.exhausted_status = 1, 400  # 재시도하지 않는 오류로 첫 시도를 바로 실패시킴
+        worker = QueueWorker(queue, {'harvest': handlers['harvest']}, worker_id='w')
+        assert worker.run_one()
+        job = queue.get(job_id)
+        harvest_job_id = job['payload'].get('harvest_job_id')
+        assert job['state'] == 'queued' and harvest_job_id, job
+
+        fake.efetch_budget = None
+        assert worker.run_one()
+        job = queue.get(job_id)
+        assert job['state'] == 'completed' and job['result']['harvest_job_id'] == harvest_job_id, job
+        with db.read_snapshot() as conn:
+            harvests = conn.execute("SELECT job_id, status, added FROM harvest_jobs").fetchall()
+        assert harvests == [(harvest_job_id, 'completed', 250)], harvests
+        assert fake.count('esearch.fcgi') == 1, "the retry must resume, not start a new harvest"
+        print("[PASS] retried harvest resumed the harvest job created by the first attempt")
+
+        ctx = JobContext({'job_id': 'cancel', 'kind': 'harvest', 'payload': {"count": 10}, 'attempts': 1, 'progress': None})
+        ctx._cancel.set()
+        try:
+            handlers['harvest'](ctx.payload, ctx)
+            raise AssertionError("cancelled harvest must stop")
+        except JobCancelled:
+            pass
+        with db.read_snapshot() as conn:
+            status, added, owner = conn.execute("SELECT status, added, owner FROM harvest_jobs WHERE job_id = ?",
+                                                (ctx.payload['harvest_job_id'],)).fetchone()
+        assert (status, added, owner) == ('paused', 0, None), (status, added, owner)
+        print("[PASS] cancel request pauses the harvest job and releases its lease")
+    finally:
+        fake.close()
+
+
+def check_training_cancel():
+    """학습에 넘긴 ctx의 취소 요청은 모델 파일을 쓰기 전에 작업을 멈춥니다."""
+    import train_model
+    from datetime import datetime
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(), 'train.db'))
+    rng = random.Random(11)
+    db.upsert_records([{
+        "record_id": f"r{i}", "dna_sequence": ''.join(rng.choice('ACGT') for _ in range(120)),
+        "birth_time": datetime.now(), "record_type": "DNA", "source_info": f"r{i}"
+    } for i in range(20)])
+    db.close()
+    model_path = os.path.join(tempfile.mkdtemp(), 'model.joblib')
+    ctx = JobContext({'job_id': 'train', 'kind': 'retrain', 'payload': {}, 'attempts': 1, 'progress': None})
+    ctx._cancel.set()
+    try:
+        train_model.retrain_model_from_db(model_path, db.db_path, job=ctx)
+        raise AssertionError("cancelled training must stop")
+    except JobCancelled:
+        pass
+    assert not os.path.exists(model_path), "cancelled training must not write the model"
+    assert ctx.total == 20, ctx.total
+    print("[PASS] cancel request stops retraining before the model is written")
+
+
+def check_job_paths(db):
+    """import/export 작업의 payload.path는 설정된 IMPORT_DIR / EXPORT_DIR 밖을 가리킬 수 없습니다."""
+    base = tempfile.mkdtemp()
+    import_dir, export_dir = os.path.join(base, 'imports'), os.path.join(base, 'exports')
+    os.makedirs(import_dir)
+    outside = os.path.join(base, 'secret.fasta')
+    for path, seq in ((outside, 'TTGA' * 20), (os.path.join(import_dir, 'ok.fasta'), 'ACGT' * 20)):
+        with open(path, 'w') as f:
+            f.write(f">{os.path.basename(path)}\n{seq}\n")
+    os.symlink(outside, os.path.join(import_dir, 'link.fasta'))
+
+    assert resolve_job_path(import_dir, 'ok.fasta') == os.path.realpath(os.path.join(import_dir, 'ok.fasta'))
+    assert resolve_job_path(import_dir, os.path.join(import_dir, 'ok.fasta')).endswith('ok.fasta')
+    for bad in ('../secret.fasta', outside, 'link.fasta', '/etc/passwd', '', None, '.'):
+        try:
+            resolve_job_path(import_dir, bad)
+            raise AssertionError(f"{bad!r} must be rejected")
+        except ValueError:
+            pass
+
+    config = SimpleNamespace(IMPORT_DIR=import_dir, EXPORT_DIR=export_dir, MODEL_FILE=None)
+    handlers = build_handlers(db, config)
+    ctx = JobContext({'job_id': 'import', 'kind': 'import', 'payload': {}, 'attempts': 1, 'progress': None})
+    result = handlers['import']({'path': 'ok.fasta'}, ctx)
+    assert result['added'] == 1, result
+    for kind, path in (('import', '../secret.fasta'), ('import', 'link.fasta'), ('export', '../../out.parquet')):
+        try:
+            handlers[kind]({'path': path}, ctx)
+            raise AssertionError(f"{kind} {path} must be rejected")
+        except ValueError:
+            pass
+    assert not os.path.exists(os.path.join(base, 'out.parquet'))
+    print("[PASS] import/export paths resolve under their configured directories; '..', absolute and symlinked paths outside are rejected")
+
+
+def main():
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(), 'queue.db'))
+    try:
+        print("--- 1. Atomic claim across concurrent workers ---")
+        check_claim(db)
+
+        print("\n--- 2. Lease expiry ---")
+        check_lease_expiry(db)
+
+        print("\n--- 3. Retry with backoff ---")
+        check_retry(db)
+
+        print("\n--- 4. Harvest retry resumes the same harvest job ---")
+        check_harvest_retry(db)
+
+        print("\n--- 5. Import/export paths stay under the configured directories ---")
+        check_job_paths(db)
+    finally:
+        db.close()
+
+    print("\n--- 6. Training honours cancel requests ---")
+    check_training_cancel()
+
+    print("\nALL TESTS PASSED.")
+
+
+if __name__ == "__main__":
+    main()
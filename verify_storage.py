@@ -1,4 +1,5 @@
 import os
+import random
 import sys
 import uuid
 from datetime import datetime
@@ -10,8 +11,8 @@ sys.path.append(os.getcwd())
 def verify_storage():
     db = DBManager('database/dna_storage.db')
     
-    # 1. Create a unique DNA sequence
-    unique_seq = f"ATCG-TEST-{str(uuid.uuid4())[:8]}"
+    # 1. Create a unique DNA sequence (수집 단계에서 IUPAC 검증을 하므로 유효한 염기만 사용)
+    unique_seq = "".join(random.choice("ACGT") for _ in range(48))
     print(f"Testing with sequence: {unique_seq}")
 
     # 2. Insert First Time